@@ -1,7 +1,8 @@
 /**
  * @module DownloadButtonAll
  * @memberof DataView
- * @description Renders a button to download a DOCX report for a specified distribution.
+ * @description Renders a button that generates the reports of all participants of a distribution on the
+ * backend worker, shows the progress, and downloads the resulting ZIP once it is ready.
  *
  * @param {Object} props - Component properties.
  * @param {string} props.distribution - Distribution identifier for the report.
@@ -11,29 +12,66 @@
 
 import React, { useState } from 'react';
 
+const POLL_INTERVAL_MS = 3000;
+
 const DownloadButtonAll = ({ distribution, organization, disabled }) => {
+    const [loading, setLoading] = useState(false);
+    const [progress, setProgress] = useState(null);
+
    /**
-   * Handles file download by fetching the report from the API and triggering a download.
+   * Polls the status of a report job until it finishes or fails.
    *
    * @async
+   * @param {string} jobId - ID of the report job.
+   * @returns {Promise<Object>} The final job status.
    */
-    const [loading, setLoading] = useState(false);
+    const waitForJob = async (jobId) => {
+        while (true) {
+            const response = await fetch(`api/report_jobs/${jobId}`, { credentials: 'include' });
+            if (!response.ok) {
+                throw new Error('Failed to fetch the report job status');
+            }
+            const status = await response.json();
+            setProgress(status);
+            if (status.status === 'finished' || status.status === 'failed') {
+                return status;
+            }
+            await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        }
+    };
 
+   /**
+   * Enqueues the generation of all reports, waits for the job and triggers the download of the ZIP.
+   *
+   * @async
+   */
     const handleDownload = async () => {
         if (disabled) return; // Prevent execution if disabled
 
         try {
             setLoading(true);
+            setProgress(null);
             const response = await fetch(`api/download_docx_all/${distribution}`, {
-                method: 'GET',
+                method: 'POST',
                 credentials: 'include',
             });
 
             if (!response.ok) {
+                throw new Error('Failed to start the report generation');
+            }
+
+            const { job_id: jobId } = await response.json();
+            const status = await waitForJob(jobId);
+            if (status.status === 'failed') {
+                throw new Error(status.error || 'Report generation failed');
+            }
+
+            const download = await fetch(`api/report_jobs/${jobId}/download`, { credentials: 'include' });
+            if (!download.ok) {
                 throw new Error('Failed to download the file');
             }
 
-            const blob = await response.blob();
+            const blob = await download.blob();
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
             a.href = url;
@@ -45,9 +83,16 @@ const DownloadButtonAll = ({ distribution, organization, disabled }) => {
             console.error('Error downloading the file:', error);
         } finally {
             setLoading(false);
+            setProgress(null);
         }
     };
 
+    const label = () => {
+        if (!loading) return 'Download All';
+        if (progress && progress.total) return `Generating ${progress.done}/${progress.total}...`;
+        return 'Queued...';
+    };
+
     return (
         <button
             onClick={handleDownload}
@@ -55,7 +100,7 @@ const DownloadButtonAll = ({ distribution, organization, disabled }) => {
             style={{ marginLeft: "90px", width: "170px", opacity: disabled ? 0.5 : 1, cursor: disabled ? "not-allowed" : "pointer" }}
             disabled={loading || disabled} // Disable when loading or explicitly disabled
         >
-            {loading ? 'Downloading...' : 'Download All'}
+            {label()}
         </button>
     );
 };
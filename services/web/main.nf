@@ -1,4 +1,5 @@
 // Read and parse the samples.txt file into a map (dictionary-like structure)
+// samples.txt is written from the Sample table when a run is launched (see project/utils/samples.py)
 def samples_map = [:]
 
 params.ref="project/static/genomes/"
@@ -15,6 +16,23 @@ new File(params.samples_txt).eachLine { line ->
     }
 }
 
+// Read the subtype and Nextclade dataset of each reference from the reference.json file of its directory
+// (see project/utils/references.py), so adding a reference only means adding its directory
+def reference_subtypes = [:]
+def datasets = [:]
+new File(params.ref).eachDir { dir ->
+    def metadata = new File(dir, "reference.json")
+    if (metadata.exists()) {
+        def reference = new groovy.json.JsonSlurper().parse(metadata)
+        reference_subtypes[dir.name] = reference.subtype
+        datasets[dir.name] = reference.nextclade_dataset
+    }
+}
+// The alternative dataset of a sample is the dataset of a reference of the other subtype
+def alternative_datasets = datasets.collectEntries { name, dataset ->
+    [dataset, datasets.find { other, other_dataset -> reference_subtypes[other] != reference_subtypes[name] }?.value]
+}
+
 // println "Parsed samples map: ${samples_map}"  // Debugging: view the parsed map
 process extractReadsFromBam {
     cache 'lenient'
@@ -191,25 +209,17 @@ process nextclade {
 process nextcladeAlternative {
     cache 'lenient'
     input:
-    tuple val(sample_id), path(fasta_file), path(outputdir), val(dataset) // Input the sample ID, FASTA file, and output directory
+    tuple val(sample_id), path(fasta_file), path(outputdir), val(alternative_dataset) // Input the sample ID, FASTA file, output directory and dataset of the other subtype
 
     output:
     path("${outputdir}/nextclade_alternative.output"), emit: alternative_report // Save Nextclade report for the alternative dataset
 
     script:
     """
-    # Switch dataset value based on the condition
-    if [ "${dataset}" == "nextstrain/rsv/a/EPI_ISL_412866" ]; then
-        nextclade run \
-            --dataset-name nextstrain/rsv/b/EPI_ISL_1653999 \
-            --output-tsv "${outputdir}/nextclade_alternative.output" \
-            "$fasta_file"
-    elif [ "${dataset}" == "nextstrain/rsv/b/EPI_ISL_1653999" ]; then
-        nextclade run \
-            --dataset-name nextstrain/rsv/a/EPI_ISL_412866 \
-            --output-tsv "${outputdir}/nextclade_alternative.output" \
-            "$fasta_file"
-    fi
+    nextclade run \
+        --dataset-name "${alternative_dataset}" \
+        --output-tsv "${outputdir}/nextclade_alternative.output" \
+        "$fasta_file"
     """
 }
 
@@ -339,9 +349,7 @@ workflow {
             def sample = fasta_file.parent.name  // Extract sample name from folder structure
             def sample_id = "${fasta_file.parent.parent.name}_${fasta_file.parent.name}"
             def reference = file("${params.ref}${samples_map[sample]}/${samples_map[sample]}.fasta")  // Fetch reference files
-            def dataset = samples_map[sample] == 'EPI_ISL_412866'
-                ? "nextstrain/rsv/a/EPI_ISL_412866"
-                : "nextstrain/rsv/b/EPI_ISL_1653999"
+            def dataset = datasets[samples_map[sample]]
             [sample_id, fasta_file, fasta_file.parent, dataset, reference]  // Include reference in the tuple
         }
         //.view { it -> "Fastas: $it" }
@@ -368,9 +376,7 @@ workflow {
     generated_consensus_with_meta = generated_consensus.map { tuple ->
         def (sample_id, fasta_file, outputdir) = tuple
         def reference = file("${params.ref}${samples_map[sample_id.split('_')[1]]}/${samples_map[sample_id.split('_')[1]]}.fasta")
-        def dataset = samples_map[sample_id.split('_')[1]] == 'EPI_ISL_412866'
-            ? "nextstrain/rsv/a/EPI_ISL_412866"
-            : "nextstrain/rsv/b/EPI_ISL_1653999"
+        def dataset = datasets[samples_map[sample_id.split('_')[1]]]
         [sample_id, fasta_file, outputdir, dataset, reference] // Add reference & dataset
     }.view { it -> "Generated fastas: $it" }
 
@@ -379,7 +385,7 @@ workflow {
     
     // Send to Nextclade process
     nextclade(final_fasta_files.map { tuple -> tuple[0..3] })  // Use only fasta_file, outputdir, and dataset for Nextclade
-    nextcladeAlternative(final_fasta_files.map { tuple -> tuple[0..3] }) // Alternative Nextclade run
+    nextcladeAlternative(final_fasta_files.map { tuple -> tuple[0..2] + [alternative_datasets[tuple[3]]] }) // Alternative Nextclade run
 
             // Channel to store aligned results
     aligned_ch = alignFastas(final_fasta_files.map { tuple ->
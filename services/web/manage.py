@@ -6,30 +6,61 @@ This module enables live interaction with the web service, with the possibility
 
 Important functions:
     seed_db()
-        Seeds the SQL database with distributions, organizations, users and submissions, based on what is mounted in the services/web/data/ volume. 
+        Seeds the SQL database with distributions, samples, organizations, users and submissions, based on what is mounted in the services/web/data/ volume.
+        The references of the samples are read from the data/<distribution>/samples.txt files, if present.
         Will not produce changes if database is already seeded.
 
+    backfill_metrics()
+        Parses the pipeline outputs of every distribution under services/web/data/, stores them in the SampleMetrics table
+        and rewrites the data/<distribution>/metrics.parquet snapshots.
+        Only needed for data produced before the table existed, new runs are stored when their Nextflow run completes.
+
+    benchmark_parser(rows, repeat)
+        Micro-benchmark of the Qualimap parsers against the previous np.loadtxt/substring implementation, on synthetic files.
+
+    benchmark_report_profiles(distribution, lab, role)
+        Renders the report of a lab with each render profile and prints its render time and size, and those of its figures.
+
+    explain_queries(distribution, sample, lab, email, no_seqscan)
+        Runs EXPLAIN ANALYZE on the queries of the hot read paths (submissions, samples, notifications, distributions of a lab)
+        against the current database, and flags sequential scans of the indexed tables.
+
     build_docs()
         Automates the updating of Sphinx documentation of the Python web codebase. Can also receive the frontend JSDocs  and add it to the Sphinx docs.
 
     **Usage:**
     >>> (sudo) docker-compose exec web python3 manage.py seed_db    
+    >>> (sudo) docker-compose exec web python3 manage.py backfill_metrics
+    >>> (sudo) docker-compose exec web python3 manage.py benchmark_report_profiles --distribution <name>
+    >>> (sudo) docker-compose exec web python3 manage.py explain_queries --no-seqscan
     >>> (sudo) docker-compose exec web python3 manage.py build_docs
 
 :author: Kevin
 :version: 0.0.1
 :date: 2025-02-20
 """
-import os, subprocess, csv
+import os, subprocess, csv, tempfile, time, timeit
+from io import BytesIO
 import click
+import numpy as np
 from flask.cli import FlaskGroup
 import redis
 from rq import Worker, Connection
 from werkzeug.security import generate_password_hash
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 
 from project import app, db
-from project.utils.sql_models import User, Distribution, Organization, Submission
+from project.utils.sql_models import User, Distribution, Organization, Sample, Submission, Notification
+from project.utils.metrics_store import backfill_distribution_metrics, get_platform_map, load_report_data
+from project.utils.metrics_frame import write_metrics_snapshot
+from project.utils.report_parser import parse_genome_results, read_coverage_histogram, read_sample_reference_map
+from project.utils.samples import get_sample_reference_map
+from project.utils import report_cache
+from project.utils.report_context import ReportContext
+from project.utils.platform_plots import SamplePlatformPlots
+from project.utils.render_profiles import RENDER_PROFILES
+from project.utils.docx import render_lab_report
 
 
 cli = FlaskGroup(app)
@@ -88,10 +119,11 @@ def seed_db():
                         all_samples.append(sample_folder)
                         dist_org_sample_dict[distribution_name][organization_name].append(sample_folder)
             
-            # Create and add the Distribution with its organizations and samples
+            # Create and add the Distribution with its organizations and samples, with the references of its samples.txt if any
+            references = read_sample_reference_map(dist_path) if os.path.isfile(os.path.join(dist_path, "samples.txt")) else {}
             distribution = Distribution(
                 name=distribution_name,
-                samples=list(set(all_samples)),
+                samples=[Sample(name=sample, reference=references.get(sample)) for sample in sorted(set(all_samples) | set(references))],
                 organizations=orgs_for_distribution
             )
             db.session.add(distribution)
@@ -139,12 +171,173 @@ def seed_db():
                     db.session.add(submission)
         db.session.commit()
 
+        # Store the parsed metrics of the mounted pipeline outputs
+        for distribution_obj in Distribution.query.all():
+            if backfill_distribution_metrics(distribution_obj):
+                write_metrics_snapshot(distribution_obj)
+
         # Check samples JSON for distros
         print("\n\033[92mDatabase seeding succeeded\033[0m\n")
     except IntegrityError as e:
         print("\n\033[91mIntegrityError happened, most likely because databases are already seeded, it is not an issue nor a bug. \033[0m\n")
 
 
+@cli.command("backfill_metrics")
+def backfill_metrics():
+    for distribution in Distribution.query.all():
+        stored = backfill_distribution_metrics(distribution)
+        if stored:
+            write_metrics_snapshot(distribution)
+        print(f"{distribution.name}: stored metrics for {stored} samples")
+
+
+@cli.command("benchmark_parser")
+@click.option("--rows", default=50000, help="Number of rows of the synthetic coverage histogram.")
+@click.option("--repeat", default=20, help="Number of timed runs per parser (best run is reported).")
+def benchmark_parser(rows, repeat):
+    def legacy_histogram(path):
+        histogram_data = np.loadtxt(path, skiprows=1)
+        return histogram_data[:, 0], histogram_data[:, 1]
+
+    def legacy_genome_results(path):
+        metrics = {}
+        with open(path, 'r') as f:
+            for line in f:
+                if "There is a" in line and "of reference with a coverageData >= 20X" in line:
+                    metrics["Coverage at 20X (%)"] = float(line.split()[3].strip('%'))
+                if "mean coverageData" in line:
+                    metrics["Mean coverage depth"] = float(line.split("=")[1].strip().replace(",", "").replace("X", ""))
+                if "std coverageData" in line:
+                    metrics["Standard deviation of coverage depth"] = float(line.split("=")[1].strip().replace(",", "").replace("X", ""))
+        return metrics
+
+    with tempfile.TemporaryDirectory() as tmp:
+        histogram_path = os.path.join(tmp, "coverage_histogram.txt")
+        counts = np.random.default_rng(0).integers(0, 1000, size=rows)
+        with open(histogram_path, "w") as f:
+            f.write("#Coverage\tNumber of genomic locations\n")
+            f.writelines(f"{depth}.0\t{count}.0\n" for depth, count in enumerate(counts))
+
+        # Qualimap reports have the coverage summary halfway through, followed by per-contig tables
+        genome_results_path = os.path.join(tmp, "genome_results.txt")
+        with open(genome_results_path, "w") as f:
+            f.writelines(f"     number of reads = {i}\n" for i in range(200))
+            f.write("     mean coverageData = 1,234.5X\n     std coverageData = 321.2X\n")
+            f.write("     There is a 98.5% of reference with a coverageData >= 20X\n")
+            f.writelines(f"EPI_ISL_412866\t{i}\t{i}\t{i}\n" for i in range(2000))
+
+        assert all(np.array_equal(a, b) for a, b in zip(legacy_histogram(histogram_path), read_coverage_histogram(histogram_path)))
+        assert legacy_genome_results(genome_results_path) == parse_genome_results(genome_results_path)
+
+        for name, legacy, current, path in [
+            (f"coverage histogram ({rows} rows)", legacy_histogram, read_coverage_histogram, histogram_path),
+            ("genome_results.txt", legacy_genome_results, parse_genome_results, genome_results_path),
+        ]:
+            legacy_ms = min(timeit.repeat(lambda: legacy(path), number=1, repeat=repeat)) * 1000
+            current_ms = min(timeit.repeat(lambda: current(path), number=1, repeat=repeat)) * 1000
+            print(f"{name}: previous {legacy_ms:.2f} ms, current {current_ms:.2f} ms ({legacy_ms / current_ms:.1f}x)")
+
+
+@cli.command("benchmark_report_profiles")
+@click.option("--distribution", default=None, help="Name of the distribution (default: the first one).")
+@click.option("--lab", default=None, help="Organization whose report is rendered (default: the first one of the distribution).")
+@click.option("--role", default="user", help="Role of the reader ('user' or 'superuser').")
+def benchmark_report_profiles(distribution, lab, role):
+    dist = Distribution.query.filter_by(name=distribution).first() if distribution else Distribution.query.first()
+    lab = lab or dist.organizations[0].name
+    labs = [org.name for org in dist.organizations]
+
+    cache_dir = report_cache.FRAGMENTS_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        # Render every figure instead of reusing cached report fragments
+        report_cache.FRAGMENTS_DIR = tmp
+        try:
+            for profile in RENDER_PROFILES:
+                context = ReportContext(dist, profile=profile)
+
+                # Platform plots of every sample, as seen by every lab of the distribution
+                start = time.perf_counter()
+                figures = {}
+                for sample, sample_data in context.sample_reports.items():
+                    plots = SamplePlatformPlots(sample, sample_data, profile)
+                    for organization in labs:
+                        percentage_plot, read_coverage_plot, _ = plots.images(organization, role)
+                        figures[sample, plots.variant(organization, role)] = len(percentage_plot) + len(read_coverage_plot)
+                figures_ms = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                buffer = BytesIO()
+                render_lab_report(context, role, lab).save(buffer)
+                report_ms = (time.perf_counter() - start) * 1000
+
+                print(f"{profile}: {len(figures)} platform plot variants in {figures_ms:.0f} ms "
+                      f"({sum(figures.values()) / max(len(figures), 1) / 1024:.0f} KB per variant), "
+                      f"DOCX report of {lab} in {report_ms:.0f} ms ({len(buffer.getvalue()) / 1024:.0f} KB)")
+        finally:
+            report_cache.FRAGMENTS_DIR = cache_dir
+
+
+@cli.command("explain_queries")
+@click.option("--distribution", default=None, help="Name of the distribution (default: the first one).")
+@click.option("--sample", default=None, help="Sample of the per-sample queries (default: the first one of the distribution).")
+@click.option("--lab", default=None, help="Organization of the per-lab queries (default: the first one of the distribution).")
+@click.option("--email", default=None, help="User whose notifications are queried (default: the first user of the lab).")
+@click.option("--no-seqscan", is_flag=True, help="Discourage sequential scans (PostgreSQL), to check that the indexes are usable on a small seeded database.")
+def explain_queries(distribution, sample, lab, email, no_seqscan):
+    dist = Distribution.query.filter_by(name=distribution).first() if distribution else Distribution.query.first()
+    if dist is None:
+        print("No distribution found, seed the database first (manage.py seed_db)")
+        return
+    sample = sample or dist.sample_names[0]
+    lab = lab or dist.organizations[0].name
+    organization = Organization.query.filter_by(name=lab).first()
+    user = User.query.filter_by(email=email).first() if email else User.query.filter_by(organization_id=organization.id).first()
+    email = user.email if user else email
+
+    # The queries of the hot read paths, run as the application runs them
+    hot_paths = [
+        ("platforms of a distribution (metrics_store.get_platform_map)", lambda: get_platform_map(dist)),
+        ("platforms of a sample (data.get_sample_details)", lambda: get_platform_map(dist, sample)),
+        ("references of a distribution (samples.get_sample_reference_map)", lambda: get_sample_reference_map(dist)),
+        ("metrics of a sample (metrics_store.load_report_data)", lambda: load_report_data(dist, sample)),
+        ("submission of a lab (upload.upload_files)", lambda: Submission.query.filter_by(
+            distribution_id=dist.id, organization_id=organization.id, sample=sample).first()),
+        ("undismissed notifications (notifications.handle_connect)", lambda: Notification.query.filter_by(
+            user_email=email, is_dismissed=False).all()),
+        ("distributions of a lab (data.distribution_manager)", lambda: Distribution.query.filter(
+            Distribution.organizations.any(name=lab)).all()),
+    ]
+
+    # Capture the SQL of each path, then explain it with the same parameters
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    dialect = db.engine.dialect.name
+    explain = "EXPLAIN ANALYZE" if dialect == "postgresql" else "EXPLAIN QUERY PLAN"
+    indexed_tables = ("submissions", "samples", "notifications", "distribution_organization")
+    for name, run in hot_paths:
+        statements.clear()
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            run()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+
+        print(f"\n\033[1m{name}\033[0m")
+        for statement, parameters in statements:
+            with db.engine.connect() as conn:
+                with conn.begin():
+                    if no_seqscan and dialect == "postgresql":
+                        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+                    plan = [" | ".join(str(column) for column in row) for row in conn.exec_driver_sql(f"{explain} {statement}", parameters)]
+            print("\n".join(f"    {line}" for line in plan))
+            scans = [table for table in indexed_tables for line in plan
+                     if f"Seq Scan on {table} " in f"{line} " or f"SCAN {table} " in f"{line} "]
+            for table in sorted(set(scans)):
+                print(f"\033[93m    Warning: sequential scan of {table}\033[0m")
+
+
 @cli.command("run_worker")
 def run_worker():
     redis_connection = redis.from_url(app.config["REDIS_URL"])
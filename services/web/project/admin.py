@@ -43,9 +43,11 @@ from flask import Blueprint, jsonify, request,abort, current_app
 from functools import wraps
 from flask_login import current_user, login_required
 from project.utils.sql_models import db, User, Distribution, Organization
+from project.utils.references import DEFAULT_SUBTYPE, reference_for_subtype
+from project.utils.samples import add_sample
+from project.utils.response_cache import invalidate_distribution_responses
 from werkzeug.security import generate_password_hash
 import os, string, secrets, redis
-from sqlalchemy.orm.attributes import flag_modified
 from flask_mail import Message, Mail
 
 # Create the blueprint
@@ -113,7 +115,7 @@ def get_all():
         distribution_list.append({
             "id": dist.id,
             "name": dist.name,
-            "samples": dist.samples,
+            "samples": dist.sample_names,
             "organizations": [
                 {"id": org.id, "name": org.name} for org in dist.organizations
             ]
@@ -192,10 +194,7 @@ def distribution_manager():
             return jsonify({"error": "Distribution already exists"}), 400
 
         # Create a new distribution
-        new_distribution = Distribution(
-            name=distribution_name,
-            samples=[]  # Directly pass list; SQLAlchemy handles JSON serialization
-        )
+        new_distribution = Distribution(name=distribution_name)
         db.session.add(new_distribution)
         db.session.commit()
 
@@ -357,13 +356,14 @@ def samples_per_distro_manager(distribution):
             return jsonify({"error": f"Distribution '{distribution}' not found"}), 404
 
         # Return the list of samples
-        samples = distribution_record.samples or []
+        samples = distribution_record.sample_names
         print(samples)
         return jsonify({"distribution": distribution, "samples": samples}), 200
 
     elif request.method == "POST":
         sample_name = request.form.get("sample")
-        rsv_type = 'EPI_ISL_1653999' if request.form.get("rsv_type")=='RSV-B' else 'EPI_ISL_412866'  # Get RSV type
+        reference = reference_for_subtype(request.form.get("rsv_type")) or reference_for_subtype(DEFAULT_SUBTYPE)
+        rsv_type = reference.name  # Reference genome of the RSV type
 
         if not sample_name:
             return jsonify({"error": "Sample name is required"}), 400
@@ -374,40 +374,13 @@ def samples_per_distro_manager(distribution):
         if not distribution_record:
             return jsonify({"error": f"Distribution '{distribution}' not found"}), 404
         
-        print(distribution_record.samples)
-
-        # Add the sample to the distribution's samples list
-        if distribution_record.samples is None:
-            distribution_record.samples = []
-
-        if sample_name in distribution_record.samples:
+        # Add the sample and its reference genome, samples.txt is generated from them when the pipeline runs
+        if add_sample(distribution_record, sample_name, rsv_type) is None:
             return jsonify({"error": f"Sample '{sample_name}' already exists in distribution '{distribution}'"}), 400
-
-        # Append the sample
-        distribution_record.samples.append(sample_name)
-
-        # Mark the JSON field as modified
-        flag_modified(distribution_record, "samples")
-
-        # Persist the changes
-        db.session.add(distribution_record)
         db.session.commit()
-
-         # --- FILE HANDLING SECTION ---
-        try:
-            # Ensure the folder exists
-            os.makedirs(f"data/{distribution}", exist_ok=True)
-
-            # Define the path for samples.txt
-            file_path = os.path.join(f"data/{distribution}", "samples.txt")
-
-            # Open file in append mode and write new entry
-            with open(file_path, "a") as file:
-                file.write(f"{sample_name}\t{rsv_type}\n")
-
-        except Exception as e:
-            return jsonify({"error": f"Failed to write to file: {str(e)}"}), 500
+        # The cached distribution data lists the reference of each sample
+        invalidate_distribution_responses(distribution)
 
         return jsonify({
-            "message": f"Sample '{sample_name}' with RSV type '{rsv_type}' added to '{distribution}' and saved in samples.txt"
+            "message": f"Sample '{sample_name}' with RSV type '{rsv_type}' added to '{distribution}'"
         }), 201
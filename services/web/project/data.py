@@ -6,10 +6,10 @@ This module provides endpoints for managing distribution data and sample reports
 
 It includes endpoints to:
     Fetch distributions associated with the current user's organization.
-    Retrieve sample details and aggregated metrics for a distribution.
-    Proxy static genome files (FASTA, FAI, GZI, GFF3) for specified references.
+    Retrieve sample details and aggregated metrics for a distribution (cached in Redis until the next analysis completes, see response_cache).
+    Proxy static genome files (FASTA, FAI, GZI, GFF3) for the references of the registry (see references).
     Serve consensus BAM, BAI, and BigWig files for individual samples.
-    Generate and download DOCX reports based on lab reports.
+    Generate and download DOCX reports based on lab reports, and enqueue/poll/download the bulk generation of all of them.
 
 WARNING: the static files are consumed by JBrowse2, which cant send credentials hence the 
 endpoints are available to everyone and pose a safety risk. Must be revamped.
@@ -18,18 +18,26 @@ endpoints are available to everyone and pose a safety risk. Must be revamped.
 :version: 0.0.1
 :date: 2025-02-21
 """
-from flask import Blueprint, jsonify, request, current_app, send_file
+from flask import Blueprint, jsonify, request, send_file
 from flask_login import current_user, login_required
-from project.utils.sql_models import Distribution, Organization, Submission
-import os, zipfile, subprocess
+from project.utils.sql_models import Distribution
+import os
 from project.utils.docx import generate_docx_report
-from project.utils.report_parser import process_all_reports
-from datetime import datetime
+from project.utils.report_pdf import generate_pdf_report
+from project.utils.report_cache import report_fingerprint, cached_report_path, store_report
+from project.utils.render_profiles import RENDER_PROFILES, DEFAULT_RENDER_PROFILE
+from project.utils.metrics_store import load_report_data, get_platform_map
+from project.utils.references import PROXY_FILES, get_reference
+from project.utils.samples import get_sample_reference_map
+from project.utils.response_cache import cached_json_response
+from project.utils.metrics_frame import load_metrics_frame, participants_per_sample, platform_aggregates
+from project.utils.report_jobs import REPORT_RENDERERS, enqueue_distribution_reports, fetch_report_job, report_job_status, report_artifact_path
 
 # Create the blueprint
 data_bp = Blueprint('data', __name__)
 website_name = os.environ.get("WEBSITE_NAME", "default_website_name")
 subdirectory_name = os.environ.get("SUBDIRECTORY_NAME", "default_subdirectory_name")
+REFERENCE_FILES_MAX_AGE = 24 * 3600  # Seconds
 
 @data_bp.route("/api/distribution_fetch", methods=["GET", "POST"], strict_slashes=False)
 @login_required
@@ -73,18 +81,19 @@ def samples_per_distro_manager(distribution):
             return jsonify({"error": f"Distribution '{distribution}' not found"}), 404
 
         # Return the list of samples
-        samples = distribution_record.samples or []
+        samples = distribution_record.sample_names
         print(samples)
         return jsonify({"distribution": distribution, "samples": samples}), 200
     
 @data_bp.route("/api/distribution_data/<distribution>", methods=["GET"])
 @login_required
+@cached_json_response("distribution_data", per_user=False)  # Same data for every reader
 def get_distribution_data(distribution):
     """
     Process and return aggregated report data for a given distribution.
 
-    Loads a sample-to-reference mapping from 'samples.txt', processes lab reports,
-    aggregates metrics for each sample, and returns the distribution data as JSON.
+    Loads the reference genome of each sample from the Sample table, counts the participants of each sample
+    from the distribution's metrics frame, and returns the distribution data as JSON.
 
     :param distribution: The name of the distribution.
     :type distribution: str
@@ -93,126 +102,83 @@ def get_distribution_data(distribution):
     """
     print("Sample data request received")  # Debugging line
     dist = Distribution.query.filter_by(name=distribution).first()
-    base_dir = f"data/{dist.name}"  # Root directory for lab reports
-    import subprocess
-    subprocess.call("ls data", shell=True)
-    
-    # Load sample-reference mapping from samples.txt
-    samples_file = f"{base_dir}/samples.txt"
-    sample_reference_map = {}
-    try:
-        with open(samples_file, "r") as f:
-            for line in f:
-                sample_id, reference = line.strip().split()
-                sample_reference_map[sample_id] = reference
-    except FileNotFoundError:
-        print(f"File not found: {samples_file}")
-        return jsonify({"error": "Samples file not found"}), 404
-    except Exception as e:
-        print(f"Error reading samples.txt: {e}")
-        return jsonify({"error": "Failed to process samples file"}), 500
 
-    # Process reports and aggregate distribution data
-    report_data = process_all_reports(base_dir)
-    distribution_data = {}  # {sample_name: {"participants": int, "metrics": dict, "reference": str}}
-    for lab, samples in report_data.items():
-        for sample_name, metrics in samples.items():
-            if sample_name not in distribution_data:
-                distribution_data[sample_name] = {
-                    "participants": 0,
-                    "reference": sample_reference_map.get(sample_name, "Unknown")  # Add reference info
-                }
-            distribution_data[sample_name]["participants"] += 1
-
-    return jsonify(distribution_data)
-
-@data_bp.route("/api/proxy_fasta_EPI_ISL_412866")
-#@login_required these endpoints are to serve files to JBrowse2, which cant send credentials.
-def proxy_fasta1():
-    """
-    Serve the FASTA file for reference EPI_ISL_412866.
-
-    :return: FASTA file from the static genomes directory.
-    :rtype: flask.Response
-    """
-    return current_app.send_static_file('genomes/EPI_ISL_412866/EPI_ISL_412866.fasta')
-    
-@data_bp.route("/api/proxy_fai_EPI_ISL_412866")
-#@login_required
-def proxy_fai1():
-    """
-    Serve the FAI index file for reference EPI_ISL_412866.
+    # Load sample-reference mapping
+    sample_reference_map = get_sample_reference_map(dist)
 
-    :return: FAI file from the static genomes directory.
-    :rtype: flask.Response
-    """
-    return current_app.send_static_file('genomes/EPI_ISL_412866/EPI_ISL_412866.fasta.fai')
+    # Load the metrics frame and count participants per sample
+    participants = participants_per_sample(load_metrics_frame(dist))
+    distribution_data = {  # {sample_name: {"participants": int, "reference": str}}
+        sample_name: {
+            "participants": count,
+            "reference": sample_reference_map.get(sample_name, "Unknown")  # Add reference info
+        }
+        for sample_name, count in participants.items()
+    }
 
-@data_bp.route("/api/proxy_gzi_EPI_ISL_412866")
-#@login_required
-def proxy_gzi1():
-    """
-    Serve the gzipped FASTA file for reference EPI_ISL_412866.
+    return jsonify(distribution_data)
 
-    :return: Gzipped FASTA file.
-    :rtype: flask.Response
-    """
-    return current_app.send_static_file('genomes/EPI_ISL_412866/EPI_ISL_412866.fasta.gz')
+def _proxy_reference_file(reference_name, kind):
+    reference = get_reference(reference_name)
+    if reference is None:
+        return jsonify({"error": f"Reference '{reference_name}' not found"}), 404
+    file_path = reference.path(PROXY_FILES[kind])
+    if not os.path.exists(file_path):
+        return jsonify({"error": "File not found"}), 404
+    # The files of a reference never change, JBrowse2 can revalidate them instead of downloading them again
+    return send_file(file_path, conditional=True, max_age=REFERENCE_FILES_MAX_AGE)
 
-@data_bp.route("/api/proxy_gff3_EPI_ISL_412866")
-#@login_required
-def proxy_gff1():
+@data_bp.route("/api/proxy_fasta_<reference>")
+#@login_required these endpoints are to serve files to JBrowse2, which cant send credentials.
+def proxy_fasta(reference):
     """
-    Serve the GFF3 file for reference EPI_ISL_412866.
+    Serve the FASTA file of a reference genome of the registry.
 
-    :return: GFF3 file.
+    :param reference: Name of the reference, e.g. "EPI_ISL_412866".
+    :type reference: str
+    :return: FASTA file from the reference directory, or a 404 error if the reference is unknown.
     :rtype: flask.Response
     """
-    return current_app.send_static_file('genomes/EPI_ISL_412866/EPI_ISL_412866.gff3')
+    return _proxy_reference_file(reference, "fasta")
 
-@data_bp.route("/api/proxy_fasta_EPI_ISL_1653999")
+@data_bp.route("/api/proxy_fai_<reference>")
 #@login_required
-def proxy_fasta2():
+def proxy_fai(reference):
     """
-    Serve the FASTA file for reference EPI_ISL_1653999.
+    Serve the FAI index file of a reference genome of the registry.
 
-    :return: FASTA file.
+    :param reference: Name of the reference.
+    :type reference: str
+    :return: FAI file from the reference directory, or a 404 error if the reference is unknown.
     :rtype: flask.Response
     """
-    return current_app.send_static_file('genomes/EPI_ISL_1653999/EPI_ISL_1653999.fasta')
-    
-@data_bp.route("/api/proxy_fai_EPI_ISL_1653999")
-#@login_required
-def proxy_fai2():
-    """
-    Serve the FAI index file for reference EPI_ISL_1653999.
-
-    :return: FAI file.
-    :rtype: flask.Response
-    """
-    return current_app.send_static_file('genomes/EPI_ISL_1653999/EPI_ISL_1653999.fasta.fai')
+    return _proxy_reference_file(reference, "fai")
 
-@data_bp.route("/api/proxy_gzi_EPI_ISL_1653999")
+@data_bp.route("/api/proxy_gzi_<reference>")
 #@login_required
-def proxy_gzi2():
+def proxy_gzi(reference):
     """
-    Serve the gzipped FASTA file for reference EPI_ISL_1653999.
+    Serve the gzipped FASTA file of a reference genome of the registry.
 
-    :return: Gzipped FASTA file.
+    :param reference: Name of the reference.
+    :type reference: str
+    :return: Gzipped FASTA file, or a 404 error if the reference is unknown.
     :rtype: flask.Response
     """
-    return current_app.send_static_file('genomes/EPI_ISL_1653999/EPI_ISL_1653999.fasta.gz')
+    return _proxy_reference_file(reference, "gzi")
 
-@data_bp.route("/api/proxy_gff3_EPI_ISL_1653999")
+@data_bp.route("/api/proxy_gff3_<reference>")
 #@login_required
-def proxy_gff2():
+def proxy_gff3(reference):
     """
-    Serve the GFF3 file for reference EPI_ISL_1653999.
+    Serve the GFF3 file of a reference genome of the registry.
 
-    :return: GFF3 file.
+    :param reference: Name of the reference.
+    :type reference: str
+    :return: GFF3 file, or a 404 error if the reference is unknown.
     :rtype: flask.Response
     """
-    return current_app.send_static_file('genomes/EPI_ISL_1653999/EPI_ISL_1653999.gff3')
+    return _proxy_reference_file(reference, "gff3")
 
 # Route to serve static bam
 @data_bp.route("/api/distribution_data/<distribution>/sample/<selected_sample>/participant/<participant>", methods=["GET"])
@@ -312,11 +278,12 @@ def get_sample_bigwig(distribution,selected_sample,participant):
 
 @data_bp.route("/api/distribution_data/<distribution>/sample/<selected_sample>", methods=["GET"])
 @login_required
+@cached_json_response("sample_details")
 def get_sample_details(distribution, selected_sample):
     """
     Retrieve detailed report data and aggregated metrics for a specific sample within a distribution.
 
-    Processes lab reports from the distribution's data folder, aggregates metrics across participants,
+    Loads the stored lab metrics of the selected sample only, aggregates metrics across participants,
     and returns both individual and aggregated data. For superusers, all data is returned;
     otherwise, only data relevant to the user's organization is provided.
 
@@ -332,7 +299,9 @@ def get_sample_details(distribution, selected_sample):
     dist = Distribution.query.filter_by(name=distribution).first()
     base_dir = f"data/{dist.name}"  # Root directory for lab reports
     print(base_dir)
-    report_data = process_all_reports(base_dir)
+    report_data = load_report_data(dist, sample=selected_sample)
+    # Sequencing type of every lab for the sample, in one query
+    platform_map = get_platform_map(dist, sample=selected_sample)
 
     sample_details = {}  # {sample_name: {"participants": int, "metrics": dict}}
     for lab, samples in report_data.items():
@@ -352,20 +321,7 @@ def get_sample_details(distribution, selected_sample):
         bams = []
         bigwigs = []
         for lab, metrics in sample_details[selected_sample]["metrics"].items():
-            submission = (
-                Submission.query
-                .join(Organization)
-                .filter(
-                    Submission.distribution_id == dist.id,
-                    Submission.sample == selected_sample,
-                    Organization.name == lab
-                )
-                .first()
-            )
-            if submission:
-                seq_type = submission.sequencing_type
-            else:
-                seq_type = "N/A"
+            seq_type = platform_map.get((lab, selected_sample), "N/A")
                 
             if metrics["coverage"] == "N/A":
                 table_data.append({
@@ -397,73 +353,9 @@ def get_sample_details(distribution, selected_sample):
                 bams.append(bam_url)
                 bigwigs.append(bigwig_url)
 
-        # Compute aggregated metrics by sequencing type (exclude user lab and reference lab "9999")
-        seq_aggregates = {}
-        for lab, metrics in sample_details[selected_sample]["metrics"].items():
-            # Exclude the logged-in user's lab and reference lab from this aggregation
-            # if lab == current_user.organization or lab == "9999":
-            #    continue
-            submission = (
-                Submission.query
-                .join(Organization)
-                .filter(
-                    Submission.distribution_id == dist.id,
-                    Submission.sample == selected_sample,
-                    Organization.name == lab
-                )
-                .first()
-            )
-            if submission:
-                lab_seq_types = submission.sequencing_type.split(",")
-            else:
-                lab_seq_types = "N/A"
-            for lab_seq_type in lab_seq_types:  # Iterate over each sequencing type
-                lab_seq_type = lab_seq_type.strip()  # Remove any extra spaces
-                if lab_seq_type not in seq_aggregates:
-                    seq_aggregates[lab_seq_type] = {
-                        "coverage": 0,
-                        "Ns": 0,
-                        "similarity": 0,
-                        "read_coverage": 0,
-                        "count": 0,
-                        "read_count": 0,
-                        "clade_counts": {},
-                        "g_clade_counts": {}
-                    }
-                if metrics["coverage"] == "N/A":
-                    continue
-                group = seq_aggregates[lab_seq_type]
-                group["coverage"] += metrics["coverage"]
-                group["Ns"] += metrics["Ns"]
-                group["similarity"] += metrics["similarity"]
-                if metrics["Mean coverage depth"] != "N/A":
-                    group["read_coverage"] += metrics["Mean coverage depth"]
-                    group["read_count"] += 1
-                group["count"] += 1
-                clade = metrics.get("clade", "")
-                g_clade = metrics.get("G_clade", "")
-                if clade:
-                    group["clade_counts"][clade] = group["clade_counts"].get(clade, 0) + 1
-                if g_clade:
-                    group["g_clade_counts"][g_clade] = group["g_clade_counts"].get(g_clade, 0) + 1
-
-        # Finalize aggregated metrics per sequencing type
-        for seq_type, agg in seq_aggregates.items():
-            if agg["count"] > 0:
-                agg["coverage"] = round((agg["coverage"] / agg["count"]) * 100, 2)
-                agg["Ns"] = round(agg["Ns"] / agg["count"], 2)
-                agg["similarity"] = round(agg["similarity"] / agg["count"], 2)
-                
-                agg["clade"] = max(agg["clade_counts"], key=agg["clade_counts"].get) if agg["clade_counts"] else ""
-                agg["G_clade"] = max(agg["g_clade_counts"], key=agg["g_clade_counts"].get) if agg["g_clade_counts"] else ""
-                if agg["read_count"]!=0:
-                    agg["read_coverage"] = round(agg["read_coverage"] / agg["read_count"], 2)
-                else:
-                    agg["read_coverage"] = ""
-            else:
-                agg["coverage"] = agg["Ns"] = agg["similarity"] = agg["read_coverage"] = ""
-                agg["clade"] = agg["G_clade"] = ""
-              
+        # Compute aggregated metrics by sequencing type
+        seq_aggregates = platform_aggregates(load_metrics_frame(dist), selected_sample)
+
         if current_user.is_superuser():
             return jsonify({"table": table_data, "bams": bams, "bigwigs": bigwigs, "sequencing_aggregates": seq_aggregates})
         else:
@@ -472,21 +364,7 @@ def get_sample_details(distribution, selected_sample):
             if user_lab not in sample_details[selected_sample]["metrics"]:
                 return jsonify({"error": "You have not submitted valid data for this sample."}), 404
 
-            # Query the submission for the logged-in user's lab
-            user_submission = (
-                Submission.query
-                .join(Organization)
-                .filter(
-                    Submission.distribution_id == dist.id,
-                    Submission.sample == selected_sample,
-                    Organization.name == user_lab
-                )
-                .first()
-            )
-            if user_submission:
-                user_seq_type = user_submission.sequencing_type
-            else:
-                user_seq_type = "N/A"
+            user_seq_type = platform_map.get((user_lab, selected_sample), "N/A")
 
             # Filter user lab data
             user_metrics = sample_details[selected_sample]["metrics"][user_lab]
@@ -559,21 +437,7 @@ def get_sample_details(distribution, selected_sample):
             ref_metrics = sample_details[selected_sample]["metrics"].get(ref_lab, None)
             if not ref_metrics:
                 return jsonify({"error": "Reference lab data not found"}), 404
-            # Query the submission for the logged-in user's lab
-            ref_submission = (
-                Submission.query
-                .join(Organization)
-                .filter(
-                    Submission.distribution_id == dist.id,
-                    Submission.sample == selected_sample,
-                    Organization.name == ref_lab
-                )
-                .first()
-            )
-            if ref_submission:
-                ref_seq_type = ref_submission.sequencing_type
-            else:
-                ref_seq_type = "N/A"
+            ref_seq_type = platform_map.get((ref_lab, selected_sample), "N/A")
 
             # Prepare response table data
             others_label="Others ("+str(aggregated_metrics["lab_count"])+")"
@@ -620,78 +484,109 @@ def download_docx(distribution):
     """
     Generate and send a DOCX report for a specified distribution.
 
-    Processes lab reports from the distribution's data folder to generate a DOCX report,
+    Loads the stored lab metrics of the distribution to generate a DOCX report,
     saves it temporarily, and returns the file as an attachment. Report is rendered differently,
-    depending on user's privileges.
+    depending on user's privileges. With ?format=pdf, the report is rendered straight to PDF from HTML
+    (see report_pdf.generate_pdf_report) instead. ?profile=draft|screen|print sets the resolution and encoding
+    of the figures (see render_profiles). Rendered reports are stored in the report cache and streamed from it
+    while their inputs are unchanged.
 
     :param distribution: The name of the distribution.
     :type distribution: str
-    :return: The generated DOCX report file.
+    :return: The generated DOCX (or PDF) report file.
     :rtype: flask.Response
     """
+    report_format = request.args.get("format", "docx")
+    if report_format not in ("docx", "pdf"):
+        return jsonify({"error": "format must be 'docx' or 'pdf'"}), 400
+    profile = request.args.get("profile", DEFAULT_RENDER_PROFILE)
+    if profile not in RENDER_PROFILES:
+        return jsonify({"error": f"profile must be one of {', '.join(RENDER_PROFILES)}"}), 400
     dist = Distribution.query.filter_by(name=distribution).first()
     base_dir = f"data/{dist.name}"  # Root directory for lab reports
-    report_data = process_all_reports(base_dir)
-
-    # Generate the DOCX file using the refactored function
-    doc = generate_docx_report(report_data, base_dir, current_user.role, current_user.organization, distribution)
-
-    # Save the DOCX file to a temporary file
-    file_path = f"/usr/src/app/project/static/reports/MIC_{current_user.organization}_WG_{distribution}_Report.docx" # save to pdf
-    doc.save(file_path)
+    report_data = load_report_data(dist)
+
+    # Reports are cached on the fingerprint of their inputs, so unchanged reports are not rendered again
+    fingerprint = report_fingerprint(dist, report_data, current_user.role, current_user.organization, report_format, profile)
+    file_path = cached_report_path(dist.name, fingerprint, report_format)
+    if file_path is None:
+        if report_format == "pdf":
+            pdf = generate_pdf_report(report_data, base_dir, current_user.role, current_user.organization, distribution, profile=profile)
+            def write(path):
+                with open(path, "wb") as f:
+                    f.write(pdf)
+        else:
+            # Generate the DOCX file using the refactored function
+            write = generate_docx_report(report_data, base_dir, current_user.role, current_user.organization, distribution, profile=profile).save
+        file_path = store_report(dist.name, fingerprint, report_format, write)
 
     # Send the file to the user
-    return send_file(file_path, as_attachment=True)
+    return send_file(os.path.abspath(file_path), as_attachment=True,
+                     download_name=f"MIC_{current_user.organization}_WG_{distribution}_Report.{report_format}")
 
-@data_bp.route("/api/download_docx_all/<distribution>")
+@data_bp.route("/api/download_docx_all/<distribution>", methods=["POST"])
 @login_required
 def download_docx_all(distribution):
     """
-    Generate and send a ZIP containing DOCX reports for all organizations in a distribution.
+    Enqueue the generation of a ZIP containing the reports of all organizations in a distribution.
 
-    TO DO: send this task to a worker instead of having the main application do all the work. And create necessary views to serve the final zip elsewhere.
+    The reports are rendered, converted to PDF and zipped by the RQ worker (see report_jobs.render_distribution_reports),
+    so the request returns immediately. Progress is available from /api/report_jobs/<job_id> and as "report_progress"
+    Socket.IO events, and the ZIP from /api/report_jobs/<job_id>/download once the job has finished.
+    The PDF backend is selected with ?renderer=libreoffice (DOCX converted by LibreOffice, default) or
+    ?renderer=weasyprint (rendered from HTML), and the render profile of the figures with ?profile=draft|screen|print.
 
     :param distribution: The name of the distribution.
     :type distribution: str
-    :return: A ZIP file containing the generated DOCX reports.
+    :return: JSON object with the "job_id" of the enqueued job.
     :rtype: flask.Response
     """
+    if not current_user.is_superuser():
+        return jsonify({"error": "Only superusers can generate the reports of all participants"}), 403
+    renderer = request.args.get("renderer", "libreoffice")
+    if renderer not in REPORT_RENDERERS:
+        return jsonify({"error": f"renderer must be one of {', '.join(REPORT_RENDERERS)}"}), 400
+    profile = request.args.get("profile", DEFAULT_RENDER_PROFILE)
+    if profile not in RENDER_PROFILES:
+        return jsonify({"error": f"profile must be one of {', '.join(RENDER_PROFILES)}"}), 400
     dist = Distribution.query.filter_by(name=distribution).first()
-    base_dir = f"data/{dist.name}"  # Root directory for lab reports
-    temp_dir = f"/usr/src/app/project/static/reports/all_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    os.makedirs(temp_dir, exist_ok=True)
-    zip_filename = f"reports_{distribution}_{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
-    zip_path = os.path.join(temp_dir, zip_filename)
-
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for org in dist.organizations:
-            report_data = process_all_reports(base_dir)
-            doc = generate_docx_report(report_data, base_dir, "user", org.name, distribution)
-
-            # Save each DOCX report
-            docx_filename = f"MIC_{org.name}_WG_{distribution}_Report.docx"
-            docx_path = os.path.join(temp_dir, docx_filename)
-            doc.save(docx_path)
-
-            # Build the PDF filename and path (assumes .docx becomes .pdf)
-            pdf_filename = docx_filename.replace(".docx", ".pdf")
-            pdf_path = os.path.join(temp_dir, pdf_filename)
-
-            # Convert the DOCX to PDF using LibreOffice in headless mode
-            subprocess.run([
-                "soffice",
-                "--headless",
-                "--convert-to", "pdf",
-                docx_path,
-                "--outdir", temp_dir
-            ], check=True)
-
-            # Add the PDF file to the ZIP archive
-            zipf.write(pdf_path, arcname=pdf_filename)
-
-            # Clean up: remove the temporary DOCX and PDF files
-            os.remove(docx_path)
-            os.remove(pdf_path)
-
-    # Send the ZIP file to the user
-    return send_file(zip_path, as_attachment=True, download_name=zip_filename)
\ No newline at end of file
+    if not dist:
+        return jsonify({"error": f"Distribution '{distribution}' not found"}), 404
+
+    job = enqueue_distribution_reports(dist.name, current_user.id, renderer, profile)
+    return jsonify({"job_id": job.get_id()}), 202
+
+@data_bp.route("/api/report_jobs/<job_id>", methods=["GET"])
+@login_required
+def report_job_status_manager(job_id):
+    """
+    Return the status and progress of a report generation job.
+
+    :param job_id: The ID returned by download_docx_all.
+    :type job_id: str
+    :return: JSON object with the job "status", the "done"/"total" organizations and the "error" of a failed job.
+    :rtype: flask.Response
+    """
+    job = fetch_report_job(job_id)
+    if not job or job.meta.get("requested_by") != current_user.id:
+        return jsonify({"error": "Report job not found"}), 404
+    return jsonify(report_job_status(job)), 200
+
+@data_bp.route("/api/report_jobs/<job_id>/download", methods=["GET"])
+@login_required
+def download_report_job(job_id):
+    """
+    Send the ZIP produced by a finished report generation job.
+
+    :param job_id: The ID returned by download_docx_all.
+    :type job_id: str
+    :return: The ZIP file containing the PDF reports.
+    :rtype: flask.Response
+    """
+    job = fetch_report_job(job_id)
+    if not job or job.meta.get("requested_by") != current_user.id:
+        return jsonify({"error": "Report job not found"}), 404
+    zip_path = report_artifact_path(job)
+    if not zip_path:
+        return jsonify({"error": "Reports are not ready or have expired"}), 409
+    return send_file(os.path.abspath(zip_path), as_attachment=True, download_name=os.path.basename(zip_path))
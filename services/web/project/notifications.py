@@ -25,7 +25,7 @@ Flask endpoints:
 WebSocket events:
 
     connect --> handle_connect()
-        Registers a new WebSocket connection, sends initial notifications, and a confirmation message.
+        Registers a new WebSocket connection in its user's room, sends initial notifications, and a confirmation message.
 
     disconnect --> handle_disconnect()
         Removes a disconnected client from the list of connected clients.
@@ -49,6 +49,7 @@ Other functions:
 
     redis_listener(r)
         Listens to a Redis channel ("chat") for new messages and publishes them via WebSocket.
+        "[ANALYSIS COMPLETE]" messages also invalidate the cached distribution data (see response_cache).
 
 :author: Kevin
 :version: 0.0.1
@@ -58,9 +59,10 @@ Other functions:
 from flask import Blueprint, jsonify, request, current_app
 from flask_login import current_user, login_required
 from project.utils.sql_models import db, Notification
+from project.utils.response_cache import invalidate_from_message
 import os, redis
 from datetime import datetime
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
 
 # Create the blueprint
 notif_bp = Blueprint('notifications', __name__)
@@ -162,7 +164,8 @@ def redis_listener(r):
     Listen for messages on the Redis "chat" channel and publish them to connected clients.
 
     Subscribes to the "chat" channel on the provided Redis connection. For each message received,
-    decodes the message (if necessary) and calls publish_message_to_clients() to emit the message.
+    decodes the message (if necessary), drops the cached distribution data on "[ANALYSIS COMPLETE]" messages
+    and calls publish_message_to_clients() to emit the message.
 
     :param r: A Redis connection object.
     :type r: redis.Redis
@@ -174,6 +177,8 @@ def redis_listener(r):
             data = message["data"]
             if isinstance(data, bytes):
                 message_text = data.decode()
+                # Secondary path: launch_nextflow already dropped the cached responses of the distribution
+                invalidate_from_message(message_text)
                 publish_message_to_clients("chat", message_text)
 
 @socketio.on("connect")
@@ -182,7 +187,7 @@ def handle_connect():
     Handle a new WebSocket connection.
 
     Extracts the client's role and email from query parameters, stores them in the connected_clients dictionary,
-    retrieves the user's undismissed notifications from the database, and sends both a connection confirmation and
+    joins the room named after the email, retrieves the user's undismissed notifications from the database, and sends both a connection confirmation and
     the notifications to the client.
 
     """
@@ -191,6 +196,7 @@ def handle_connect():
     email = query_params.get("email", "unknown")
 
     connected_clients[request.sid] = {"role": role, "email": email}
+    join_room(email)  # Per-user room, for events emitted by the workers (e.g. report_progress)
     print(f"User connected: {email}, Role: {role}")
 
     # Fetch undismissed notifications from the database
@@ -11,13 +11,17 @@ based on distribution, organization, and sample, and notifications are sent via
 Flask endpoint:
     /api/upload --> upload_files()
         Accepts file uploads along with form data for sample, distribution, organization,
-        and sequencing type. Validates and saves files, enqueues a Nextflow workflow, and
-        creates a new Submission record.
+        and sequencing type. Validates and saves files, creates or updates the Submission record,
+        and enqueues a Nextflow workflow.
+
+Helper function:
+    save_submission(distribution, organization, user, sample, sequencing_type)
+        Creates or updates the Submission of a lab for a sample, safely against concurrent uploads.
 
 Task function:
     launch_nextflow(upload_dir, workflow_name="main.nf", params={})
-        Executes a Nextflow workflow on the uploaded files and publishes a completion message
-        to the Redis "chat" channel.
+        Executes a Nextflow workflow on the uploaded files, stores the parsed sample metrics and
+        publishes a completion message to the Redis "chat" channel.
 
 :author: Kevin
 :version: 0.0.1
@@ -28,8 +32,15 @@ from flask_login import current_user, login_required
 from project.utils.sql_models import db, User, Distribution, Organization, Submission
 import os, redis, gzip, pysam, shutil, subprocess
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
 from rq import Queue, Connection
+from project.utils.metrics_store import store_sample_metrics
+from project.utils.metrics_frame import write_metrics_snapshot
+from project.utils.report_cache import invalidate_distribution_reports
+from project.utils.references import REFERENCES_DIR
+from project.utils.samples import write_samples_file
+from project.utils.response_cache import invalidate_distribution_responses
 
 # Create the blueprint
 upload_bp = Blueprint('upload', __name__)
@@ -157,9 +168,6 @@ def upload_files():
         current_app.config["UPLOAD_FOLDER"], distribution, organization, sample
     )
 
-    samples_txt=os.path.join(
-        current_app.config["UPLOAD_FOLDER"], distribution,"samples.txt")
-
     # Check if the folder exists, and delete it if it does
     if os.path.exists(specific_upload_folder):
         shutil.rmtree(specific_upload_folder)
@@ -231,6 +239,25 @@ def upload_files():
     else:
         return jsonify({"error": "genomeLength.txt not found in the upload folder"}), 400
 
+    # Look up the organization and distribution of the submission
+    org_obj = Organization.query.filter_by(name=organization).first()
+    dist_obj = Distribution.query.filter_by(name=distribution).first()
+    user_obj = User.query.filter_by(email=current_user.id).first()
+    if not org_obj or not dist_obj:
+        return jsonify({"error": "Organization or distribution not found"}), 400
+
+    # Create or update the Submission record before the pipeline and the notifications refer to it
+    save_submission(dist_obj, org_obj, user_obj, sample, sequencing_type)
+
+    # The platform aggregates of the dashboard are read from the snapshot, which stores the sequencing type
+    try:
+        write_metrics_snapshot(dist_obj)
+    except Exception as e:
+        print(f"Warning: could not rebuild the metrics snapshot of {distribution}: {e}")
+
+    # Write the samples and references of the distribution for the pipeline
+    samples_txt = write_samples_file(dist_obj, os.path.join(current_app.config["UPLOAD_FOLDER"], distribution, "samples.txt"))
+
     # Enqueue task to process files and launch workflow asynchronously
     with Connection(redis.from_url(current_app.config["REDIS_URL"])):
         q = Queue()
@@ -240,23 +267,6 @@ def upload_files():
     r = redis.from_url(redis_url)
     r.publish("chat",f"[UPLOAD]{organization}'s upload of sample {sample} from distribution {distribution} has been completed.")
 
-    # Create and commit a new Submission record
-    org_obj = Organization.query.filter_by(name=organization).first()
-    dist_obj = Distribution.query.filter_by(name=distribution).first()
-    user_obj = User.query.filter_by(email=current_user.id).first()
-    if not org_obj or not dist_obj:
-        return jsonify({"error": "Organization or distribution not found"}), 400
-
-    submission = Submission(
-        user_id=user_obj.id,
-        organization_id=org_obj.id,
-        distribution_id=dist_obj.id,
-        sample=sample,
-        sequencing_type=sequencing_type
-    )
-    db.session.add(submission)
-    db.session.commit()
-
     # Return response with task information
     return jsonify({
         "message": "Files uploaded successfully, task queued.",
@@ -264,14 +274,52 @@ def upload_files():
         "task_id": task.get_id(),
     }), 201
 
+def save_submission(distribution, organization, user, sample, sequencing_type):
+    """
+    Create or update the Submission of a lab for a sample of a distribution, and commit it.
+
+    A lab has one submission per sample of a distribution (unique index on the submissions table). When two
+    uploads of the same lab and sample run concurrently, the second insert violates the index: it is rolled
+    back to its savepoint and the row inserted by the first upload is updated instead.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :param organization: The Organization of the submitting lab.
+    :type organization: Organization
+    :param user: The User who uploaded the files.
+    :type user: User
+    :param sample: Name of the sample.
+    :type sample: str
+    :param sequencing_type: Sequencing type declared at upload (e.g. "Illumina, ONT").
+    :type sequencing_type: str
+    :return: The stored submission.
+    :rtype: Submission
+    """
+    lookup = {"distribution_id": distribution.id, "organization_id": organization.id, "sample": sample}
+    values = {"user_id": user.id, "sequencing_type": sequencing_type, "submission_date": datetime.now()}
+    submission = Submission.query.filter_by(**lookup).first()
+    if submission is None:
+        try:
+            with db.session.begin_nested():
+                submission = Submission(**lookup, **values)
+                db.session.add(submission)
+        except IntegrityError:
+            # A concurrent upload of the same lab and sample inserted the row first
+            submission = Submission.query.filter_by(**lookup).first()
+    for key, value in values.items():
+        setattr(submission, key, value)
+    db.session.commit()
+    return submission
+
 # Task function for launching Nextflow
 def launch_nextflow(upload_dir, workflow_name="main.nf", params={}):
     """
     Run the Nextflow workflow on the uploaded files.
 
-    Constructs and executes a command to launch the Nextflow workflow. It logs the command,
-    captures the output, and publishes a message to the Redis "chat" channel when the workflow
-    is complete. Currently, only completion is published, not the specific status (success or fail).
+    Constructs and executes a command to launch the Nextflow workflow on the reference genomes of the registry
+    (see references.REFERENCES_DIR). It logs the command,
+    captures the output, stores the parsed metrics of the sample in the SampleMetrics table, drops the cached
+    reports and dashboard responses of the distribution and publishes a message to the Redis "chat" channel when the workflow is complete. Currently, only completion is published, not the specific status (success or fail).
 
     :param upload_dir: The directory containing the uploaded files.
     :type upload_dir: str
@@ -285,7 +333,8 @@ def launch_nextflow(upload_dir, workflow_name="main.nf", params={}):
     try:
         # Construct the command with escaped spaces
         cmd = " ".join([
-            "nextflow", "run", workflow_name, "--reads=" + params['reads'].replace(' ', '\\ ') + "/","--samples_txt=" + params['samples_txt'].replace(' ', '\\ '), "-resume"
+            "nextflow", "run", workflow_name, "--reads=" + params['reads'].replace(' ', '\\ ') + "/","--samples_txt=" + params['samples_txt'].replace(' ', '\\ '),
+            "--ref=" + REFERENCES_DIR.replace(' ', '\\ ') + "/", "-resume"
         ])
 
         print(cmd)
@@ -306,6 +355,20 @@ def launch_nextflow(upload_dir, workflow_name="main.nf", params={}):
             print(f"[{stderr_timestamp}] STDERR:\n{process.stderr}")
 
         distribution, organization, sample=upload_dir.split("/")[-3],upload_dir.split("/")[-2],upload_dir.split("/")[-1]
+
+        # Parse the outputs once and persist them, so endpoints do not re-read the files.
+        # A failure is logged and the completion still published: the files are read until the metrics are stored.
+        try:
+            if store_sample_metrics(distribution, organization, sample, upload_dir):
+                write_metrics_snapshot(Distribution.query.filter_by(name=distribution).first())
+        except Exception as e:
+            db.session.rollback()
+            print(f"[{datetime.now().isoformat()}] Failed to store the metrics of {organization}'s sample {sample} from {distribution}: {e}")
+
+        # Reports and dashboard responses computed from the previous results of the distribution are stale
+        invalidate_distribution_reports(distribution)
+        invalidate_distribution_responses(distribution)
+
         redis_url = current_app.config.get("REDIS_URL", "redis://localhost:6379/0")
         r = redis.from_url(redis_url)
         r.publish("chat", f"[ANALYSIS COMPLETE]{organization}'s analysis of sample {sample} from distribution {distribution} has been completed.")
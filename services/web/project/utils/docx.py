@@ -8,12 +8,6 @@ Functions:
     generate_two_plots(sample_name, sample_data, role)
         Generates two vertical bar plots from sample data: a percentage plot (stacked bars for Genome Coverage and Ns, and offset bars for Similarity) and a read coverage plot (black bars).
 
-    generate_aggregated_plot_by_platform(sample_name, sample_data)
-        Generates two vertical bar plots with aggregated (average) metrics by sequencing platform.
-
-    create_pygenometracks_plot(reference_genome, annotation, region, bed_path, bigwig_file, bigwig_consensus_file, output_dir, sample_name, user_lab)
-        Uses pyGenomeTracks to generate genome coverage plots.
-
     create_element(name)
         Creates an XML element for DOCX formatting.
 
@@ -23,9 +17,42 @@ Functions:
     add_page_number(run)
         Inserts a page number field in a DOCX document.
     
-    generate_docx_report(report_data, base_dir, role, user_lab, distribution)
+    lab_sample_reports(context, role, user_lab)
+        Returns the per-sample metrics shown in the report of a lab ("Others" aggregated for non-superusers).
+
+    lineage_statement(data, role, user_lab)
+        Summarises the lineage assignments of a sample against the reference lab.
+
+    quality_statements(data, role, user_lab)
+        Summarises which sequencing quality thresholds of a sample were met.
+
+    sorted_platform_metrics(context, sample, user_platforms)
+        Orders the per-platform averages of a sample, user platforms first.
+
+    platform_plot_images(context, sample, user_lab, role, vector=False)
+        Returns the platform plots of a sample as image bytes, from the fragment cache when possible.
+
+    add_cached_table(doc, context, sample, kind, inputs, build)
+        Appends a per-sample table to a document, from its cached OOXML when its inputs did not change.
+
+    has_genome_tracks(context, role, user_lab, sample)
+        Tells whether the report of a lab shows the genome tracks of a sample.
+
+    render_genome_tracks(context, sample, user_lab, vector=False)
+        Plots (or reuses the cached plot of) the coverage and variant tracks of a lab's sample, as image bytes.
+
+    report_template()
+        Returns the report template, restyled and with its header formatted (loaded once per process).
+
+    new_report_document(distribution, user_lab)
+        Returns a copy of the report template with the header of a lab's report filled in.
+
+    generate_docx_report(report_data, base_dir, role, user_lab, distribution, context=None, profile=DEFAULT_RENDER_PROFILE)
         Generates a DOCX report summarizing viric genome analysis results.
 
+    render_lab_report(context, role, user_lab)
+        Renders the DOCX report of one lab from the shared ReportContext of its distribution.
+
 :author: Kevin
 :version: 0.0.1
 :date: 2025-02-21
@@ -38,17 +65,26 @@ from docx import Document
 from docx.shared import Inches,Pt, Cm, RGBColor
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT, WD_BREAK, WD_COLOR_INDEX
 from docx.enum.table import WD_TABLE_ALIGNMENT, WD_ROW_HEIGHT_RULE
-from project.utils.sql_models import Distribution, Organization, Submission
+from project.utils.sql_models import Distribution
 from docx.enum.style import WD_STYLE_TYPE
 from docx.oxml import OxmlElement, ns, parse_xml
-from docx.oxml.ns import nsdecls, qn
-from project.utils.report_parser import process_all_reports
+from docx.oxml.ns import qn
+from project.utils.evaluation import subtype_assignment
+from project.utils.report_context import ReportContext
+from project.utils.genome_tracks import plot_genome_tracks
+from project.utils.references import get_reference, subtype_of
+from project.utils.render_profiles import DEFAULT_RENDER_PROFILE, figure_format
+from project.utils.report_cache import fragment_key, cached_fragment_path, store_fragment
+from project.utils.docx_tables import TableCell, add_table, row_cells
+from docx.table import Table
+from lxml import etree
 import matplotlib.pyplot as plt
 import numpy as np
 import os
-import subprocess
-import shutil
 import copy
+from functools import lru_cache
+
+TEMPLATE_PATH = "project/static/templateV4.docx"
 
 def generate_two_plots(sample_name, sample_data, role):
     """
@@ -64,8 +100,8 @@ def generate_two_plots(sample_name, sample_data, role):
     :type sample_data: dict
     :param role: User role (affects visualization style, if needed).
     :type role: str
-    :return: A tuple with the file paths of the generated percentage plot and read coverage plot.
-    :rtype: (str, str)
+    :return: A tuple with the generated percentage plot and read coverage plot, as PNG buffers (see docx.Document.add_picture).
+    :rtype: (BytesIO, BytesIO)
     """
     # Extract the lab names and anonymize them (for display)
     labs = list(sample_data.keys())
@@ -121,8 +157,8 @@ def generate_two_plots(sample_name, sample_data, role):
                bbox_to_anchor=(0.5, 1.2), ncol=2, fontsize=14, bbox_transform=ax1.transAxes)
     
     fig1.tight_layout()
-    percentage_plot_file = f"{sample_name}_percentage_plot.png"
-    plt.savefig(percentage_plot_file, dpi=300, bbox_inches="tight")
+    percentage_plot_file = BytesIO()
+    fig1.savefig(percentage_plot_file, format="png", dpi=300, bbox_inches="tight")
     plt.close(fig1)
     
     # Plot 2: Read Coverage Plot (Black Bars)
@@ -140,267 +176,12 @@ def generate_two_plots(sample_name, sample_data, role):
     ax2.legend(loc="upper center", bbox_to_anchor=(0.5, 1.2), fontsize=14)
     
     fig2.tight_layout()
-    read_coverage_plot_file = f"{sample_name}_read_coverage_plot.png"
-    plt.savefig(read_coverage_plot_file, dpi=300, bbox_inches="tight")
+    read_coverage_plot_file = BytesIO()
+    fig2.savefig(read_coverage_plot_file, format="png", dpi=300, bbox_inches="tight")
     plt.close(fig2)
     
     return percentage_plot_file, read_coverage_plot_file
 
-def generate_aggregated_plot_by_platform(sample_name, sample_data, user_lab, role):
-    """
-    Generates two vertical bar plots with aggregated (average) metrics by sequencing platform.
-    The first plot shows percentage metrics (stacked bars for Genome Coverage and Ns, with offset bars for Similarity).
-    The second plot shows Read Coverage as black bars.
-    The sequencing platform used by user_lab is highlighted by placing it first in the order.
-    
-    :param sample_name: The name of the sample, used for file naming.
-    :type sample_name: str
-    :param sample_data: Dictionary containing sample statistics for each lab.
-                        Each value is expected to be a dict with keys:
-                        "coverage", "similarity", "Ns", "Mean coverage depth", and "sequencing_platform".
-    :type sample_data: dict
-    :param user_lab: The lab identifier to highlight in the plot.
-    :type user_lab: str
-    :return: A tuple with the file paths of the generated percentage plot, read coverage plot, and the user platform.
-    :rtype: (str, str, str)
-    """
-    # Group data by sequencing platform
-    grouped = {}
-    annotation_label="Your Platform" if role=="user" else "Reference lab platform"
-    user_platforms = []  # Store user platforms (handles multiple entries)
-    for lab, metrics in sample_data.items():
-        platforms = metrics.get("sequencing_platform", "Unknown").split(",")  # Split into multiple platforms
-        platforms = [p.strip() for p in platforms]  # Remove whitespace
-
-        if lab == user_lab:
-            user_platforms=platforms  # Store user lab platforms
-
-        for platform in platforms:
-            if platform not in grouped:
-                grouped[platform] = {
-                    "coverage": [],
-                    "similarity": [],
-                    "Ns": [],
-                    "read_cov": []
-                }
-            grouped[platform]["coverage"].append(metrics["coverage"] * 100 if metrics["coverage"] != "N/A" else 0)
-            grouped[platform]["similarity"].append(metrics["similarity"] if metrics["similarity"] != "N/A" else 0)
-            grouped[platform]["Ns"].append(metrics["Ns"] if metrics["Ns"] != "N/A" else 0)
-            grouped[platform]["read_cov"].append(metrics["Mean coverage depth"] if metrics["Mean coverage depth"] != "N/A" else 0)
-    
-    # Reorder platforms: user's platform first (if found), then alphabetical.
-    all_platforms = list(grouped.keys())
-    matching_platforms = sorted([p for p in user_platforms if p in all_platforms])  # User platforms first
-    remaining_platforms = sorted([p for p in all_platforms if p not in user_platforms])  # Others alphabetically
-    sorted_platforms = matching_platforms + remaining_platforms  # Final order
-    
-    # Build lists for plotting and include the submission counts in labels.
-    platforms = []
-    platformNames = []
-    avg_coverage = []
-    avg_similarity = []
-    avg_ns = []
-    avg_read_cov = []
-    
-    for platform in sorted_platforms:
-        vals = grouped[platform]
-        count = len(vals["coverage"])
-        platforms.append(f"{platform} ({count})")
-        platformNames.append(platform)
-        avg_coverage.append(np.mean(vals["coverage"]))
-        avg_similarity.append(np.mean(vals["similarity"]))
-        avg_ns.append(np.mean(vals["Ns"]))
-        avg_read_cov.append(np.mean(vals["read_cov"]))
-    
-    # --------------------------
-    # Plot 1: Percentage Metrics Plot
-    # --------------------------
-    fig1, ax1 = plt.subplots(figsize=(16, 8))
-    bar_width = 0.3
-    x_pos = np.arange(len(platforms))
-    
-    # Stacked bars: Genome Coverage and Ns
-    ax1.bar(x_pos, avg_coverage, bar_width, label="Genome Coverage (%)", color="#1E3A5F", zorder=3)
-    ax1.bar(x_pos, avg_ns, bar_width, bottom=avg_coverage, label="Ns in Sequence (%)", color="#FBC02D", zorder=3)
-    # Offset bars for Similarity
-    ax1.bar(x_pos + bar_width, avg_similarity, bar_width, label="Similarity (%)", color="#F57C00", zorder=3)
-    
-    ax1.set_xlabel("Sequencing Platform", fontsize=18)
-    ax1.set_ylabel("Percentage (%)", fontsize=18)
-    ax1.set_xticks(x_pos + bar_width / 2)
-    ax1.set_xticklabels(platforms, rotation=45, ha="right", fontsize=16)
-    
-    # Optional horizontal thresholds
-    ax1.axhline(90, color="grey", linestyle="--", linewidth=1, zorder=-1)
-    ax1.axhline(95, color="blue", linestyle="--", linewidth=1, zorder=-1)
-
-    # Highlight the user_lab's sequencing platform
-    for i in user_platforms:
-        if i in platformNames:
-            index = platformNames.index(i)
-            ax1.annotate(
-                annotation_label, 
-                xy=(x_pos[index], max(avg_coverage[index] + avg_ns[index], avg_similarity[index]) + 5),
-                xytext=(x_pos[index], max(avg_coverage[index] + avg_ns[index], avg_similarity[index]) + 15),
-                arrowprops=dict(facecolor='red', arrowstyle="->"),
-                ha="center",
-                fontsize=14,
-                color="red"
-            )
-    
-    # Legend for percentage plot
-    handles1, labels1 = ax1.get_legend_handles_labels()
-    ax1.legend(handles=handles1, labels=labels1, loc="upper center", 
-               bbox_to_anchor=(0.5, 1.2), ncol=2, fontsize=14, bbox_transform=ax1.transAxes)
-    
-    fig1.tight_layout()
-    percentage_plot_file = f"{sample_name}_aggregated_percentage_plot.png"
-    plt.savefig(percentage_plot_file, dpi=300, bbox_inches="tight")
-    plt.close(fig1)
-    
-    # --------------------------
-    # Plot 2: Read Coverage Plot
-    # --------------------------
-    fig2, ax2 = plt.subplots(figsize=(16, 8))
-    bar_width2 = 0.5
-    x_pos2 = np.arange(len(platforms))
-    
-    ax2.bar(x_pos2, avg_read_cov, bar_width2, color="grey", label="Read Coverage (Mean)")
-    ax2.set_yscale("log")
-    ax2.axhline(50, color="red", linestyle="--", linewidth=1, zorder=-1)
-    ax2.set_xlabel("Sequencing Platform", fontsize=18)
-    ax2.set_ylabel("Read Coverage (Mean)", fontsize=18)
-    ax2.set_xticks(x_pos2)  # Explicitly set ticks before labels
-    ax2.set_xticklabels(platforms, rotation=45, ha="right", fontsize=16)
-    # Dynamically determine meaningful y-ticks
-    y_max = np.nanmax(avg_read_cov)
-    y_ticks = np.geomspace(50, y_max, num=6)  # Create log-spaced ticks
-    y_ticks = np.round(y_ticks, decimals=2)  # Round for better readability
-
-    # Set y-ticks using actual data values
-    ax2.set_yticks(y_ticks)
-    ax2.set_yticklabels([str(int(t)) if t >= 1 else f"{t:.2f}" for t in y_ticks], fontsize=14)
-
-    ax2.legend(loc="upper center", bbox_to_anchor=(0.5, 1.2), fontsize=14)
-
-    # Highlight the user_lab's sequencing platform
-    for user_platform in user_platforms:
-        if user_platform in platformNames:
-            index = platformNames.index(user_platform)
-            y_position = avg_read_cov[index] * 1.2 if avg_read_cov[index]>10 else 10 # Move slightly above the bar
-            y_text_position = avg_read_cov[index] * 2.5  if avg_read_cov[index]>10 else 20# Text even higher
-            ax2.annotate(
-                annotation_label,
-                xy=(x_pos2[index], y_position),  
-                xytext=(x_pos2[index], y_text_position),  
-                arrowprops=dict(facecolor='red', arrowstyle="->"),
-                ha="center",
-                fontsize=14,
-                color="red"
-            )
-            print(x_pos2[index], y_position)
-    
-    fig2.tight_layout()
-    read_coverage_plot_file = f"{sample_name}_aggregated_readcov_plot.png"
-    plt.savefig(read_coverage_plot_file, dpi=300, bbox_inches="tight")
-    plt.close(fig2)
-    
-    return percentage_plot_file, read_coverage_plot_file, user_platforms
-
-def create_pygenometracks_plot(reference_genome, annotation, region, bed_path, bigwig_file, bigwig_consensus_file, output_dir, sample_name, user_lab):
-    """
-    Generates a genome coverage plot using pyGenomeTracks for a specific user_lab.
-
-    Creates a tracks.ini file that configures:
-      - A reference track (FASTA),
-      - An annotation track (GFF3),
-      - A bigwig track (BigWig file).
-
-    :param reference_genome: Path to the reference genome FASTA file.
-    :type reference_genome: str
-    :param annotation: Path to the GFF3 annotation file.
-    :type annotation: str
-    :param region: Genomic region to visualize.
-    :type region: str
-    :param bed_path: Path to the BED file with sequence variants.
-    :type bed_path: str
-    :param bigwig_file: Path to the BigWig file containing read coverage data.
-    :type bigwig_file: str
-    :param bigwig_consensus_file: Path to the consensus BigWig file.
-    :type bigwig_consensus_file: str
-    :param output_dir: Directory where the plot and ini file will be saved.
-    :type output_dir: str
-    :param sample_name: Sample identifier.
-    :type sample_name: str
-    :param user_lab: User lab identifier.
-    :type user_lab: str
-    :return: File path of the generated coverage plot.
-    :rtype: str
-    """
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    tracks_ini = os.path.join(output_dir, f"{user_lab}_{sample_name}_tracks.ini")
-    plot_output = os.path.join(output_dir, f"{user_lab}_{sample_name}_coverage_plot.png")
-
-    # Create tracks.ini configuration with three sections:
-    # Reference, Annotation, and BigWig
-    tracks=f"""
-        [annotation]
-        file = {annotation}
-        title = {reference_genome.split("/")[-1].split(".")[0]} genes
-        prefered_name = gene_name
-        color = green
-        style = UCSC
-        height = 2
-        file_type = gtf
-        merge_transcripts = true
-
-        [bed]
-        file = {bed_path}
-        title = Seq. variants
-        color = purple
-        height = 3
-        file_type = bed
-
-        [bigwig]
-        file = {bigwig_consensus_file}
-        title = Seq. coverage
-        color = grey
-        height = 1
-        file_type = bigwig
-        """
-    # Only write the read coverage bigwig section if reads were uploaded
-    if bigwig_file!=None:
-            tracks+=f"""
-            
-        [bigwig]
-        file = {bigwig_file}
-        title = Read Coverage
-        color = blue
-        height = 3
-        file_type = bigwig
-        """
-    with open(tracks_ini, "w") as ini:
-        ini.write(tracks)
-
-    # Run pyGenomeTracks to generate the plot for the given region
-    command = [
-        "pyGenomeTracks",
-        "--tracks", tracks_ini,
-        "--region", region,
-        "--outFileName", plot_output,
-        "--dpi", str(300)
-    ]
-    
-    try:
-        subprocess.run(command, check=True)
-        return plot_output  # Return the path to the generated image
-    except subprocess.CalledProcessError as e:
-        print(f"Error generating plot: {e}")
-        return None
-
-
 def create_element(name):
     """
     Creates an XML element for use in DOCX formatting.
@@ -446,33 +227,521 @@ def add_page_number(run):
     run._r.append(instrText)
     run._r.append(fldChar2)
 
-def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
+def lab_sample_reports(context, role, user_lab):
+    """
+    Returns the per-sample metrics shown in the report of a lab.
+
+    Superusers see every participant. Other labs only see the samples they submitted, with their own metrics,
+    the averaged metrics and most frequent lineages of the other participants ("Others (<count>)") and the
+    reference lab's metrics ("Reference").
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :return: {sample: {participant: metrics}}, sorted by sample, each sample's participants ordered user lab first,
+        reference second.
+    :rtype: dict
+    """
+    sample_html_reports = context.sample_reports
+
+    # If the user is not a superuser, filter and aggregate data
+    if not role == "superuser":
+        processed_reports = {}
+        for sample_name, labs_data in sample_html_reports.items():
+            if user_lab not in labs_data:
+                continue  # Skip samples the user has no access to
+
+            user_metrics = labs_data[user_lab]
+            reference_metrics = labs_data.get("9999", {})  # Extract reference metrics
+            subtype_counts = {}
+            clade_counts = {}
+            g_clade_counts = {}
+
+            aggregated_metrics = {
+                "coverage": 0,
+                "Ns": 0,
+                "similarity": 0,
+                "Mean coverage depth": 0,
+                "lab_count": 0,
+                "clade": "",
+                "G_clade": "",
+                "subtype":""
+            }
+
+            # Aggregate data from other labs
+            for lab, metrics in labs_data.items():
+                if lab != user_lab and lab != "9999" and metrics["coverage"]!="N/A":  # Exclude user lab and reference lab
+                    aggregated_metrics["coverage"] += metrics["coverage"]
+                    aggregated_metrics["Ns"] += metrics["Ns"]
+                    aggregated_metrics["similarity"] += metrics["similarity"]
+                    if metrics["Mean coverage depth"]!="N/A":
+                        aggregated_metrics["Mean coverage depth"] += metrics["Mean coverage depth"]
+                    aggregated_metrics["lab_count"] += 1
+
+                    # Count clade occurrences
+                    clade = metrics.get("clade", "")
+                    subtype = metrics.get("subtype", "")
+                    g_clade = metrics.get("G_clade", "")
+                    if subtype:
+                        subtype_counts[subtype] = subtype_counts.get(subtype, 0) + 1
+                    if clade:
+                        clade_counts[clade] = clade_counts.get(clade, 0) + 1
+                    if g_clade:
+                        g_clade_counts[g_clade] = g_clade_counts.get(g_clade, 0) + 1
+
+            # Calculate averages
+            if aggregated_metrics["lab_count"] > 0:
+                aggregated_metrics["coverage"] = round(
+                    (aggregated_metrics["coverage"] / aggregated_metrics["lab_count"]), 2
+                )
+                aggregated_metrics["Ns"] = round(
+                    aggregated_metrics["Ns"] / aggregated_metrics["lab_count"], 2
+                )
+                aggregated_metrics["similarity"] = round(
+                    aggregated_metrics["similarity"] / aggregated_metrics["lab_count"], 2
+                )
+                aggregated_metrics["Mean coverage depth"] = round(
+                    aggregated_metrics["Mean coverage depth"] / aggregated_metrics["lab_count"], 2
+                )
+
+            # Determine the most frequent clades
+            if subtype_counts:
+                aggregated_metrics["subtype"] = max(subtype_counts, key=subtype_counts.get)
+            if clade_counts:
+                aggregated_metrics["clade"] = max(clade_counts, key=clade_counts.get)
+            if g_clade_counts:
+                aggregated_metrics["G_clade"] = max(g_clade_counts, key=g_clade_counts.get)
+
+            # Prepare processed data for the user
+            others_label="Others ("+str(aggregated_metrics["lab_count"])+")"
+            processed_reports[sample_name] = {
+                user_lab: user_metrics,
+                others_label: aggregated_metrics,
+                "Reference": reference_metrics
+            }
+
+        sample_html_reports = processed_reports
+
+    # Sort each sample's participants such that user_lab comes first, reference second
+    return {
+        sample: {
+            key: data[key]
+            for key in sorted(
+                data,
+                key=lambda k: (
+                    0 if k == user_lab else (1 if (k.lower() == "reference" or k=="9999") else 2),
+                    k
+                )
+            )
+        }
+        for sample, data in sorted(sample_html_reports.items())
+    }
+
+def lineage_statement(data, role, user_lab):
+    """
+    Returns the sentence summarising the lineage assignments of a sample against the reference lab.
+
+    :param data: Metrics of each participant for the sample (see lab_sample_reports).
+    :type data: dict
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :return: The summary sentence.
+    :rtype: str
+    """
+    # Extract Clade and G_clade assignments for the 'reference'
+    reference_clade = None
+    reference_g_clade = None
+    for lab, metrics in data.items():
+        if lab == '9999' or lab == 'Reference':  # Reference participant
+            reference_clade = metrics['clade']
+            reference_g_clade = metrics['G_clade']
+            break
+
+    if role=='superuser':
+        for lab, metrics in data.items():
+            if lab != '9999' and lab!='Reference':  # Exclude the reference itself
+                if metrics['clade'] != reference_clade or metrics['G_clade'] != reference_g_clade:
+                    return "Some participants' clade assignments differed from the reference lab."
+        return "All participants matched lineage assignments with reference lab."
+    if data[user_lab]['clade'] != reference_clade:
+        return "Your lab's lineage assignment does not match the reference lab's."
+    return "Your lab's lineage assignment matches the reference lab's."
+
+def quality_statements(data, role, user_lab):
+    """
+    Returns the sentences summarising which sequencing quality thresholds of a sample were met.
+
+    Superusers get one sentence per threshold listing the participants that failed it, other labs one sentence
+    per threshold about their own result.
+
+    :param data: Metrics of each participant for the sample (see lab_sample_reports).
+    :type data: dict
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :return: The four summary sentences (genome coverage, Ns, similarity, read coverage).
+    :rtype: list
+    """
+    def failed(metrics):
+        return (
+            metrics['coverage'] == 'N/A' or metrics['coverage'] < 0.90,
+            metrics['coverage'] == 'N/A' or metrics['Ns'] > 2,
+            metrics['coverage'] == 'N/A' or metrics['similarity'] < 95,
+            metrics['Mean coverage depth'] == 'N/A' or float(metrics['Mean coverage depth']) < 50,
+        )
+
+    if role == "superuser":
+        failed_labs = ([], [], [], [])
+        for lab, metrics in data.items():
+            for labs, lab_failed in zip(failed_labs, failed(metrics)):
+                if lab_failed:
+                    labs.append(lab)
+        failed_coverage, failed_ns, failed_similarity, failed_coverage_depth = failed_labs
+        return [
+            f"Participants {', '.join(failed_coverage)} failed to satisfy the threshold for genome coverage (90%)." if failed_coverage
+            else "All participants obtained sufficient genome coverage (90% or higher).",
+            f"Participants {', '.join(failed_ns)} failed to satisfy the threshold for Ns in Sequence (greater than 2%)." if failed_ns
+            else "All participants maintained Ns in Sequence within acceptable limits (2% or lower).",
+            f"Participants {', '.join(failed_similarity)} failed to satisfy the threshold for Similarity (95%)." if failed_similarity
+            else "All participants obtained sufficient Similarity (95% or higher).",
+            f"Participants {', '.join(failed_coverage_depth)} failed to satisfy the threshold for Read Coverage (Mean depth of 50)." if failed_coverage_depth
+            else "All participants obtained sufficient Read Coverage (Mean depth of 50 or higher).",
+        ]
+
+    user_failed_coverage, user_failed_ns, user_failed_similarity, user_failed_coverage_depth = failed(data[user_lab])
+    return [
+        "Failed to satisfy the threshold for genome coverage (90%)." if user_failed_coverage
+        else "Obtained sufficient genome coverage (90% or higher).",
+        "Failed to satisfy the threshold for Ns in Sequence (greater than 2%)." if user_failed_ns
+        else "Obtained sufficient Ns in Sequence (2% or lower).",
+        "Failed to satisfy the threshold for Similarity (95%)." if user_failed_similarity
+        else "Obtained sufficient Similarity (95% or higher).",
+        "Failed to satisfy the threshold for Read Coverage (Mean depth of 50)." if user_failed_coverage_depth
+        else "Obtained sufficient Read Coverage (Mean depth of 50 or higher).",
+    ]
+
+def sorted_platform_metrics(context, sample, user_platforms):
+    """
+    Orders the per-platform averages of a sample (precomputed in the context), user platforms first.
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param sample: Name of the sample.
+    :type sample: str
+    :param user_platforms: Sequencing platforms of the user lab.
+    :type user_platforms: list
+    :return: A dictionary keyed by sequencing platform with averaged metric values.
+    :rtype: dict
+    """
+    aggregated = context.platform_metrics[sample]
+    return {
+        key: aggregated[key]
+        for key in sorted(
+            aggregated,
+            key=lambda k: (
+                0 if any(user_p in k for user_p in user_platforms) else 1,  # User platforms first
+                k
+            )
+        )
+    }
+
+def platform_plot_images(context, sample, user_lab, role, vector=False):
+    """
+    Returns the platform plots of a sample (see platform_plots.SamplePlatformPlots), from the fragment cache when possible.
+
+    The plots only depend on the lab through its sequencing platforms (highlighted) and its role (annotation label),
+    so labs with the same plot variant share them.
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param sample: Name of the sample.
+    :type sample: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :param role: User role determining report formatting.
+    :type role: str
+    :param vector: Whether the output supports SVG figures (see render_profiles.figure_format).
+    :type vector: bool
+    :return: A tuple with the percentage plot, the read coverage plot (encoded as set by the render profile of the
+             context), and the user platforms.
+    :rtype: (bytes, bytes, list)
+    """
+    plots = context.platform_plots[sample]
+    key = fragment_key(list(plots.sample_data.items()), plots.variant(user_lab, role), context.profile)
+    kinds = ["platform_plot", "readcov_plot"]
+    image_format = figure_format(context.profile, vector)
+
+    cached = [cached_fragment_path(context.distribution, sample, kind, key, image_format) for kind in kinds]
+    if all(cached):
+        images = []
+        for cached_path in cached:
+            with open(cached_path, "rb") as f:
+                images.append(f.read())
+        return images[0], images[1], plots.user_platforms(user_lab)
+
+    percentage_plot, read_coverage_plot, user_platforms = plots.images(user_lab, role, vector)
+    for kind, image in zip(kinds, (percentage_plot, read_coverage_plot)):
+        store_fragment(context.distribution, sample, kind, key, image_format, lambda tmp_path, image=image: _write_bytes(tmp_path, image))
+    return percentage_plot, read_coverage_plot, user_platforms
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def add_cached_table(doc, context, sample, kind, inputs, build):
+    """
+    Appends a per-sample table to the document, from its cached OOXML when its inputs did not change.
+
+    :param doc: The Document object to add the table to.
+    :type doc: docx.Document
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param sample: Name of the sample.
+    :type sample: str
+    :param kind: Kind of table (e.g. "lineage_table"), part of the cache key.
+    :type kind: str
+    :param inputs: Everything the table is built from (JSON-serialisable, dictionaries as lists of items since their order matters).
+    :type inputs: list
+    :param build: Function adding the table to the document it is given and returning it, called on a cache miss.
+    :type build: callable
+    :return: The added table.
+    :rtype: docx.table.Table
+    """
+    key = fragment_key(kind, inputs)
+    path = cached_fragment_path(context.distribution, sample, kind, key, "xml")
+    if path:
+        with open(path, "rb") as f:
+            tbl = parse_xml(f.read())
+        doc.element.body._insert_tbl(tbl)
+        return Table(tbl, doc._body)
+
+    table = build(doc)
+    xml = etree.tostring(table._tbl)
+    store_fragment(context.distribution, sample, kind, key, "xml", lambda tmp_path: _write_bytes(tmp_path, xml))
+    return table
+
+def has_genome_tracks(context, role, user_lab, sample):
+    """
+    Tells whether the report of a lab shows the genome tracks of a sample (labs only, when reads were submitted).
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :param sample: Name of the sample.
+    :type sample: str
+    :rtype: bool
+    """
+    return role != "superuser" and os.path.isfile(os.path.join(f"{context.base_dir}/{user_lab}/{sample}", f"{user_lab}_{sample}.bw"))
+
+def render_genome_tracks(context, sample, user_lab, vector=False):
+    """
+    Plots the coverage and variant tracks of a lab's sample (see genome_tracks.plot_genome_tracks), read in place
+    from the pipeline outputs.
+    The plot is cached as a report fragment, keyed on the size and modification time of the track files.
+    Its resolution and encoding follow the render profile of the context.
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param sample: Name of the sample.
+    :type sample: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :param vector: Whether the output supports SVG figures (see render_profiles.figure_format).
+    :type vector: bool
+    :return: The encoded plot.
+    :rtype: bytes
+    """
+    sample_reference_map = context.sample_reference_map
+    sample_dir = f"{context.base_dir}/{user_lab}/{sample}"
+    bigwig_file_path = os.path.join(sample_dir, f"{user_lab}_{sample}.bw")
+    bigwig_consensus_file_path = os.path.join(sample_dir, f"{user_lab}_{sample}_consensus.bw")
+    bed_path = os.path.join(sample_dir, f"{user_lab}_{sample}_mutations.bed")
+    track_files = [bigwig_file_path, bigwig_consensus_file_path, bed_path]
+    key = fragment_key(user_lab, sample_reference_map[sample], context.profile, [(os.path.getsize(f), os.stat(f).st_mtime_ns) if os.path.exists(f) else None for f in track_files])
+    image_format = figure_format(context.profile, vector)
+    cached = cached_fragment_path(context.distribution, sample, "genome_tracks", key, image_format)
+    if cached:
+        with open(cached, "rb") as f:
+            return f.read()
+
+    reference = get_reference(sample_reference_map[sample])
+    plot = plot_genome_tracks(reference.annotation, reference.region, bed_path, bigwig_file_path if os.path.exists(bigwig_file_path) else None,
+                              bigwig_consensus_file_path, context.profile, vector)
+    store_fragment(context.distribution, sample, "genome_tracks", key, image_format, lambda tmp_path: _write_bytes(tmp_path, plot))
+    return plot
+
+
+@lru_cache(maxsize=None)
+def report_template():
+    """
+    Returns the report template, loaded once per process: Heading 1/2/3 restyled and the header table formatted,
+    with everything but the lab and distribution filled in. Reports are built on copies of it (see new_report_document).
+
+    :return: The prototype of the reports, not to be modified.
+    :rtype: docx.Document
+    """
+    doc = Document(TEMPLATE_PATH)
+
+    # Create or update Heading 1 style
+    styles = doc.styles
+    try:
+        heading1 = styles['Heading 1']
+    except KeyError:
+        heading1 = styles.add_style('Heading 1', WD_STYLE_TYPE.PARAGRAPH)
+    heading1.font.name = 'Arial'
+    heading1.font.size = Pt(14)
+    heading1.font.bold = True
+    heading1.font.color.rgb = RGBColor(0x00, 0x33, 0x66)  # Dark blue
+
+    # Create or update Heading 2 style
+    try:
+        heading2 = styles['Heading 2']
+    except KeyError:
+        heading2 = styles.add_style('Heading 2', WD_STYLE_TYPE.PARAGRAPH)
+    heading2.font.name = 'Arial'
+    heading2.font.size = Pt(12)
+    heading2.font.bold = True
+    heading2.font.color.rgb = RGBColor(0x33, 0x66, 0x99)  # Medium blue
+
+    # Create or update Heading 3 style
+    try:
+        heading3 = styles['Heading 3']
+    except KeyError:
+        heading3 = styles.add_style('Heading 3', WD_STYLE_TYPE.PARAGRAPH)
+    heading3.font.name = 'Arial'
+    heading3.font.size = Pt(9)
+    heading3.font.bold = True
+    heading3.font.color.rgb = RGBColor(0x66, 0x99, 0xCC)  # Lighter blue
+
+    # Access the header
+    header = doc.sections[0].header
+
+    # Retrieve the first table in the header (assumes your template already has one)
+    table = header.tables[0]
+
+
+    # --- Populate the content cells ---
+    # Row 0 (content row), the lab is added by new_report_document
+    cell = table.cell(0, 2).paragraphs[0].add_run("WHO RSV Sequencing EQA")
+
+    # Row 2 (content row)
+    # Create a paragraph in the cell for the distribution text, its bold value is added by new_report_document.
+    dist_cell = table.cell(2, 2)
+    dist_paragraph = dist_cell.paragraphs[0]
+    dist_paragraph.clear()  # Clear previous content if any
+    run_label = dist_paragraph.add_run("Distribution : ")
+
+
+    # Row 4 (content row)
+    current_date = datetime.datetime.now().strftime("%d-%b-%Y")
+    cell = table.cell(4, 2).paragraphs[0].add_run(f"Dispatch Date : 17-Jun-2024")#{current_date}
+
+    # --- Set column widths ---
+    table.autofit = False
+    table.columns[0].width = Cm(4.71)  # Logo (merged) column
+    table.columns[1].width = Cm(0.18)    # Blank separator
+    table.columns[2].width = Cm(10.18)   # First content column
+    table.columns[3].width = Cm(0.18)    # Blank separator
+    table.columns[4].width = Cm(4.71)    # Second content column
+
+    # --- Set row heights ---
+    for row_idx in [0, 2, 4]:
+        row = table.rows[row_idx]
+        row.height = Cm(0.71)
+        row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
+    for row_idx in [1, 3]:
+        row = table.rows[row_idx]
+        
+        
+        row.height = Cm(0.11)
+        row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
+
+    # --- Optionally, adjust cell alignment and apply custom borders ---
+    for row in table.rows:
+        for cell in row.cells:
+            for paragraph in cell.paragraphs:
+                paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
+    return doc
+
+def new_report_document(distribution, user_lab):
+    """
+    Returns a copy of the report template (see report_template) with the header of a lab's report filled in.
+
+    Copying the parsed package is several times faster than opening the template, and the styles and
+    header are already set up.
+
+    :param distribution: Name of the distribution.
+    :type distribution: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :return: The document to build the report on.
+    :rtype: docx.Document
+    """
+    doc = copy.deepcopy(report_template())
+    table = doc.sections[0].header.tables[0]
+    table.cell(0, 4).paragraphs[0].add_run(f"Laboratory : {user_lab}")
+    run_value = table.cell(2, 2).paragraphs[0].add_run(f"{distribution}")
+    run_value.bold = True
+    return doc
+
+
+def generate_docx_report(report_data, base_dir, role, user_lab, distribution, context=None, profile=DEFAULT_RENDER_PROFILE):
+    """
+    Generates a DOCX report summarizing genomic analysis results for a given distribution.
+
+    The report includes sample statistics, visualizations, and formatted text.
+
+    :param report_data: Processed data containing genomic viral analysis results (see metrics_store.load_report_data).
+        If None, the stored metrics of the distribution are loaded.
+    :type report_data: dict or None
+    :param base_dir: Base directory containing report-related files.
+    :type base_dir: str
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :param distribution: The distribution to .
+    :type distribution: str
+    :param context: Data shared by the reports of the distribution, when generating the reports of several labs.
+        If None, it is built from report_data.
+    :type context: ReportContext or None
+    :param profile: Render profile of the figures (see render_profiles), used when the context is built here.
+    :type profile: str
+    :return: the generated DOCX report.
+    :rtype: docx
+    """
+    if context is None:
+        dist = Distribution.query.filter_by(name=str(base_dir.split("/")[1])).first()
+        context = ReportContext(dist, report_data, profile)
+    return render_lab_report(context, role, user_lab)
+
+def render_lab_report(context, role, user_lab):
     """
-    Generates a DOCX report summarizing genomic analysis results for a given distribution.
+    Renders the DOCX report of one lab from the shared data of its distribution.
 
-    The report includes sample statistics, visualizations, and formatted text.
+    Only the lab-specific parts (header, evaluation rows, "Others" aggregates, highlights and genome tracks)
+    are computed here; metrics, references, platforms and evaluation indicators come from the context.
 
-    :param report_data: Processed data containing genomic viral analysis results.
-    :type report_data: dict
-    :param base_dir: Base directory containing report-related files.
-    :type base_dir: str
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
     :param role: User role determining report formatting.
     :type role: str
     :param user_lab: User lab identifier.
     :type user_lab: str
-    :param distribution: The distribution to .
-    :type distribution: str
     :return: the generated DOCX report.
     :rtype: docx
     """
-    report_data = process_all_reports(base_dir)
-    distribution=str(base_dir.split("/")[1])
-    samples_file = f"{base_dir}/samples.txt"
-    sample_reference_map = {}
-    with open(samples_file, "r") as f:
-        for line in f:
-            sample_id, reference = line.strip().split()
-            sample_reference_map[sample_id] = reference
+    distribution = context.distribution
+    sample_reference_map = context.sample_reference_map
 
     from docx.oxml import OxmlElement, ns
 
@@ -554,375 +823,51 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         paragraph._p.append(hyperlink)
         return hyperlink
 
-    # Load the existing template
-    doc = Document("project/static/templateV4.docx")
+    # Copy of the template, restyled and with the lab and distribution in its header
+    doc = new_report_document(distribution, user_lab)
     table_count=1
     figure_count=1
 
-    # Create or update Heading 1 style
-    styles = doc.styles
-    try:
-        heading1 = styles['Heading 1']
-    except KeyError:
-        heading1 = styles.add_style('Heading 1', WD_STYLE_TYPE.PARAGRAPH)
-    heading1.font.name = 'Arial'
-    heading1.font.size = Pt(14)
-    heading1.font.bold = True
-    heading1.font.color.rgb = RGBColor(0x00, 0x33, 0x66)  # Dark blue
-
-    # Create or update Heading 2 style
-    try:
-        heading2 = styles['Heading 2']
-    except KeyError:
-        heading2 = styles.add_style('Heading 2', WD_STYLE_TYPE.PARAGRAPH)
-    heading2.font.name = 'Arial'
-    heading2.font.size = Pt(12)
-    heading2.font.bold = True
-    heading2.font.color.rgb = RGBColor(0x33, 0x66, 0x99)  # Medium blue
-
-    # Create or update Heading 3 style
-    try:
-        heading3 = styles['Heading 3']
-    except KeyError:
-        heading3 = styles.add_style('Heading 3', WD_STYLE_TYPE.PARAGRAPH)
-    heading3.font.name = 'Arial'
-    heading3.font.size = Pt(9)
-    heading3.font.bold = True
-    heading3.font.color.rgb = RGBColor(0x66, 0x99, 0xCC)  # Lighter blue
-
-    # Access the header
-    header = doc.sections[0].header
-
-    # Retrieve the first table in the header (assumes your template already has one)
-    table = header.tables[0]
-
-
-    # --- Populate the content cells ---
-    # Row 0 (content row)
-    cell = table.cell(0, 2).paragraphs[0].add_run("WHO RSV Sequencing EQA")
-    cell = table.cell(0, 4).paragraphs[0].add_run(f"Laboratory : {user_lab}")
-
-    # Row 2 (content row)
-    # Create a paragraph in the cell and set the run to bold for the distribution text.
-    dist_cell = table.cell(2, 2)
-    dist_paragraph = dist_cell.paragraphs[0]
-    dist_paragraph.clear()  # Clear previous content if any
-    run_label = dist_paragraph.add_run("Distribution : ")
-    run_value = dist_paragraph.add_run(f"{distribution}")
-    run_value.bold = True
-
-
-    # Row 4 (content row)
-    current_date = datetime.datetime.now().strftime("%d-%b-%Y")
-    cell = table.cell(4, 2).paragraphs[0].add_run(f"Dispatch Date : 17-Jun-2024")#{current_date}
-
-    # --- Set column widths ---
-    table.autofit = False
-    table.columns[0].width = Cm(4.71)  # Logo (merged) column
-    table.columns[1].width = Cm(0.18)    # Blank separator
-    table.columns[2].width = Cm(10.18)   # First content column
-    table.columns[3].width = Cm(0.18)    # Blank separator
-    table.columns[4].width = Cm(4.71)    # Second content column
-
-    # --- Set row heights ---
-    for row_idx in [0, 2, 4]:
-        row = table.rows[row_idx]
-        row.height = Cm(0.71)
-        row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
-    for row_idx in [1, 3]:
-        row = table.rows[row_idx]
-        
-        
-        row.height = Cm(0.11)
-        row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
-
-    # --- Optionally, adjust cell alignment and apply custom borders ---
-    for row in table.rows:
-        for cell in row.cells:
-            for paragraph in cell.paragraphs:
-                paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-
-
-    def subtype_assignment(user_subtype, intended_subtype):
-        if user_subtype=="original":
-            return intended_subtype
-        elif user_subtype=="alternative":
-            return "RSV-B" if intended_subtype=="RSV-A" else "RSV-A"
-        return user_subtype  
-
-    sample_html_reports = {}
-
-    for lab, samples in report_data.items():
-        for sample_name, metrics in samples.items():
-            if sample_name not in sample_html_reports:
-                sample_html_reports[sample_name] = {}
-            submission = (
-                Submission.query
-                .join(Organization)
-                .filter(
-                    Distribution.name == distribution,
-                    Submission.sample == sample_name,
-                    Organization.name == lab
-                )
-                .first()
-            )
-            if submission:
-                seq_type = submission.sequencing_type
-            else:
-                seq_type = "N/A"
-            sample_html_reports[sample_name][lab] = metrics
-            sample_html_reports[sample_name][lab]["sequencing_platform"]=seq_type
-
-    sample_html_reports = dict(sorted(sample_html_reports.items()))
-    print(sample_html_reports)
-
-    def compute_evaluation_data(sample_html_reports, sample_reference_map, user_lab):
-        """Computes evaluation data from sample reports."""
-        
-        evaluation_data = {"RSV_Subtyping": [], "Clade":[],"Legacy_clade":[], "Genome Coverage (%)": [],"Ns in Sequence (%)": [], "Similarity (%)": [],"Read Coverage (mean)": []}
-        for sample_name, lab_data in sample_html_reports.items():
-            lab_count = 0
-            lab_pass = 0
-            reference_metrics = lab_data.get("9999", {})  # Extract reference metrics
-            user_metrics = lab_data.get(user_lab, {})  # Extract user metrics
-            if user_metrics=={}:
-                continue
-            #subtype
-            intended_subtype = "RSV-B" if sample_reference_map[sample_name]=="EPI_ISL_1653999" else "RSV-A"
-            print(sample_name)
-            print("intended_subtype ", intended_subtype)  
-            reference_subtype = subtype_assignment(reference_metrics['subtype'], intended_subtype)
-            print("reference_metrics['subtype'] ", reference_metrics['subtype'])
-            print("reference_subtype ", reference_subtype)
-            user_subtype = subtype_assignment(user_metrics['subtype'], intended_subtype)
-            print("user_metrics['subtype'] ", user_metrics['subtype'])
-            print("user_subtype ", user_subtype)
-            for lab, metrics in lab_data.items():
-                if lab==user_lab or lab == "9999":
-                    continue
-                elif metrics["coverage"]=="N/A":
-                    lab_count+=1
-                else:
-                    lab_count+=1
-                    if metrics["subtype"]=="original":
-                        lab_pass+=1
-            subtyping=[sample_name, user_subtype, intended_subtype, reference_subtype, "Met" if user_subtype == intended_subtype else "Not met", f"{lab_pass}/{lab_count} ({(lab_pass * 100) // lab_count}%)"]
-            evaluation_data["RSV_Subtyping"].append(subtyping)    
-            
-            #clade
-            lab_count = 0
-            lab_pass = 0
-            intended_clade = reference_metrics["clade"]
-            reference_clade = intended_clade
-            user_clade = user_metrics["clade"]
-            for lab, metrics in lab_data.items():
-                if lab==user_lab or lab == "9999":
-                    continue
-                elif metrics["coverage"]=="N/A":
-                    lab_count+=1
-                else:
-                    lab_count+=1
-                    if metrics["clade"]==intended_clade:
-                        lab_pass+=1
-            clade=[sample_name, user_clade, intended_clade, reference_clade, "Met" if user_clade == intended_clade else "Not met", f"{lab_pass}/{lab_count} ({(lab_pass * 100) // lab_count}%)"]
-            evaluation_data["Clade"].append(clade)  
-
-            #g_clade
-            lab_count = 0
-            lab_pass = 0
-            intended_clade = reference_metrics["G_clade"]
-            reference_clade = intended_clade
-            user_clade = user_metrics["G_clade"]
-            for lab, metrics in lab_data.items():
-                if lab==user_lab or lab == "9999":
-                    continue
-                else:
-                    lab_count+=1
-                    if metrics["G_clade"]==intended_clade:
-                        lab_pass+=1
-            g_clade=[sample_name, user_clade, intended_clade, reference_clade, "Met" if user_clade == intended_clade else "Not met", f"{lab_pass}/{lab_count} ({(lab_pass * 100) // lab_count}%)"]
-            evaluation_data["Legacy_clade"].append(g_clade)
-
-            def format_IQR_string(aggregated_metrics):
-                if not aggregated_metrics:  # Handle empty list case
-                    return "N/A"
-
-                mean_value = round(np.mean(aggregated_metrics))  # Compute mean and round
-                q1, q3 = np.percentile(aggregated_metrics, [25, 75])  # Compute Q1 and Q3
-                q1, q3 = round(q1), round(q3)  # Round percentiles
-                
-                return f"{mean_value} ({q1}-{q3})"
-
-            #genome_coverage (these four loops could be better refactored into one)
-            lab_count = 0
-            lab_pass = 0
-            reference_coverage = reference_metrics["coverage"]*100
-            user_coverage = user_metrics["coverage"]*100 
-            aggregated_metrics = []
-            for lab, metrics in lab_data.items():
-                if lab==user_lab or lab == "9999":
-                    continue
-                elif metrics["coverage"]=="N/A":
-                    lab_count+=1
-                else:
-                    print(metrics["coverage"])
-                    lab_count+=1
-                    aggregated_metrics.append(metrics["coverage"]*100)
-                    if metrics["coverage"]>0.90:
-                        lab_pass+=1
-            coverage=[sample_name, round(user_coverage,1) if user_metrics["coverage"]!="N/A" else "N/A", "90% or higher", round(reference_coverage,1), "Met" if user_metrics["coverage"]!="N/A" and user_coverage >90 else "Not met", format_IQR_string(aggregated_metrics), f"{lab_pass}/{lab_count} ({(lab_pass * 100) // lab_count}%)"]
-            evaluation_data["Genome Coverage (%)"].append(coverage)
-
-            #Ns
-            lab_count = 0
-            lab_pass = 0
-            reference_n = reference_metrics["Ns"]
-            user_n = user_metrics["Ns"]
-            aggregated_metrics = []
-            for lab, metrics in lab_data.items():
-                if lab==user_lab or lab == "9999":
-                    continue
-                elif metrics["coverage"]=="N/A":
-                    lab_count+=1
-                else:
-                    lab_count+=1
-                    aggregated_metrics.append(metrics["Ns"])
-                    if metrics["Ns"]<=2:
-                        lab_pass+=1
-            ns=[sample_name, round(user_n,1) if user_n!="N/A" else "N/A", "2% or lower", round(reference_n,1), "Met" if user_n!="N/A" and user_n <=2 else "Not met", format_IQR_string(aggregated_metrics), f"{lab_pass}/{lab_count} ({(lab_pass * 100) // lab_count}%)"]
-            evaluation_data["Ns in Sequence (%)"].append(ns)
-
-            #similarity
-            lab_count = 0
-            lab_pass = 0
-            reference_similarity = reference_metrics["similarity"]
-            user_similarity = user_metrics["similarity"]
-            aggregated_metrics = []
-            for lab, metrics in lab_data.items():
-                if lab==user_lab or lab == "9999":
-                    continue
-                elif metrics["coverage"]=="N/A":
-                    lab_count+=1
-                else:
-                    lab_count+=1
-                    aggregated_metrics.append(metrics["similarity"])
-                    if metrics["similarity"]>95:
-                        lab_pass+=1
-            similarity=[sample_name, round(user_similarity,1) if user_similarity!="N/A" else "N/A", "95% or higher", round(reference_similarity,1), "Met" if user_similarity!="N/A" and user_similarity >95 else "Not met", format_IQR_string(aggregated_metrics), f"{lab_pass}/{lab_count} ({(lab_pass * 100) // lab_count}%)"]
-            evaluation_data["Similarity (%)"].append(similarity)
-
-            #Mean coverage depth
-            lab_count = 0
-            lab_pass = 0
-            reference_coverage = reference_metrics["Mean coverage depth"]
-            user_coverage = round(user_metrics["Mean coverage depth"],0) if user_metrics["Mean coverage depth"]!="N/A" else "N/A"
-            aggregated_metrics = []
-            for lab, metrics in lab_data.items():
-                if lab==user_lab or lab == "9999":
-                    continue
-                elif metrics["Mean coverage depth"]=="N/A":
-                    lab_count+=1
-                else:
-                    lab_count+=1
-                    aggregated_metrics.append(metrics["Mean coverage depth"])
-                    if metrics["Mean coverage depth"]>50:
-                        lab_pass+=1
-            coverage=[sample_name, user_coverage, "50 or higher", round(reference_coverage,0), "Met" if user_coverage!="N/A" and user_coverage >50 else "Not met", format_IQR_string(aggregated_metrics), f"{lab_pass}/{lab_count} ({(lab_pass * 100) // lab_count}%)"]
-            evaluation_data["Read Coverage (mean)"].append(coverage)
-        return evaluation_data
-
 
     def add_evaluation_tables(doc, evaluation_data, run_id="WR024", role="user"):
         """Adds RSV Evaluation and Sequencing Quality tables to the DOCX report with transposed format."""
 
-        def apply_color(run, text):
-            """Apply color coding for pass/fail."""
-            run.text = text
-            if text.lower() == "Met":
-                run.font.color.rgb = RGBColor(0, 128, 0)  # Green
-            elif text.lower() == "Not met":
-                run.font.color.rgb = RGBColor(255, 0, 0)  # Red
-
-        def apply_background_color(cell, color_rgb):
-            """Apply background color to a table cell."""
-            # Create the XML shading element and apply it to the cell
-            cell._element.get_or_add_tcPr().append(parse_xml(r'<w:shd {} w:fill="{}"/>'.format(nsdecls('w'), color_rgb)))
-
-        def apply_font_size(cell, size_pt):
-            """Apply a smaller font size to a table cell."""
-            for paragraph in cell.paragraphs:
-                for run in paragraph.runs:
-                    run.font.size = Pt(size_pt)
+        indicator_labels = {
+            "RSV_Subtyping": "RSV Subtyping",
+            "Clade": "Lineage",
+            "Legacy_clade": "Legacy lineage",
+        }
+
+        def indicator_rows(indicator, label, color, columns):
+            """Rows of an indicator, the first cell merged vertically over them and every cell shaded with the indicator colour."""
+            rows = evaluation_data[indicator]
+            table_rows = []
+            for i, row in enumerate(rows):
+                first_cell = TableCell(label if i == 0 else None, fill=color, size=9,
+                                       vmerge=None if len(rows) == 1 else "restart" if i == 0 else "continue")
+                table_rows.append([first_cell] + row_cells(columns(row), fill=color, size=9))
+            return table_rows
 
-        
         if role=="user":
             # Table Summary: RSV Subtyping and Clade Assignment
-            table1 = doc.add_table(rows=1, cols=7)  # 7 Columns: Indicator, Specimen ID, Your result, Intended, Reference, Score, Participants
-            table1.style = "Table Grid"
-            table1.alignment = WD_TABLE_ALIGNMENT.CENTER
-
-            # Table 1 Header
-            hdr_cells = table1.rows[0].cells
+            # 7 Columns: Indicator, Specimen ID, Your result, Intended, Reference, Score, Participants
             headers = ["Indicator", "Specimen ID", "Your result", "Intended Result", "Reference Lab result", "Your score", "Participant with intended results"]
+            columns = lambda row: [str(row[0]), row[1] or "", row[2] or "", row[3] or "", row[4], row[5]]
         else:
             # Table Summary: RSV Subtyping and Clade Assignment
-            table1 = doc.add_table(rows=1, cols=5)
-            table1.style = "Table Grid"
-            table1.alignment = WD_TABLE_ALIGNMENT.CENTER
-
-            # Table 1 Header
-            hdr_cells = table1.rows[0].cells
             headers = ["Indicator", "Specimen ID", "Intended Result", "Reference Lab result", "Participant with intended results"]
-        for i, text in enumerate(headers):
-            hdr_cells[i].text = text
-            hdr_cells[i].paragraphs[0].runs[0].bold = True
-            hdr_cells[i].paragraphs[0].runs[0].font.size = Pt(9)  # Slightly smaller font size
-
-        # Apply background color to the header row (light grey)
-        for cell in hdr_cells:
-            apply_background_color(cell, "D3D3D3")  # Light grey background
+            columns = lambda row: [str(row[0]), row[1] or "", row[3] or "", row[5]]
 
-        # Populate Table 1 with merged Indicator cells and color rows differently
+        # Header row with a light grey background, then the rows of each indicator with a merged Indicator cell and their own colour
         indicator_colors = {
             "RSV_Subtyping": "FFDDC1",  # Light pink
             "Clade": "D1E8E2",  # Light teal
             "Legacy_clade": "E2D1E8",  # Light purple
         }
-
+        table1_rows = [row_cells(headers, fill="D3D3D3", bold=True, size=9)]
         for indicator in ["RSV_Subtyping", "Clade", "Legacy_clade"]:
-            rows = evaluation_data[indicator]
-            first_cell = None
-            row_color = indicator_colors.get(indicator, "FFFFFF")  # Default to white if not found
-
-            for i, row in enumerate(rows):
-                row_cells = table1.add_row().cells
-                if i == 0:
-                    first_cell = row_cells[0]  # Store first cell for merging
-                    if indicator=="RSV_Subtyping":
-                        first_cell.text = "RSV Subtyping"
-                    elif indicator=="Clade":
-                        first_cell.text = "Lineage"
-                    elif indicator=="Legacy_clade":
-                        first_cell.text = "Legacy lineage"
-                else:
-                    row_cells[0]._tc.merge(first_cell._tc)  # Merge vertically
-
-                row_cells[1].text = str(row[0])
-                if role=="user":  
-                    row_cells[2].text = row[1] if row[1] else ""  
-                    row_cells[3].text = row[2] if row[2] else ""  
-                    row_cells[4].text = row[3] if row[3] else ""  
-                    apply_color(row_cells[5].paragraphs[0].add_run(), row[4])  
-                    row_cells[6].text = row[5]
-                else:
-                    row_cells[2].text = row[1] if row[1] else ""    
-                    row_cells[3].text = row[3] if row[3] else ""   
-                    row_cells[4].text = row[5]
-
-                # Apply background color and smaller font size to each row under the current indicator
-                for cell in row_cells:
-                    apply_background_color(cell, row_color)  # Apply unique color per indicator
-                    apply_font_size(cell, 9)  # Set font size to 6 pt for the row
+            table1_rows += indicator_rows(indicator, indicator_labels[indicator], indicator_colors.get(indicator, "FFFFFF"), columns)
+        add_table(doc, table1_rows, len(headers), alignment="center")
         doc.add_paragraph()
         doc.add_paragraph()
             # Create a table with one row and one cell
@@ -979,57 +924,21 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         doc.add_heading("Table 1: Sequencing Quality", level=2)
 
         if role=="user":
-            table2 = doc.add_table(rows=1, cols=8)  # 8 Columns: Indicator, Specimen ID, Your result, Recommended, Reference, Score, Mean (IQR), Participants meeting threshold
-            table2.style = "Table Grid"
-            table2.alignment = WD_TABLE_ALIGNMENT.CENTER
-
-            # Create the first header row
-            table2_header = table2.rows[0].cells
-            headers = ["Indicator", "Specimen ID", "Your result", "Recommended Value*", "Reference Lab result", "Your score", "Participant summary"]
-        else:
-            table2 = doc.add_table(rows=1, cols=6) 
-            table2.style = "Table Grid"
-            table2.alignment = WD_TABLE_ALIGNMENT.CENTER
-
-            # Create the first header row
-            table2_header = table2.rows[0].cells
-            headers = ["Indicator", "Specimen ID", "Recommended Value*", "Reference Lab result", "Participant summary"]
-        for i, text in enumerate(headers):
-            table2_header[i].text = text
-            table2_header[i].paragraphs[0].runs[0].bold = True
-            table2_header[i].paragraphs[0].runs[0].font.size = Pt(9)  # Slightly smaller font size
-        if role=="user": 
-            table2_header[6].merge(table2_header[7])
-        else:
-            table2_header[4].merge(table2_header[5])
-
-        # Apply background color to the header row (light grey)
-        for cell in table2_header:
-            apply_background_color(cell, "D3D3D3")  # Light grey background
-
-        # Add the second empty row
-        empty_row = table2.add_row().cells
-
-        # Merge all cells except the one under "Participant Summary" (column 6)
-        if role=="user":
-            indexCol=6
+            # 8 Columns: Indicator, Specimen ID, Your result, Recommended, Reference, Score, Mean (IQR), Participants meeting threshold
+            headers = ["Indicator", "Specimen ID", "Your result", "Recommended Value*", "Reference Lab result", "Your score"]
+            columns = lambda row: [str(row[0]), str(row[1]), row[2], str(row[3]), row[4], row[5], row[6]]
         else:
-            indexCol=4
-        for i in range(indexCol):  # Merge the first 6 columns
-            empty_row[i].merge(table2_header[i])
-
-        
-        # Split the "Participant Summary" cell into two: "Mean (IQR)" and "Participants Meeting Threshold"
-        empty_row[indexCol].text = "Mean (IQR)"
-        empty_row[indexCol+1].text = "Participants meeting threshold"
-
-        # Optional: Bold the new header cells and make their font smaller
-        empty_row[indexCol].paragraphs[0].runs[0].font.size = Pt(9)  # Smaller font size
-        empty_row[indexCol+1].paragraphs[0].runs[0].font.size = Pt(9)  # Smaller font size
-
-        # Apply background color to the empty row (light blue)
-        for cell in empty_row:
-            apply_background_color(cell, "ADD8E6")  # Light blue background
+            headers = ["Indicator", "Specimen ID", "Recommended Value*", "Reference Lab result"]
+            columns = lambda row: [str(row[0]), row[2], str(row[3]), row[5], row[6]]
+
+        # Two header rows (light grey, then light blue): the header cells are merged vertically over both, except
+        # "Participant summary", which spans "Mean (IQR)" and "Participants meeting threshold" below it
+        table2_rows = [
+            row_cells(headers, fill="D3D3D3", bold=True, size=9, vmerge="restart")
+            + [TableCell("Participant summary", fill="D3D3D3", bold=True, size=9, span=2)],
+            row_cells([None] * len(headers), fill="ADD8E6", vmerge="continue")
+            + row_cells(["Mean (IQR)", "Participants meeting threshold"], fill="ADD8E6", size=9),
+        ]
 
         # Populate Table 2 with merged Indicator cells and color rows differently
         indicator_colors_table2 = {
@@ -1038,39 +947,10 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
             "Similarity (%)": "E2D1E8",  # Light purple
             "Read Coverage (mean)": "FFFACD",  # Light yellow
         }
-
         for indicator in ["Genome Coverage (%)", "Ns in Sequence (%)", "Similarity (%)", "Read Coverage (mean)"]:
-            rows = evaluation_data[indicator]
-            first_cell = None
-            row_color = indicator_colors_table2.get(indicator, "FFFFFF")  # Default to white if not found
+            table2_rows += indicator_rows(indicator, indicator, indicator_colors_table2.get(indicator, "FFFFFF"), columns)
+        add_table(doc, table2_rows, len(headers) + 2, alignment="center")
 
-            for i, row in enumerate(rows):
-                row_cells = table2.add_row().cells
-                if i == 0:
-                    first_cell = row_cells[0]  # Store first cell for merging
-                    first_cell.text = indicator
-                else:
-                    row_cells[0]._tc.merge(first_cell._tc)  # Merge vertically
-    
-                row_cells[1].text = str(row[0])  
-                if role=="user":
-                    row_cells[2].text = str(row[1])  
-                    row_cells[3].text = row[2]  
-                    row_cells[4].text = str(row[3])  
-                    apply_color(row_cells[5].paragraphs[0].add_run(), row[4])  
-                    row_cells[6].text = row[5]  
-                    row_cells[7].text = row[6]  
-                else: 
-                    row_cells[2].text = row[2]  
-                    row_cells[3].text = str(row[3])   
-                    row_cells[4].text = row[5]  
-                    row_cells[5].text = row[6]
-
-                # Apply background color and smaller font size to each row under the current indicator
-                for cell in row_cells:
-                    apply_background_color(cell, row_color)  # Apply unique color per indicator
-                    apply_font_size(cell, 9)  # Set font size to 6 pt for the row
-        
         # **Adding the Sequencing Quality Notes with Smaller Font**
         para = doc.add_paragraph("\n* Recommended Value")
 
@@ -1090,168 +970,21 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         return doc
 
 
-    evaluation_data = compute_evaluation_data(sample_html_reports, sample_reference_map, user_lab)
+    evaluation_data = context.evaluation.evaluation_data(user_lab)
     doc = add_evaluation_tables(doc, evaluation_data, user_lab, role)
 
-    # If the user is not a superuser, filter and aggregate data
-    others_label=""
-    agg_users={}
-    sample_html_reports_original=copy.deepcopy(sample_html_reports)
-    if not role == "superuser":
-        processed_reports = {}
-        for sample_name, labs_data in sample_html_reports.items():
-            if user_lab not in labs_data:
-                continue  # Skip samples the user has no access to
-
-            user_metrics = labs_data[user_lab]
-            reference_metrics = labs_data.get("9999", {})  # Extract reference metrics
-            subtype_counts = {}
-            clade_counts = {}
-            g_clade_counts = {}
-
-            aggregated_metrics = {
-                "coverage": 0,
-                "Ns": 0,
-                "similarity": 0,
-                "Mean coverage depth": 0,
-                "lab_count": 0,
-                "clade": "",
-                "G_clade": "",
-                "subtype":""
-            }
-
-            # Aggregate data from other labs
-            for lab, metrics in labs_data.items():
-                if lab != user_lab and lab != "9999" and metrics["coverage"]!="N/A":  # Exclude user lab and reference lab
-                    aggregated_metrics["coverage"] += metrics["coverage"]
-                    aggregated_metrics["Ns"] += metrics["Ns"]
-                    aggregated_metrics["similarity"] += metrics["similarity"]
-                    if metrics["Mean coverage depth"]!="N/A":
-                        aggregated_metrics["Mean coverage depth"] += metrics["Mean coverage depth"]
-                    aggregated_metrics["lab_count"] += 1
-
-                    # Count clade occurrences
-                    clade = metrics.get("clade", "")
-                    subtype = metrics.get("subtype", "")
-                    g_clade = metrics.get("G_clade", "")
-                    if subtype:
-                        subtype_counts[subtype] = subtype_counts.get(subtype, 0) + 1
-                    if clade:
-                        clade_counts[clade] = clade_counts.get(clade, 0) + 1
-                    if g_clade:
-                        g_clade_counts[g_clade] = g_clade_counts.get(g_clade, 0) + 1
-
-            # Calculate averages
-            if aggregated_metrics["lab_count"] > 0:
-                aggregated_metrics["coverage"] = round(
-                    (aggregated_metrics["coverage"] / aggregated_metrics["lab_count"]), 2
-                )
-                aggregated_metrics["Ns"] = round(
-                    aggregated_metrics["Ns"] / aggregated_metrics["lab_count"], 2
-                )
-                aggregated_metrics["similarity"] = round(
-                    aggregated_metrics["similarity"] / aggregated_metrics["lab_count"], 2
-                )
-                aggregated_metrics["Mean coverage depth"] = round(
-                    aggregated_metrics["Mean coverage depth"] / aggregated_metrics["lab_count"], 2
-                )
-
-            # Determine the most frequent clades
-            if subtype_counts:
-                aggregated_metrics["subtype"] = max(subtype_counts, key=subtype_counts.get)
-            if clade_counts:
-                aggregated_metrics["clade"] = max(clade_counts, key=clade_counts.get)
-            if g_clade_counts:
-                aggregated_metrics["G_clade"] = max(g_clade_counts, key=g_clade_counts.get)
-
-            # Prepare processed data for the user
-            others_label="Others ("+str(aggregated_metrics["lab_count"])+")"
-            processed_reports[sample_name] = {
-                user_lab: user_metrics,
-                others_label: aggregated_metrics,
-                "Reference": reference_metrics
-            }
-            agg_users[sample_name]=aggregated_metrics
-
-        sample_html_reports = processed_reports
-
-
-    sample_html_reports = dict(sorted(sample_html_reports.items()))
-    
-    # Handle lab anonymization based on the user's role
-    if role == 'superuser':
-        # Iterate through each sample's data and anonymize lab names
-        for sample, data in sample_html_reports.items():
-            count = 1
-            anonymized_data = {}
-            for i, (lab, metrics) in enumerate(data.items()):
-                '''if lab == '9999' or lab == 'Reference':
-                    anonymized_data['9999'] = metrics  # Keep the reference lab as '9999'
-                else:
-                    anonymized_data[f'{count:01d}'] = metrics  # Anonymize labs as single-digit numbers
-                    count += 1'''
-                anonymized_data[lab] = metrics
-            # Replace the sample data with anonymized data
-            sample_html_reports[sample] = anonymized_data
-
-    # Sort sample_html_reports such that user_lab comes first, reference second
-    for sample, data in sample_html_reports.items():
-        sorted_data = {
-            key: data[key]
-            for key in sorted(
-            data,
-            key=lambda k: (
-                0 if k == user_lab else (1 if (k.lower() == "reference" or k=="9999") else 2),
-                k
-            )
-        )
-        }
-        sample_html_reports[sample] = sorted_data
-
-    # Sort the sample_html_reports dictionary by sample name
-    sample_html_reports = dict(sorted(sample_html_reports.items()))
-
+    sample_html_reports = lab_sample_reports(context, role, user_lab)
 
     # Add sample plots and tables to the DOCX file
     for sample, data in sample_html_reports.items():
         #plot_path, read_plot_path = generate_two_plots(sample, data, role)  # Generate and get the plot path
-        platform_plot_path, read_platform_plot_path, user_platform = generate_aggregated_plot_by_platform(sample, sample_html_reports_original[sample], user_lab, role)
-        intended_subtype = "RSV-B" if sample_reference_map[sample]=="EPI_ISL_1653999" else "RSV-A"
+        platform_plot, read_platform_plot, user_platform = platform_plot_images(context, sample, user_lab, role)
+        intended_subtype = subtype_of(sample_reference_map[sample])
         doc.add_heading(f'Sample {sample}', level=1)
         doc.add_heading(f'Lineage assignment', level=2)
 
-        # Extract Clade and G_clade assignments for the 'reference'
-        reference_clade = None
-        reference_g_clade = None
-
-        # Iterate through data to find the reference clade and g_clade
-        for lab, metrics in data.items():
-            if lab == '9999':  # Reference participant
-                reference_clade = metrics['clade']
-                reference_g_clade = metrics['G_clade']
-                break
-            elif lab== 'Reference':
-                reference_subtype = subtype_assignment(metrics['subtype'], intended_subtype)
-                reference_clade = metrics['clade']
-                reference_g_clade = metrics['G_clade']
-                break
-
         # Add an introductory paragraph about clade assignments
-        if role=='superuser':
-            #doc.add_paragraph("All participants matched RSV subtype assignments with reference lab.", style='List Bullet')
-            mistakes_text = "All participants matched lineage assignments with reference lab."  # Default
-            for lab, metrics in data.items():
-                if lab != '9999' and lab!='Reference':  # Exclude the reference itself
-                    if metrics['clade'] != reference_clade or metrics['G_clade'] != reference_g_clade:
-                        mistakes_text = "Some participants' clade assignments differed from the reference lab."
-                        mistakes_found = True
-                        break
-            doc.add_paragraph(mistakes_text, style='List Bullet')
-        else:
-            mistakes_text = "Your lab's lineage assignment matches the reference lab's."
-            if data[user_lab]['clade'] != reference_clade:
-                mistakes_text = "Your lab's lineage assignment does not match the reference lab's."
-            doc.add_paragraph(mistakes_text, style='List Bullet')
+        doc.add_paragraph(lineage_statement(data, role, user_lab), style='List Bullet')
         
         # Caption for the Clade table
         clade_caption = doc.add_paragraph()
@@ -1261,147 +994,24 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         clade_runner.italic = True
         table_count += 1  # Increment the table count
 
-        # Add the Clade and G_clade table with RSV subtype
-        clade_table = doc.add_table(rows=1, cols=4)  # Creating a table with 4 columns (Participant, Subtype, Clade, Legacy clade)
-        clade_table.style = "Table Grid"
-
-        # Adding the header row for the table
-        clade_hdr_cells = clade_table.rows[0].cells
-        clade_hdr_cells[0].text = 'Participant'
-        clade_hdr_cells[0].paragraphs[0].runs[0].bold = True
-        clade_hdr_cells[1].text = 'RSV Subtype'
-        clade_hdr_cells[1].paragraphs[0].runs[0].bold = True
-        clade_hdr_cells[2].text = 'Lineage'
-        clade_hdr_cells[2].paragraphs[0].runs[0].bold = True
-        clade_hdr_cells[3].text = 'Legacy lineage'
-        clade_hdr_cells[3].paragraphs[0].runs[0].bold = True
-
-        # Adding data rows for each participant and highlighting mismatches
-        labCount = 0
-        for lab, metrics in data.items():
-            labName=lab if lab!='Reference' else 'Reference Lab (NEQAS)'
-
-            # Add a new row to the table
-            row_cells = clade_table.add_row().cells
-
-            # Participant column
-            row_cells[0].text = labName
-            row_cells[0].paragraphs[0].runs[0].italic = True  # Italicize the first column (Participant)
-
-            # RSV Subtype column
-            subtype_cell = row_cells[1]
-            subtype_cell.text = subtype_assignment(metrics['subtype'],intended_subtype)
-            # Highlight mismatched Clade values
-            #if metrics['subtype'] == "alternative":
-            #    subtype_cell.paragraphs[0].runs[0].font.highlight_color = WD_COLOR_INDEX.YELLOW
-
-            # Clade column
-            clade_cell = row_cells[2]
-            clade_cell.text = metrics['clade']
-            # Highlight mismatched Clade values
-            #if metrics['clade'] != reference_clade:
-            #    clade_cell.paragraphs[0].runs[0].font.highlight_color = WD_COLOR_INDEX.YELLOW
-
-            # Legacy clade column
-            g_clade_cell = row_cells[3]
-            g_clade_cell.text = metrics['G_clade']
-            # Highlight mismatched Legacy clade values
-            #if metrics['G_clade'] != reference_g_clade:
-            #    g_clade_cell.paragraphs[0].runs[0].font.highlight_color = WD_COLOR_INDEX.YELLOW
-            if labName==user_lab:
-                for i in range(4):
-                    shading_elm = parse_xml(r'<w:shd {} w:fill="EFFA75"/>'.format(nsdecls('w')))
-                    row_cells[i]._tc.get_or_add_tcPr().append(shading_elm)
-
-
-        doc.add_heading(f'\nSequencing quality', level=2)
+        # Add the Clade and G_clade table with RSV subtype (cached per sample, see report_cache)
+        def build_lineage_table(doc):
+            # 4 columns (Participant, Subtype, Clade, Legacy clade), one row per participant, the row of the user lab highlighted
+            rows = [row_cells(['Participant', 'RSV Subtype', 'Lineage', 'Legacy lineage'], bold=True)]
+            for lab, metrics in data.items():
+                labName=lab if lab!='Reference' else 'Reference Lab (NEQAS)'
+                fill = "EFFA75" if labName==user_lab else None
+                rows.append([TableCell(labName, fill=fill, italic=True)]  # Italicize the first column (Participant)
+                            + row_cells([subtype_assignment(metrics['subtype'],intended_subtype), metrics['clade'], metrics['G_clade']], fill=fill))
+            return add_table(doc, rows, 4)
 
-                # Initialize flags to check if any participants fail to meet thresholds
-        failed_coverage = []
-        failed_ns = []
-        failed_similarity = []
-        failed_coverage_depth = []
+        add_cached_table(doc, context, sample, "lineage_table", [list(data.items()), user_lab, intended_subtype], build_lineage_table)
 
-        # Initialize user-specific flags if the role is not a superuser
-        user_failed_coverage = False
-        user_failed_ns = False
-        user_failed_similarity = False
-        user_failed_coverage_depth = False
 
-        # Loop through the data to check conditions and generate summary statements
-        for lab, metrics in data.items():
-            labName = lab
-
-            # Check thresholds for all participants if the role is superuser
-            if role == "superuser":
-                if metrics['coverage'] == 'N/A' or metrics['coverage'] < 0.90:
-                    failed_coverage.append(labName)
-                if metrics['coverage'] == 'N/A' or metrics['Ns'] > 2:
-                    failed_ns.append(labName)
-                if metrics['coverage'] == 'N/A' or metrics['similarity'] < 95:
-                    failed_similarity.append(labName)
-                if metrics['Mean coverage depth'] == 'N/A' or float(metrics['Mean coverage depth']) < 50:
-                    failed_coverage_depth.append(labName)
-
-            # Check thresholds for user lab only if the role is not a superuser
-            elif lab == user_lab:
-                user_coverage='N/A' if metrics['coverage']=='N/A' else str(round(metrics['coverage'],2))
-                user_ns='N/A' if metrics['Ns']=='N/A' else str(round(metrics['Ns'],2))
-                user_similarity='N/A' if metrics['similarity']=='N/A' else str(round(metrics['similarity'],2))
-                user_read_coverage='N/A' if metrics['Mean coverage depth']=='N/A' else str(round(metrics['Mean coverage depth'],2))
-                if metrics['coverage'] == 'N/A' or metrics['coverage'] < 0.90:
-                    user_failed_coverage = True
-                if metrics['coverage'] == 'N/A' or metrics['Ns'] > 2:
-                    user_failed_ns = True
-                if metrics['coverage'] == 'N/A' or metrics['similarity'] < 95:
-                    user_failed_similarity = True
-                if metrics['Mean coverage depth'] == 'N/A' or float(metrics['Mean coverage depth']) < 50:
-                    user_failed_coverage_depth = True
-
-        # Generate feedback based on role
-        if role == "superuser":
-            # Add summary lines for superuser
-            if failed_coverage:
-                doc.add_paragraph(f"Participants {', '.join(failed_coverage)} failed to satisfy the threshold for genome coverage (90%).", style='List Bullet')
-            else:
-                doc.add_paragraph("All participants obtained sufficient genome coverage (90% or higher).", style='List Bullet')
-
-            if failed_ns:
-                doc.add_paragraph(f"Participants {', '.join(failed_ns)} failed to satisfy the threshold for Ns in Sequence (greater than 2%).", style='List Bullet')
-            else:
-                doc.add_paragraph("All participants maintained Ns in Sequence within acceptable limits (2% or lower).", style='List Bullet')
-
-            if failed_similarity:
-                doc.add_paragraph(f"Participants {', '.join(failed_similarity)} failed to satisfy the threshold for Similarity (95%).", style='List Bullet')
-            else:
-                doc.add_paragraph("All participants obtained sufficient Similarity (95% or higher).", style='List Bullet')
-
-            if failed_coverage_depth:
-                doc.add_paragraph(f"Participants {', '.join(failed_coverage_depth)} failed to satisfy the threshold for Read Coverage (Mean depth of 50).", style='List Bullet')
-            else:
-                doc.add_paragraph("All participants obtained sufficient Read Coverage (Mean depth of 50 or higher).", style='List Bullet')
+        doc.add_heading(f'\nSequencing quality', level=2)
 
-        else:
-            # Add summary lines for non-superuser
-            if user_failed_coverage:
-                doc.add_paragraph("Failed to satisfy the threshold for genome coverage (90%).", style='List Bullet')
-            else:
-                doc.add_paragraph("Obtained sufficient genome coverage (90% or higher).", style='List Bullet')
-
-            if user_failed_ns:
-                doc.add_paragraph("Failed to satisfy the threshold for Ns in Sequence (greater than 2%).", style='List Bullet')
-            else:
-                doc.add_paragraph("Obtained sufficient Ns in Sequence (2% or lower).", style='List Bullet')
-
-            if user_failed_similarity:
-                doc.add_paragraph("Failed to satisfy the threshold for Similarity (95%).", style='List Bullet')
-            else:
-                doc.add_paragraph("Obtained sufficient Similarity (95% or higher).", style='List Bullet')
-
-            if user_failed_coverage_depth:
-                doc.add_paragraph("Failed to satisfy the threshold for Read Coverage (Mean depth of 50).", style='List Bullet')
-            else:
-                doc.add_paragraph("Obtained sufficient Read Coverage (Mean depth of 50 or higher).", style='List Bullet')
+        for statement in quality_statements(data, role, user_lab):
+            doc.add_paragraph(statement, style='List Bullet')
         
         '''# Add the plot image to DOCX with a caption
         last_paragraph = doc.paragraphs[-1] 
@@ -1436,103 +1046,38 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         runner.bold = True
         runner.italic = True
 
-        # Generate and insert the metrics table for the sample
-        table = doc.add_table(rows=1, cols=5)  # Creating a table with 5 columns for metrics
-        table.style = "Table Grid"
+        # Generate and insert the metrics table for the sample (cached per sample, see report_cache)
+        def build_metrics_table(doc):
+            # 5 columns for metrics, one row per participant, the row of the user lab highlighted
+            rows = [row_cells(['Participant', 'Genome Coverage (%)', 'Ns in Sequence (%)', 'Similarity (%)', 'Read Coverage (Mean)'], bold=True)]
+            for lab, metrics in data.items():
+                labName=lab if lab!='Reference' else 'Reference Lab (NEQAS)'
+                fill = "EFFA75" if labName==user_lab else None
+                row = [TableCell(labName, fill=fill, italic=True)]
+                if metrics['coverage']!="N/A":
+                    row += row_cells([f"{metrics['coverage'] * 100:.1f}", f"{metrics['Ns']:.1f}", f"{metrics['similarity']:.1f}"], fill=fill)
+                else:
+                    # Coverage, Ns and similarity merged in one cell
+                    row.append(TableCell("Nextclade error (low quality sequence)", fill=fill, align="center", span=3))
+                # Mean coverage depth column
+                mean_coverage_depth_value = metrics['Mean coverage depth']
+                row.append(TableCell(f"{mean_coverage_depth_value:.1f}" if mean_coverage_depth_value!="N/A" else "N/A", fill=fill))
+                rows.append(row)
+            return add_table(doc, rows, 5)
 
-        # Adding the header row for the table
-        hdr_cells = table.rows[0].cells
-        hdr_cells[0].text = 'Participant'
-        hdr_cells[0].paragraphs[0].runs[0].bold = True
-        hdr_cells[1].text = 'Genome Coverage (%)'
-        hdr_cells[1].paragraphs[0].runs[0].bold = True
-        hdr_cells[2].text = 'Ns in Sequence (%)'
-        hdr_cells[2].paragraphs[0].runs[0].bold = True
-        hdr_cells[3].text = 'Similarity (%)'
-        hdr_cells[3].paragraphs[0].runs[0].bold = True
-        hdr_cells[4].text = 'Read Coverage (Mean)'
-        hdr_cells[4].paragraphs[0].runs[0].bold = True
-
-        # Add data rows for each lab/sample entry
-        labCount = 0
-        for lab, metrics in data.items():
-            #if lab == 'WR024':
-            #    labName = 'reference'
-            #else:
-            #labCount += 1
-            #labName = str(labCount)
-            labName=lab if lab!='Reference' else 'Reference Lab (NEQAS)'
-
-            # Add a new row to the table
-            row_cells = table.add_row().cells
-
-            # Fill in the cells for each column
-            row_cells[0].text = labName  # First column with lab name (bold)
-            row_cells[0].paragraphs[0].runs[0].italic = True  # Bold the first column
-
-            # Coverage column (highlight if less than 90%)
-            coverage_value = metrics['coverage'] * 100 if metrics['coverage']!="N/A" else "N/A"
-            if metrics['coverage']!="N/A":
-                row_cells[1].text = f"{coverage_value:.1f}"
-                #if coverage_value < 90:
-                #    row_cells[1].paragraphs[0].runs[0].font.highlight_color = WD_COLOR_INDEX.YELLOW  # Highlight if less than 90%
-                # Ns column (highlight if higher than 2%)
-                ns_value = metrics['Ns']
-                row_cells[2].text = f"{ns_value:.1f}"
-                #if ns_value > 2:
-                #    row_cells[2].paragraphs[0].runs[0].font.highlight_color = WD_COLOR_INDEX.YELLOW  # Highlight if higher than 2%
-
-                # Similarity column (highlight if less than 95%)
-                similarity_value = metrics['similarity']
-                row_cells[3].text = f"{similarity_value:.1f}"
-                #if similarity_value < 95:
-                #    row_cells[3].paragraphs[0].runs[0].font.highlight_color = WD_COLOR_INDEX.YELLOW  # Highlight if less than 95%
-            else:
-                merged_cell = row_cells[1].merge(row_cells[2]).merge(row_cells[3])
-                paragraph = merged_cell.paragraphs[0]
-                run = paragraph.add_run("Nextclade error (low quality sequence)")
-                paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            # Mean coverage depth column
-            mean_coverage_depth_value = metrics['Mean coverage depth']
-            if metrics['Mean coverage depth']!="N/A":
-                row_cells[4].text = f"{mean_coverage_depth_value:.1f}"
-            else:
-                row_cells[4].text ="N/A"
-
-            if labName==user_lab:
-                for i in range(5):
-                    shading_elm = parse_xml(r'<w:shd {} w:fill="EFFA75"/>'.format(nsdecls('w')))
-                    row_cells[i]._tc.get_or_add_tcPr().append(shading_elm)
+        add_cached_table(doc, context, sample, "metrics_table", [list(data.items()), user_lab], build_metrics_table)
 
         # Increment figure and table count
         table_count += 1
 
 
         #genome tracks
-        if role != "superuser" and os.path.isfile(os.path.join(f"data/{distribution}/{user_lab}/{sample}", f"{user_lab}_{sample}.bw")):
+        if has_genome_tracks(context, role, user_lab, sample):
             doc.add_paragraph("\n\n")
-            reference_genome = "project/static/genomes/EPI_ISL_412866/EPI_ISL_412866.fasta" if sample_reference_map[sample]=="EPI_ISL_412866" else "project/static/genomes/EPI_ISL_1653999/EPI_ISL_1653999.fasta"
-            region="EPI_ISL_412866:1-15225" if sample_reference_map[sample]=="EPI_ISL_412866" else "EPI_ISL_1653999:1-15222"
-            annotation = "project/static/genomes/EPI_ISL_412866/EPI_ISL_412866.gtf" if sample_reference_map[sample]=="EPI_ISL_412866" else "project/static/genomes/EPI_ISL_1653999/EPI_ISL_1653999.gtf"
-            output_dir = "project/static/plots"
-            bigwig_file_path = os.path.join(f"data/{distribution}/{user_lab}/{sample}", f"{user_lab}_{sample}.bw")
-            if os.path.exists(bigwig_file_path):
-                bigwig_copy=os.path.join(output_dir,f"{user_lab}_{sample}.bw")
-                shutil.copy(bigwig_file_path,bigwig_copy)
-            else:
-                bigwig_copy=None
-            bigwig_consensus_file_path = os.path.join(f"data/{distribution}/{user_lab}/{sample}", f"{user_lab}_{sample}_consensus.bw")
-            bigwig_consensus_copy=os.path.join(output_dir,f"{user_lab}_{sample}_consensus.bw")
-
-            shutil.copy(bigwig_consensus_file_path,bigwig_consensus_copy)
-            bed_path = os.path.join(f"data/{distribution}/{user_lab}/{sample}", f"{user_lab}_{sample}_mutations.bed")
-            bed_path_copy=os.path.join(output_dir,f"{user_lab}_{sample}_mutations.bed")
-            shutil.copy(bed_path,bed_path_copy)
-            output_dir = "project/static/plots"
-            plot_path = create_pygenometracks_plot( reference_genome, annotation, region, bed_path_copy, bigwig_copy, bigwig_consensus_copy, output_dir, sample, user_lab)
+            genome_tracks_plot = render_genome_tracks(context, sample, user_lab)
             
             # Add the plot image to DOCX with a caption
-            doc.add_picture(plot_path, width=Inches(6.5))  # Adjust size as needed
+            doc.add_picture(BytesIO(genome_tracks_plot), width=Inches(6.5))  # Adjust size as needed
             last_paragraph = doc.paragraphs[-1] 
             last_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
             para = doc.add_paragraph()
@@ -1548,7 +1093,7 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         doc.add_heading(f'Sequencing platforms\n', level=2)
 
         # Add the plot image to DOCX with a caption
-        doc.add_picture(platform_plot_path, width=Inches(6.5))  # Adjust size as needed
+        doc.add_picture(BytesIO(platform_plot), width=Inches(6.5))  # Adjust size as needed
         last_paragraph = doc.paragraphs[-1] 
         last_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
         last_paragraph = doc.paragraphs[-1]
@@ -1560,7 +1105,7 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         figure_count+=1
 
         # Add the read coverage plot image to DOCX with a caption
-        doc.add_picture(read_platform_plot_path, width=Inches(6.5))  # Adjust size as needed
+        doc.add_picture(BytesIO(read_platform_plot), width=Inches(6.5))  # Adjust size as needed
         last_paragraph = doc.paragraphs[-1] 
         last_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
         last_paragraph = doc.paragraphs[-1]
@@ -1572,63 +1117,6 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
         figure_count+=1
         para.add_run().add_break(WD_BREAK.PAGE)
 
-        def aggregate_sample_data(sample_data, user_platforms):
-            """
-            Aggregates sample metrics by sequencing platform.
-            
-            :param sample_data: Dictionary where each key is a lab and each value is a dict with metrics,
-                                including 'coverage', 'similarity', 'Ns', 'Mean coverage depth',
-                                and 'sequencing_platform'.
-            :return: A dictionary keyed by sequencing platform with averaged metric values.
-            """
-            platform_data = {}
-            for lab, metrics in sample_data.items():
-                # Get sequencing platforms; default to "Unknown" if not provided.
-                platforms = metrics.get("sequencing_platform", "Unknown").split(",")
-                for platform in platforms:
-                    platform = platform.strip()
-                    if platform not in platform_data:
-                        platform_data[platform] = {"coverage": [], "similarity": [], "Ns": [], "Mean coverage depth": []}
-                    # Multiply coverage by 100 to get percentage, if available.
-                    if metrics.get("coverage") != "N/A":
-                        platform_data[platform]["coverage"].append(metrics["coverage"] * 100)
-                    else:
-                        platform_data[platform]["coverage"].append(0)
-                    # Similarity, Ns and Mean coverage depth
-                    if metrics.get("similarity") != "N/A":
-                        platform_data[platform]["similarity"].append(metrics["similarity"])
-                    else:
-                        platform_data[platform]["similarity"].append(0)
-                    if metrics.get("Ns") != "N/A":
-                        platform_data[platform]["Ns"].append(metrics["Ns"])
-                    else:
-                        platform_data[platform]["Ns"].append(0)
-                    if metrics.get("Mean coverage depth") != "N/A":
-                        platform_data[platform]["Mean coverage depth"].append(metrics["Mean coverage depth"])
-            
-            # Compute averages for each platform
-            aggregated = {}
-            for platform, lists in platform_data.items():
-                count = len(lists["coverage"])
-                platformName=f"{platform} ({count})"
-                aggregated[platformName] = {
-                    "coverage": np.mean(lists["coverage"]) if lists["coverage"] else 0,
-                    "similarity": np.mean(lists["similarity"]) if lists["similarity"] else 0,
-                    "Ns": np.mean(lists["Ns"]) if lists["Ns"] else 0,
-                    "Mean coverage depth": np.mean(lists["Mean coverage depth"]) if lists["Mean coverage depth"] else "N/A"
-                }
-            aggregatedFinal = {
-                key: aggregated[key]
-                for key in sorted(
-                aggregated,
-                key=lambda k: (
-                    0 if any(user_p in k for user_p in user_platforms) else 1,  # User platforms first
-                    k
-                )
-            )
-            }
-            return aggregatedFinal
-
         def create_platform_table(doc, aggregated_data, user_platforms):
             """
             Creates a DOCX table with aggregated quality metrics per sequencing platform.
@@ -1644,47 +1132,30 @@ def generate_docx_report(report_data, base_dir, role, user_lab, distribution):
             runner.bold = True
             runner.italic = True
             
-            # Create a table with one header row and 5 columns.
-            table = doc.add_table(rows=1, cols=5)
-            table.style = "Table Grid"
-            
-            # Define header titles.
-            headers = [
-                'Sequencing Platform',
-                'Genome Coverage (%)',
-                'Ns in Sequence (%)',
-                'Similarity (%)',
-                'Read Coverage (Mean)'
-            ]
-            
-            hdr_cells = table.rows[0].cells
-            for i, title in enumerate(headers):
-                hdr_cells[i].text = title
-                # Center-align and bold the header text.
-                for paragraph in hdr_cells[i].paragraphs:
-                    paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                    for run in paragraph.runs:
-                        run.bold = True
-            
-            # Add a row for each sequencing platform.
-            for platform, metrics in aggregated_data.items():
-                row_cells = table.add_row().cells
-                row_cells[0].text = platform
-                row_cells[1].text = f"{metrics['coverage']:.1f}" if metrics['coverage'] is not None and metrics['similarity'] != 0 else "N/A"
-                row_cells[2].text = f"{metrics['Ns']:.1f}" if metrics['Ns'] is not None and metrics['similarity'] != 0 else "N/A"
-                row_cells[3].text = f"{metrics['similarity']:.1f}" if metrics['similarity'] is not None and metrics['similarity'] != 0 else "N/A"
-                row_cells[4].text = f"{metrics['Mean coverage depth']:.1f}" if metrics['Mean coverage depth'] != "N/A" and metrics['Mean coverage depth']!=0 else "N/A"
-                for cell in row_cells:
-                    for paragraph in cell.paragraphs:
-                        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                if " ".join(platform.split(" ")[:-1]) in user_platforms:
-                    for i in range(5):
-                        shading_elm = parse_xml(r'<w:shd {} w:fill="EFFA75"/>'.format(nsdecls('w')))
-                        row_cells[i]._tc.get_or_add_tcPr().append(shading_elm)
-
-            return table
-
-        aggregated_data=aggregate_sample_data(sample_html_reports_original[sample], user_platform)
+            def build_platform_table(doc):
+                # One header row and 5 columns, centered, a row for each sequencing platform
+                headers = [
+                    'Sequencing Platform',
+                    'Genome Coverage (%)',
+                    'Ns in Sequence (%)',
+                    'Similarity (%)',
+                    'Read Coverage (Mean)'
+                ]
+                rows = [row_cells(headers, bold=True, align="center")]
+                for platform, metrics in aggregated_data.items():
+                    fill = "EFFA75" if " ".join(platform.split(" ")[:-1]) in user_platforms else None
+                    rows.append(row_cells([
+                        platform,
+                        f"{metrics['coverage']:.1f}" if metrics['coverage'] is not None and metrics['similarity'] != 0 else "N/A",
+                        f"{metrics['Ns']:.1f}" if metrics['Ns'] is not None and metrics['similarity'] != 0 else "N/A",
+                        f"{metrics['similarity']:.1f}" if metrics['similarity'] is not None and metrics['similarity'] != 0 else "N/A",
+                        f"{metrics['Mean coverage depth']:.1f}" if metrics['Mean coverage depth'] != "N/A" and metrics['Mean coverage depth']!=0 else "N/A",
+                    ], fill=fill, align="center"))
+                return add_table(doc, rows, 5)
+
+            return add_cached_table(doc, context, sample, "platform_table", [list(aggregated_data.items()), user_platforms], build_platform_table)
+
+        aggregated_data=sorted_platform_metrics(context, sample, user_platform)
         create_platform_table(doc, aggregated_data, user_platform)
 
         last_paragraph = doc.add_paragraph() 
@@ -0,0 +1,186 @@
+"""
+docx_tables.py
+==============
+
+This utilities module builds the tables of the DOCX reports as whole <w:tbl> elements, from rows of cells,
+in one pass.
+
+Building a table through python-docx (table.add_row().cells, cell.text = ..., a parse_xml call per shaded
+cell and loops over the runs to set the font size) costs a lookup of the whole grid for every row.cells
+access, which grows with the merged cells, and one XML parse per cell property. The superuser reports list
+every lab for every sample, so these tables dominated their render time. Here the properties of a cell
+(shading, font, alignment and merge) are rendered once per distinct combination, the table is written as
+one OOXML string and parsed once. The output is the same XML python-docx writes for the same table.
+
+Functions:
+    row_cells(texts, **properties)
+        Returns the cells of a row sharing the same properties.
+    table_xml(rows, columns, width, style_id=None, alignment=None)
+        Writes the <w:tbl> element of a table.
+    add_table(doc, rows, columns, style="Table Grid", alignment=None)
+        Appends a table built from rows of cells to a document.
+
+Classes:
+    TableCell(text=None, fill=None, bold=False, italic=False, size=None, align=None, span=1, vmerge=None)
+        Content and properties of a table cell.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+from collections import namedtuple
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Emu
+from docx.table import Table
+
+TableCell = namedtuple("TableCell", ["text", "fill", "bold", "italic", "size", "align", "span", "vmerge"],
+                       defaults=[None, None, False, False, None, None, 1, None])
+TableCell.__doc__ = """
+Content and properties of a table cell.
+
+:param text: Text of the cell, None for a cell left empty (e.g. the continuation of a vertical merge).
+:type text: str or None
+:param fill: Background colour, as a hexadecimal RGB string (e.g. "D3D3D3").
+:type fill: str or None
+:param bold: Whether the text is bold.
+:type bold: bool
+:param italic: Whether the text is italic.
+:type italic: bool
+:param size: Font size of the text, in points.
+:type size: int or float or None
+:param align: Alignment of the paragraph (e.g. "center").
+:type align: str or None
+:param span: Number of grid columns the cell spans (horizontal merge).
+:type span: int
+:param vmerge: "restart" for the first cell of a vertical merge, "continue" for the cells below it.
+:type vmerge: str or None
+"""
+
+_TABLE_LOOK = ('<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0"'
+               ' w:noVBand="1" w:val="04A0"/>')
+
+
+@lru_cache(maxsize=None)
+def _cell_start(width, span, vmerge, fill):
+    # Opening of a <w:tc> and its properties, in schema order
+    properties = f'<w:tcW w:type="dxa" w:w="{width * span}"/>'
+    if span > 1:
+        properties += f'<w:gridSpan w:val="{span}"/>'
+    if vmerge == "restart":
+        properties += '<w:vMerge w:val="restart"/>'
+    elif vmerge == "continue":
+        properties += '<w:vMerge/>'
+    if fill:
+        properties += f'<w:shd w:fill="{fill}"/>'
+    return f'<w:tc><w:tcPr>{properties}</w:tcPr>'
+
+
+@lru_cache(maxsize=None)
+def _paragraph_start(align):
+    return f'<w:p><w:pPr><w:jc w:val="{align}"/></w:pPr>' if align else '<w:p>'
+
+
+@lru_cache(maxsize=None)
+def _run_start(bold, italic, size):
+    properties = ("<w:b/>" if bold else "") + ("<w:i/>" if italic else "")
+    if size:
+        properties += f'<w:sz w:val="{int(size * 2)}"/>'
+    return f'<w:r><w:rPr>{properties}</w:rPr>' if properties else '<w:r>'
+
+
+def _text_xml(text):
+    # Tabs and line breaks are elements of the run, as python-docx's run.text writes them
+    xml = []
+    for i, line in enumerate(text.replace("\r", "\n").split("\n")):
+        if i:
+            xml.append("<w:br/>")
+        for j, chunk in enumerate(line.split("\t")):
+            if j:
+                xml.append("<w:tab/>")
+            if chunk:
+                space = ' xml:space="preserve"' if chunk.strip() != chunk else ""
+                xml.append(f"<w:t{space}>{escape(chunk)}</w:t>")
+    return "".join(xml)
+
+
+def _cell_xml(cell, width):
+    start = _cell_start(width, cell.span, cell.vmerge, cell.fill)
+    if cell.text is None:
+        return f'{start}<w:p/></w:tc>'
+    return f'{start}{_paragraph_start(cell.align)}{_run_start(cell.bold, cell.italic, cell.size)}{_text_xml(cell.text)}</w:r></w:p></w:tc>'
+
+
+def row_cells(texts, **properties):
+    """
+    Return the cells of a row sharing the same properties, e.g. the shading and font size of an indicator.
+
+    :param texts: Text of each cell (None for an empty cell).
+    :type texts: iterable
+    :param properties: Properties of the cells (see TableCell).
+    :return: The cells of the row.
+    :rtype: list
+    """
+    return [TableCell(text, **properties) for text in texts]
+
+
+def table_xml(rows, columns, width, style_id=None, alignment=None):
+    """
+    Write the <w:tbl> element of a table whose columns share the available width evenly.
+
+    :param rows: Cells of each row, as TableCell objects or strings (plain text).
+    :type rows: iterable
+    :param columns: Number of grid columns of the table.
+    :type columns: int
+    :param width: Width available to the table.
+    :type width: docx.shared.Length
+    :param style_id: Identifier of the table style (e.g. "TableGrid").
+    :type style_id: str or None
+    :param alignment: Alignment of the table on the page (e.g. "center").
+    :type alignment: str or None
+    :return: The OOXML of the table.
+    :rtype: str
+    """
+    column_width = Emu(width / columns).twips
+    xml = [f'<w:tbl {nsdecls("w")}><w:tblPr>']
+    if style_id:
+        xml.append(f'<w:tblStyle w:val="{style_id}"/>')
+    xml.append('<w:tblW w:type="auto" w:w="0"/>')
+    if alignment:
+        xml.append(f'<w:jc w:val="{alignment}"/>')
+    xml.append(f'{_TABLE_LOOK}</w:tblPr><w:tblGrid>')
+    xml.append(f'<w:gridCol w:w="{column_width}"/>' * columns)
+    xml.append('</w:tblGrid>')
+    for row in rows:
+        xml.append('<w:tr>')
+        for cell in row:
+            xml.append(_cell_xml(TableCell(cell) if isinstance(cell, str) else cell, column_width))
+        xml.append('</w:tr>')
+    xml.append('</w:tbl>')
+    return "".join(xml)
+
+
+def add_table(doc, rows, columns, style="Table Grid", alignment=None):
+    """
+    Append a table built from rows of cells to a document, as python-docx's doc.add_table would place it.
+
+    :param doc: The Document object to add the table to.
+    :type doc: docx.Document
+    :param rows: Cells of each row, as TableCell objects or strings (plain text).
+    :type rows: iterable
+    :param columns: Number of grid columns of the table.
+    :type columns: int
+    :param style: Name of the table style.
+    :type style: str or None
+    :param alignment: Alignment of the table on the page (e.g. "center").
+    :type alignment: str or None
+    :return: The added table.
+    :rtype: docx.table.Table
+    """
+    style_id = doc.part.get_style_id(style, WD_STYLE_TYPE.TABLE) if style else None
+    tbl = parse_xml(table_xml(rows, columns, doc._block_width, style_id, alignment))
+    doc.element.body._insert_tbl(tbl)
+    return Table(tbl, doc._body)
@@ -0,0 +1,283 @@
+"""
+evaluation.py
+=============
+
+This utilities module computes the EQA evaluation indicators of a distribution (RSV subtyping, clade,
+legacy clade, genome coverage, Ns, similarity and mean read coverage) for all labs and all samples at once.
+
+The metrics of the distribution are laid out as a labs x samples x metrics array. Pass flags, participant
+counts and the mean/IQR of the other participants are computed once for every lab with leave-one-out
+reductions over that array, so the "your result" rows of a lab report are read from slices of the
+precomputed arrays instead of being recomputed with one Python pass per indicator. In bulk report
+generation the evaluation is built once per distribution and shared by every organization.
+
+Functions:
+    subtype_assignment(user_subtype, intended_subtype)
+        Translates a Nextclade "original"/"alternative" subtype call into RSV-A/RSV-B.
+
+Classes:
+    DistributionEvaluation(report_data, sample_reference_map, reference_lab="9999")
+        Evaluation indicators of every lab of a distribution.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import warnings
+import numpy as np
+from project.utils.references import subtype_of
+
+# Evaluation tables, in report order
+INDICATORS = ["RSV_Subtyping", "Clade", "Legacy_clade", "Genome Coverage (%)", "Ns in Sequence (%)", "Similarity (%)", "Read Coverage (mean)"]
+
+# Numeric indicators: (table, metric key, scale, criterion, decimals of the displayed value)
+NUMERIC_INDICATORS = [
+    ("Genome Coverage (%)", "coverage", 100, "90% or higher", 1),
+    ("Ns in Sequence (%)", "Ns", 1, "2% or lower", 1),
+    ("Similarity (%)", "similarity", 1, "95% or higher", 1),
+    ("Read Coverage (mean)", "Mean coverage depth", 1, "50 or higher", 0),
+]
+
+# Categorical indicators: (table, metric key)
+CATEGORICAL_INDICATORS = [
+    ("RSV_Subtyping", "subtype"),
+    ("Clade", "clade"),
+    ("Legacy_clade", "G_clade"),
+]
+
+
+def subtype_assignment(user_subtype, intended_subtype):
+    """
+    Translate a Nextclade subtype call into RSV-A/RSV-B.
+
+    :param user_subtype: "original" if the sample matched its intended reference, "alternative" if it matched the other one.
+    :type user_subtype: str
+    :param intended_subtype: Subtype of the reference the sample was distributed with ("RSV-A" or "RSV-B").
+    :type intended_subtype: str
+    :return: The assigned subtype, or user_subtype unchanged when it is neither (e.g. 'N/A').
+    :rtype: str
+    """
+    if user_subtype == "original":
+        return intended_subtype
+    elif user_subtype == "alternative":
+        return "RSV-B" if intended_subtype == "RSV-A" else "RSV-A"
+    return user_subtype
+
+
+def _passes(table, values):
+    """
+    Return the pass flags of a numeric indicator, with the thresholds of the evaluation criteria (NaN never passes).
+    """
+    with np.errstate(invalid="ignore"):
+        if table == "Genome Coverage (%)":
+            return values > 0.90
+        if table == "Ns in Sequence (%)":
+            return values <= 2
+        if table == "Similarity (%)":
+            return values > 95
+        return values > 50
+
+
+def _number(value):
+    """
+    Return a metric as a float, NaN when it is missing ('N/A' or absent).
+    """
+    return np.nan if value in (None, "N/A") else float(value)
+
+
+class DistributionEvaluation:
+    """
+    Evaluation indicators of every lab of a distribution.
+
+    Builds, once, a float array ``values[lab, sample, metric]`` of the numeric metrics (NaN when missing),
+    an object array ``calls[lab, sample, indicator]`` of the subtype/clade calls, and the pass flags of
+    every lab for every indicator. Per-lab summaries of the other participants (the reference lab and the
+    lab itself excluded) are leave-one-out reductions over the lab axis, computed for all labs together.
+
+    :param report_data: Parsed metrics as a nested {lab: {sample: metrics}} mapping.
+    :type report_data: Mapping
+    :param sample_reference_map: Reference genome of each sample, keyed by sample name.
+    :type sample_reference_map: dict
+    :param reference_lab: The reference lab, left out of the participant statistics.
+    :type reference_lab: str
+    """
+    def __init__(self, report_data, sample_reference_map, reference_lab="9999"):
+        self.reference_lab = reference_lab
+        self.labs = sorted(report_data)
+        self.samples = sorted({sample for lab in self.labs for sample in report_data[lab]})
+        self.lab_index = {lab: i for i, lab in enumerate(self.labs)}
+        self.intended_subtypes = [
+            subtype_of(sample_reference_map.get(sample)) for sample in self.samples
+        ]
+
+        shape = (len(self.labs), len(self.samples))
+        self.present = np.zeros(shape, dtype=bool)
+        self.values = np.full(shape + (len(NUMERIC_INDICATORS),), np.nan)
+        self.calls = np.full(shape + (len(CATEGORICAL_INDICATORS),), "N/A", dtype=object)
+        for i, lab in enumerate(self.labs):
+            for j, sample in enumerate(self.samples):
+                metrics = report_data[lab].get(sample)
+                if metrics is None:
+                    continue
+                self.present[i, j] = True
+                for k, (_, key, _, _, _) in enumerate(NUMERIC_INDICATORS):
+                    self.values[i, j, k] = _number(metrics.get(key))
+                for k, (_, key) in enumerate(CATEGORICAL_INDICATORS):
+                    self.calls[i, j, k] = metrics.get(key, "N/A")
+
+        # Other participants: labs that submitted the sample, except the reference lab
+        participants = self.present.copy()
+        if reference_lab in self.lab_index:
+            participants[self.lab_index[reference_lab]] = False
+        self.participants = participants
+
+        # Labs with a Nextclade result (mean depth comes from Qualimap and is judged on its own)
+        has_result = ~np.isnan(self.values[:, :, 0])
+        self.valid = np.repeat(has_result[:, :, None], len(NUMERIC_INDICATORS), axis=2)
+        self.valid[:, :, 3] = ~np.isnan(self.values[:, :, 3])
+
+        # Pass flags of every lab, for every indicator (in INDICATORS order)
+        self.reference_calls = self._reference_calls()
+        passed = np.zeros(shape + (len(INDICATORS),), dtype=bool)
+        passed[:, :, 0] = has_result & (self.calls[:, :, 0] == "original")
+        passed[:, :, 1] = has_result & (self.calls[:, :, 1] == self.reference_calls[None, :, 1])
+        passed[:, :, 2] = self.calls[:, :, 2] == self.reference_calls[None, :, 2]
+        for k, (table, _, _, _, _) in enumerate(NUMERIC_INDICATORS):
+            passed[:, :, 3 + k] = self.valid[:, :, k] & _passes(table, self.values[:, :, k])
+        self.passed = passed & participants[:, :, None]
+
+        # Leave-one-out statistics of the other participants, for every lab at once
+        self.participant_counts = participants.sum(axis=0)[None, :] - participants
+        self.pass_counts = self.passed.sum(axis=0)[None, :, :] - self.passed
+        self._leave_one_out_stats()
+
+    def _reference_calls(self):
+        """
+        Return the subtype/clade calls of the reference lab for every sample ('N/A' if it did not submit it).
+        """
+        if self.reference_lab not in self.lab_index:
+            return np.full((len(self.samples), len(CATEGORICAL_INDICATORS)), "N/A", dtype=object)
+        return self.calls[self.lab_index[self.reference_lab]]
+
+    def _leave_one_out_stats(self):
+        """
+        Compute, for every lab, the mean and quartiles of the other participants' values of each numeric indicator.
+
+        The values of the participants are broadcast to a labs x labs x samples x metrics array whose diagonal
+        (a lab's own values) is masked with NaN, then reduced over the second axis.
+        """
+        scales = np.array([scale for _, _, scale, _, _ in NUMERIC_INDICATORS], dtype=float)
+        others = np.where(self.valid & self.participants[:, :, None], self.values * scales, np.nan)
+        n_labs = len(self.labs)
+        stacked = np.broadcast_to(others, (n_labs,) + others.shape).copy()
+        stacked[np.arange(n_labs), np.arange(n_labs)] = np.nan
+
+        # NaN sorts last, so the n valid values of each slice come first (np.nanpercentile loops in Python here)
+        stacked.sort(axis=1)
+        counts = np.sum(~np.isnan(stacked), axis=1)
+        self.other_counts = counts
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # Empty slices: no other participant has a value
+            self.other_means = np.nansum(stacked, axis=1) / counts
+            self.other_q1, self.other_q3 = (self._sorted_percentile(stacked, counts, q) for q in (0.25, 0.75))
+
+    @staticmethod
+    def _sorted_percentile(stacked, counts, q):
+        """
+        Return the q-quantile over axis 1 of an array sorted along it, with the first counts values valid
+        (linear interpolation, as np.percentile).
+        """
+        position = q * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+        low = np.take_along_axis(stacked, lower[:, None], axis=1)[:, 0]
+        high = np.take_along_axis(stacked, upper[:, None], axis=1)[:, 0]
+        result = low + (high - low) * (position - lower)
+        return np.where(counts > 0, result, np.nan)
+
+    def lab_view(self, lab):
+        """
+        Return the slices of the evaluation arrays belonging to one lab.
+
+        :param lab: Name of the lab.
+        :type lab: str
+        :return: "present", "values", "calls", "passed", "participant_counts", "pass_counts", "other_counts",
+                 "other_means", "other_q1", "other_q3", each indexed by sample first.
+        :rtype: dict
+        """
+        i = self.lab_index[lab]
+        return {
+            "present": self.present[i],
+            "values": self.values[i],
+            "calls": self.calls[i],
+            "passed": self.passed[i],
+            "participant_counts": self.participant_counts[i],
+            "pass_counts": self.pass_counts[i],
+            "other_counts": self.other_counts[i],
+            "other_means": self.other_means[i],
+            "other_q1": self.other_q1[i],
+            "other_q3": self.other_q3[i],
+        }
+
+    def evaluation_data(self, user_lab):
+        """
+        Return the evaluation table rows of a lab, in the layout expected by the DOCX report.
+
+        Samples the lab did not submit are skipped.
+
+        :param user_lab: Name of the lab the report is written for.
+        :type user_lab: str
+        :return: A dictionary keyed by indicator (see INDICATORS) of row lists. Categorical rows are
+                 [sample, lab call, intended, reference call, "Met"/"Not met", "pass/count (%)"], numeric rows
+                 [sample, lab value, criterion, reference value, "Met"/"Not met", "mean (Q1-Q3)", "pass/count (%)"].
+        :rtype: dict
+        """
+        evaluation_data = {indicator: [] for indicator in INDICATORS}
+        if user_lab not in self.lab_index:
+            return evaluation_data
+        view = self.lab_view(user_lab)
+        reference = self.lab_view(self.reference_lab) if self.reference_lab in self.lab_index else None
+
+        for j, sample in enumerate(self.samples):
+            if not view["present"][j]:
+                continue
+            count = int(view["participant_counts"][j])
+
+            def pass_string(k):
+                passed = int(view["pass_counts"][j, k])
+                return f"{passed}/{count} ({(passed * 100) // count if count else 0}%)"
+
+            # Subtype, clade and legacy clade
+            intended_subtype = self.intended_subtypes[j]
+            user_subtype = subtype_assignment(view["calls"][j, 0], intended_subtype)
+            reference_subtype = subtype_assignment(self.reference_calls[j, 0], intended_subtype)
+            evaluation_data["RSV_Subtyping"].append([
+                sample, user_subtype, intended_subtype, reference_subtype,
+                "Met" if user_subtype == intended_subtype else "Not met", pass_string(0),
+            ])
+            for k in (1, 2):
+                user_call, intended = view["calls"][j, k], self.reference_calls[j, k]
+                evaluation_data[INDICATORS[k]].append([
+                    sample, user_call, intended, intended, "Met" if user_call == intended else "Not met", pass_string(k),
+                ])
+
+            # Numeric indicators
+            for k, (table, _, scale, criterion, decimals) in enumerate(NUMERIC_INDICATORS):
+                user_value = view["values"][j, k]
+                reference_value = reference["values"][j, k] if reference is not None else np.nan
+                shown = "N/A" if np.isnan(user_value) else round(float(user_value) * scale, decimals)
+                if decimals == 0 and shown != "N/A":
+                    met = shown > 50  # The mean depth is judged on its displayed (rounded) value
+                else:
+                    met = shown != "N/A" and bool(_passes(table, user_value))
+                if view["other_counts"][j, k]:
+                    iqr = (f"{round(view['other_means'][j, k])} "
+                           f"({round(view['other_q1'][j, k])}-{round(view['other_q3'][j, k])})")
+                else:
+                    iqr = "N/A"
+                evaluation_data[table].append([
+                    sample, shown, criterion,
+                    "N/A" if np.isnan(reference_value) else round(float(reference_value) * scale, decimals),
+                    "Met" if met else "Not met", iqr, pass_string(3 + k),
+                ])
+        return evaluation_data
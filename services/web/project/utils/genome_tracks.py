@@ -0,0 +1,242 @@
+"""
+genome_tracks.py
+================
+
+This utilities module draws the genome tracks of a lab's sample (gene annotation, sequence variants,
+consensus coverage and read coverage) in the current process, with matplotlib. It replaces the
+pyGenomeTracks command line, which needed a tracks.ini file and copies of the track files for every figure
+and paid the start-up of a Python interpreter each time.
+
+Coverage tracks are read from the bigWig files of the pipeline with pyBigWig, averaged over a fixed number
+of bins. Annotations are parsed once per process and reused by the next figures.
+
+Functions:
+    parse_region(region)
+        Splits a "chrom:start-end" region.
+    read_annotation(annotation)
+        Reads the genes of a GTF/GFF3 annotation file (cached per process).
+    read_variants(bed_path, chrom, start, end)
+        Reads the sequence variants of a BED file in a region.
+    read_coverage(bigwig_file, chrom, start, end, bins=NUMBER_OF_BINS)
+        Reads the mean coverage of a bigWig file in bins of a region.
+    plot_genome_tracks(annotation, region, bed_path, bigwig_file, bigwig_consensus_file, profile=DEFAULT_RENDER_PROFILE, vector=False)
+        Draws the annotation, variant and coverage tracks of a sample.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import os, re
+from functools import lru_cache
+import numpy as np
+import pyBigWig
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+from project.utils.render_profiles import DEFAULT_RENDER_PROFILE, save_figure
+
+NUMBER_OF_BINS = 700
+CM = 1 / 2.54
+FIGURE_WIDTH = 40 * CM
+# Height of each track, in cm (as in the former tracks.ini)
+TRACK_HEIGHTS = {"annotation": 2, "bed": 3, "consensus": 1, "reads": 3}
+
+_GFF3_ATTRIBUTE = re.compile(r'([^=;\s]+)=([^;]*)')
+_GTF_ATTRIBUTE = re.compile(r'(\S+)\s+"([^"]*)"')
+
+
+def parse_region(region):
+    """
+    Split a "chrom:start-end" region (1-based, inclusive).
+
+    :param region: The region, e.g. "EPI_ISL_412866:1-15225".
+    :type region: str
+    :return: The chromosome, and the 0-based start and end of the region.
+    :rtype: (str, int, int)
+    """
+    chrom, interval = region.rsplit(":", 1)
+    start, end = interval.replace(",", "").split("-")
+    return chrom, int(start) - 1, int(end)
+
+
+@lru_cache(maxsize=None)
+def read_annotation(annotation):
+    """
+    Read the genes of an annotation file, in GTF (gene_id "NS1";) or GFF3 (gene_name=NS1;) format.
+
+    The result is cached per process: every report uses the annotation of one of the two references.
+
+    :param annotation: Path of the annotation file.
+    :type annotation: str
+    :return: The genes as (chrom, 0-based start, end, strand, name) tuples, sorted by start.
+    :rtype: tuple
+    """
+    genes = []
+    with open(annotation) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 9 or fields[2] != "gene":
+                continue
+            attributes = dict(_GFF3_ATTRIBUTE.findall(fields[8])) or dict(_GTF_ATTRIBUTE.findall(fields[8]))
+            name = attributes.get("gene_name") or attributes.get("Name") or attributes.get("gene_id") or attributes.get("gene", "")
+            genes.append((fields[0], int(fields[3]) - 1, int(fields[4]), fields[6], name))
+    return tuple(sorted(genes, key=lambda gene: gene[1]))
+
+
+def read_variants(bed_path, chrom, start, end):
+    """
+    Read the sequence variants of a BED file (chrom, start, end, ref, alt) in a region.
+
+    :param bed_path: Path of the BED file.
+    :type bed_path: str
+    :param chrom: Chromosome of the region.
+    :type chrom: str
+    :param start: 0-based start of the region.
+    :type start: int
+    :param end: End of the region.
+    :type end: int
+    :return: The variants as (start, end, label) tuples.
+    :rtype: list
+    """
+    variants = []
+    with open(bed_path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 3 or fields[0] != chrom or line.startswith(("#", "track", "browser")):
+                continue
+            variant_start, variant_end = int(fields[1]), int(fields[2])
+            if variant_end > start and variant_start < end:
+                variants.append((variant_start, variant_end, ">".join(fields[3:5])))
+    return variants
+
+
+def read_coverage(bigwig_file, chrom, start, end, bins=NUMBER_OF_BINS):
+    """
+    Read the mean coverage of a bigWig file in bins of a region.
+
+    :param bigwig_file: Path of the bigWig file.
+    :type bigwig_file: str
+    :param chrom: Chromosome of the region.
+    :type chrom: str
+    :param start: 0-based start of the region.
+    :type start: int
+    :param end: End of the region.
+    :type end: int
+    :param bins: Number of bins.
+    :type bins: int
+    :return: The start of each bin and its mean coverage (0 where the file has no data).
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    with pyBigWig.open(bigwig_file) as bw:
+        end = min(end, bw.chroms().get(chrom, end))
+        bins = max(1, min(bins, end - start))
+        values = bw.stats(chrom, start, end, type="mean", nBins=bins)
+    positions = np.linspace(start, end, bins, endpoint=False)
+    return positions, np.array([value if value is not None else 0 for value in values], dtype=float)
+
+
+def _pack_rows(genes):
+    # Greedily places overlapping genes on separate rows
+    row_ends = []
+    rows = []
+    for _, start, end, _, _ in genes:
+        for row, row_end in enumerate(row_ends):
+            if start >= row_end:
+                row_ends[row] = end
+                break
+        else:
+            row = len(row_ends)
+            row_ends.append(end)
+        rows.append(row)
+    return rows, max(len(row_ends), 1)
+
+
+def _draw_annotation(ax, genes, start, end):
+    rows, row_count = _pack_rows(genes)
+    for (_, gene_start, gene_end, strand, name), row in zip(genes, rows):
+        y = row_count - row - 1
+        ax.add_patch(Rectangle((gene_start, y + 0.35), gene_end - gene_start, 0.3, color="green", linewidth=0))
+        if strand in "+-":
+            ax.annotate("", xy=(gene_end if strand == "+" else gene_start, y + 0.5),
+                        xytext=(gene_start if strand == "+" else gene_end, y + 0.5),
+                        arrowprops=dict(arrowstyle="->", color="white", linewidth=0.8))
+        ax.text((max(gene_start, start) + min(gene_end, end)) / 2, y + 0.2, name, ha="center", va="top", fontsize=7)
+    ax.set_ylim(-0.2, row_count)
+    ax.set_yticks([])
+    ax.spines["left"].set_visible(False)
+
+
+def _draw_variants(ax, variants):
+    rows, row_count = _pack_rows([(None, variant_start, variant_end, None, None) for variant_start, variant_end, _ in variants])
+    for (variant_start, variant_end, label), row in zip(variants, rows):
+        y = row_count - row - 1
+        # Variants are a few bases wide, drawn as lines so they stay visible at the scale of the genome
+        ax.vlines((variant_start + variant_end) / 2, y + 0.4, y + 0.9, color="purple", linewidth=1.5)
+        if label:
+            ax.text(variant_start, y + 0.3, label, ha="center", va="top", fontsize=6)
+    ax.set_ylim(-0.2, row_count)
+    ax.set_yticks([])
+    ax.spines["left"].set_visible(False)
+
+
+def _draw_coverage(ax, bigwig_file, chrom, start, end, color):
+    positions, values = read_coverage(bigwig_file, chrom, start, end)
+    ax.fill_between(positions, values, step="post", color=color, linewidth=0)
+    top = values.max() if len(values) and values.max() > 0 else 1
+    ax.set_ylim(0, top * 1.05)
+    ax.set_yticks([0, top])
+    ax.set_yticklabels(["0", f"{top:.0f}"], fontsize=7)
+
+
+def plot_genome_tracks(annotation, region, bed_path, bigwig_file, bigwig_consensus_file, profile=DEFAULT_RENDER_PROFILE, vector=False):
+    """
+    Draw the annotation, variant and coverage tracks of a sample, read straight from the pipeline outputs.
+
+    :param annotation: Path to the GTF/GFF3 annotation of the reference.
+    :type annotation: str
+    :param region: Genomic region to visualize, e.g. "EPI_ISL_412866:1-15225".
+    :type region: str
+    :param bed_path: Path to the BED file with sequence variants.
+    :type bed_path: str
+    :param bigwig_file: Path to the BigWig file of the read coverage, or None if no reads were submitted.
+    :type bigwig_file: str or None
+    :param bigwig_consensus_file: Path to the consensus BigWig file.
+    :type bigwig_consensus_file: str
+    :param profile: Render profile of the figure (see render_profiles).
+    :type profile: str
+    :param vector: Whether the output supports SVG (see render_profiles.figure_format).
+    :type vector: bool
+    :return: The encoded figure.
+    :rtype: bytes
+    """
+    chrom, start, end = parse_region(region)
+    genes = [gene for gene in read_annotation(annotation) if gene[0] == chrom and gene[2] > start and gene[1] < end]
+    tracks = [
+        ("annotation", f"{os.path.basename(annotation).split('.')[0]} genes", lambda ax: _draw_annotation(ax, genes, start, end)),
+        ("bed", "Seq. variants", lambda ax: _draw_variants(ax, read_variants(bed_path, chrom, start, end))),
+        ("consensus", "Seq. coverage", lambda ax: _draw_coverage(ax, bigwig_consensus_file, chrom, start, end, "grey")),
+    ]
+    # Only draw the read coverage if reads were uploaded
+    if bigwig_file is not None:
+        tracks.append(("reads", "Read Coverage", lambda ax: _draw_coverage(ax, bigwig_file, chrom, start, end, "blue")))
+
+    heights = [TRACK_HEIGHTS[kind] for kind, _, _ in tracks]
+    # Extra height below the last track for the genomic coordinates
+    fig = Figure(figsize=(FIGURE_WIDTH, (sum(heights) + 1.5) * CM))
+    axes = fig.subplots(len(heights), 1, sharex=True, gridspec_kw={"height_ratios": heights, "hspace": 0.15})
+    for ax, (_, title, draw) in zip(axes, tracks):
+        draw(ax)
+        ax.set_xlim(start, end)
+        ax.set_ylabel(title, rotation=0, ha="right", va="center", fontsize=9)
+        ax.tick_params(axis="x", bottom=False)
+        for side in ("top", "right", "bottom"):
+            ax.spines[side].set_visible(False)
+
+    # The last track carries the genomic coordinates
+    axis = axes[-1]
+    axis.spines["bottom"].set_visible(True)
+    axis.tick_params(axis="x", bottom=True, labelsize=8)
+    axis.set_xlabel(chrom, fontsize=9)
+    fig.subplots_adjust(left=0.12, right=0.98, top=0.98, bottom=1.2 / (sum(heights) + 1.5))
+    return save_figure(fig, profile, vector)
@@ -0,0 +1,190 @@
+"""
+metrics_frame.py
+================
+
+This utilities module provides a columnar (pandas) representation of the metrics of a distribution:
+one row per (lab, sample), NaN for missing values instead of 'N/A' strings, and categorical lab,
+sample, platform and clade columns. The aggregations of the dashboard endpoints (participants per sample,
+platform summaries) are then vectorized group-bys instead of Python loops over nested dictionaries.
+
+A Parquet snapshot of the frame is written to data/<distribution>/metrics.parquet whenever the stored
+metrics or the sequencing platforms of the distribution change, and memory-mapped when read back.
+
+Functions:
+    build_metrics_frame(report_data, platform_map=None)
+        Converts a nested {lab: {sample: metrics}} dictionary into a DataFrame.
+    snapshot_path(distribution_name)
+        Returns the path of the Parquet snapshot of a distribution.
+    write_metrics_snapshot(distribution)
+        Builds the frame of a distribution from the stored metrics and writes its Parquet snapshot.
+    load_metrics_frame(distribution)
+        Returns the frame of a distribution, from its snapshot when available.
+    participants_per_sample(frame)
+        Counts the labs that submitted each sample.
+    platform_aggregates(frame, sample)
+        Aggregates the metrics of one sample per sequencing platform.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import os
+import numpy as np
+import pandas as pd
+from project.utils.sql_models import SampleMetrics
+from project.utils.metrics_store import load_report_data, get_platform_map
+
+# Frame columns, named after the SampleMetrics columns
+NUMERIC_COLUMNS = [
+    "coverage_20x", "mean_depth", "std_depth", "median_depth", "uniformity",
+    "coverage", "total_missing", "ns", "substitutions", "deletions", "insertions", "frame_shifts", "similarity",
+]
+CATEGORICAL_COLUMNS = ["lab", "sample", "platform", "clade", "g_clade", "subtype"]
+STRING_COLUMNS = ["seq_name", "fasta", "bam", "bai"]
+
+
+def build_metrics_frame(report_data, platform_map=None):
+    """
+    Convert a nested {lab: {sample: metrics}} dictionary into a DataFrame with one row per (lab, sample).
+
+    :param report_data: Parsed metrics, as returned by metrics_store.load_report_data().
+    :type report_data: dict
+    :param platform_map: Sequencing type of each submission, keyed by (lab, sample). "N/A" when missing.
+    :type platform_map: dict or None
+    :return: The metrics frame, sorted by lab and sample.
+    :rtype: pandas.DataFrame
+    """
+    platform_map = platform_map or {}
+    records = []
+    for lab, samples in report_data.items():
+        for sample, metrics in samples.items():
+            record = {"lab": lab, "sample": sample, "platform": platform_map.get((lab, sample), "N/A")}
+            for key, column in SampleMetrics.FIELDS.items():
+                value = metrics.get(key, 'N/A')
+                record[column] = np.nan if value == 'N/A' else value
+            records.append(record)
+
+    frame = pd.DataFrame.from_records(records, columns=CATEGORICAL_COLUMNS + STRING_COLUMNS + NUMERIC_COLUMNS)
+    frame[NUMERIC_COLUMNS] = frame[NUMERIC_COLUMNS].astype(np.float64)
+    for column in CATEGORICAL_COLUMNS:
+        frame[column] = frame[column].astype("category")
+    return frame.sort_values(["lab", "sample"], ignore_index=True)
+
+
+def snapshot_path(distribution_name):
+    """
+    Return the path of the Parquet snapshot of a distribution.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :return: data/<distribution>/metrics.parquet
+    :rtype: str
+    """
+    return os.path.join("data", distribution_name, "metrics.parquet")
+
+
+def write_metrics_snapshot(distribution):
+    """
+    Build the metrics frame of a distribution from the stored metrics and write its Parquet snapshot.
+
+    The file is written next to the target and renamed, so readers never see a partial snapshot.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :return: The written frame.
+    :rtype: pandas.DataFrame
+    """
+    frame = build_metrics_frame(load_report_data(distribution), get_platform_map(distribution))
+    path = snapshot_path(distribution.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return frame
+
+
+def load_metrics_frame(distribution):
+    """
+    Return the metrics frame of a distribution.
+
+    Reads (memory-mapped) the Parquet snapshot if there is one, otherwise builds it and writes the snapshot.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :return: The metrics frame.
+    :rtype: pandas.DataFrame
+    """
+    path = snapshot_path(distribution.name)
+    if os.path.isfile(path):
+        return pd.read_parquet(path, memory_map=True)
+    return write_metrics_snapshot(distribution)
+
+
+def participants_per_sample(frame):
+    """
+    Count the labs that submitted each sample.
+
+    :param frame: A metrics frame.
+    :type frame: pandas.DataFrame
+    :return: The number of participants, keyed by sample.
+    :rtype: dict
+    """
+    counts = frame.groupby("sample", observed=True).size()
+    return {sample: int(count) for sample, count in counts.items()}
+
+
+def _most_frequent(values):
+    """
+    Return the most frequent non-empty value, ties going to the first one seen (as max() over an insertion-ordered dict).
+    """
+    values = values[values.notna() & (values.astype(str) != "")].astype(str)
+    if values.empty:
+        return "", {}
+    counts = values.groupby(values, sort=False).size()
+    return counts.idxmax(), {value: int(count) for value, count in counts.items()}
+
+
+def platform_aggregates(frame, sample):
+    """
+    Aggregate the metrics of one sample per sequencing platform.
+
+    Labs that declared several comma-separated platforms count towards each of them. Labs without a
+    valid Nextclade result (NaN coverage) still create their platform entry, but are left out of the means.
+
+    :param frame: A metrics frame.
+    :type frame: pandas.DataFrame
+    :param sample: Name of the sample.
+    :type sample: str
+    :return: Per platform: mean "coverage" (%), "Ns", "similarity" and "read_coverage" (rounded to 2 decimals),
+             "count", "read_count", most frequent "clade"/"G_clade" and their "clade_counts"/"g_clade_counts".
+             Metrics are "" for platforms without any valid result.
+    :rtype: dict
+    """
+    rows = frame[frame["sample"] == sample].copy()
+    rows["platform"] = rows["platform"].astype(str).str.split(",")
+    rows = rows.explode("platform")
+    rows["platform"] = rows["platform"].str.strip()
+
+    aggregates = {}
+    for platform, group in rows.groupby("platform", sort=False):
+        valid = group[group["coverage"].notna()]
+        depth = valid["mean_depth"].dropna()
+        clade, clade_counts = _most_frequent(valid["clade"])
+        g_clade, g_clade_counts = _most_frequent(valid["g_clade"])
+        agg = {
+            "count": len(valid),
+            "read_count": len(depth),
+            "clade_counts": clade_counts,
+            "g_clade_counts": g_clade_counts,
+        }
+        if len(valid):
+            agg["coverage"] = round(valid["coverage"].mean() * 100, 2)
+            agg["Ns"] = round(valid["ns"].mean(), 2)
+            agg["similarity"] = round(valid["similarity"].mean(), 2)
+            agg["read_coverage"] = round(depth.mean(), 2) if len(depth) else ""
+            agg["clade"], agg["G_clade"] = clade, g_clade
+        else:
+            agg["coverage"] = agg["Ns"] = agg["similarity"] = agg["read_coverage"] = ""
+            agg["clade"] = agg["G_clade"] = ""
+        aggregates[platform] = agg
+    return aggregates
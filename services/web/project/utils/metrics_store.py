@@ -0,0 +1,182 @@
+"""
+metrics_store.py
+================
+
+This utilities module persists the metrics parsed by report_parser in the SampleMetrics table,
+and serves them back to the endpoints and report generators in the same nested layout
+({lab: {sample: metrics}}) that the report_parser functions produce.
+
+Metrics are stored once per submission, when its Nextflow run completes (see upload.launch_nextflow),
+so that page views and report downloads become a single query instead of hundreds of file reads.
+Distributions that have not been populated yet (e.g. data mounted before this table existed) fall back
+to parsing the files; run ``manage.py backfill_metrics`` to populate them.
+
+Functions:
+    store_sample_metrics(distribution_name, organization_name, sample, sample_path, metrics=None)
+        Parses a sample directory and inserts or updates its SampleMetrics row.
+    backfill_distribution_metrics(distribution)
+        Parses every lab/sample directory of a distribution and stores their metrics.
+    load_report_data(distribution, sample=None)
+        Returns the nested {lab: {sample: metrics}} dictionary of a distribution, optionally restricted to one sample.
+    get_platform_map(distribution, sample=None)
+        Returns the sequencing type of every submission of a distribution, keyed by (lab, sample).
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import os
+from project.utils.sql_models import db, Distribution, Organization, SampleMetrics, Submission
+from project.utils.report_parser import (parse_sample_directory, parse_sample_directory_cached, parse_sample_directories,
+                                         list_sample_directories, process_sample_reports, LazyReportData)
+
+
+def store_sample_metrics(distribution_name, organization_name, sample, sample_path, metrics=None):
+    """
+    Parse a sample directory and insert or update its SampleMetrics row.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :param organization_name: Name of the organization (lab) that submitted the sample.
+    :type organization_name: str
+    :param sample: Name of the sample.
+    :type sample: str
+    :param sample_path: Directory holding the pipeline outputs of the sample.
+    :type sample_path: str
+    :param metrics: Metrics already parsed from sample_path (see report_parser.parse_sample_directory). If None, the directory is parsed.
+    :type metrics: dict or None
+    :return: The stored row, or None if the distribution/organization is unknown or the sample could not be parsed.
+    :rtype: SampleMetrics or None
+    """
+    dist = Distribution.query.filter_by(name=distribution_name).first()
+    org = Organization.query.filter_by(name=organization_name).first()
+    if not dist or not org:
+        print(f"Warning: cannot store metrics, unknown distribution '{distribution_name}' or organization '{organization_name}'")
+        return None
+
+    if metrics is None:
+        metrics = parse_sample_directory(sample_path, organization_name, sample)
+    if metrics is None:
+        return None
+
+    row = SampleMetrics.query.filter_by(distribution_id=dist.id, organization_id=org.id, sample=sample).first()
+    if row is None:
+        row = SampleMetrics(distribution_id=dist.id, organization_id=org.id, sample=sample)
+        db.session.add(row)
+    row.update_from_dict(metrics)
+    db.session.commit()
+    return row
+
+
+def backfill_distribution_metrics(distribution):
+    """
+    Parse every lab/sample directory of a distribution and store their metrics.
+
+    The directories are parsed on the pool configured by REPORT_PARSER_WORKERS/REPORT_PARSER_POOL
+    (see report_parser.parse_sample_directories), then stored one after the other.
+
+    :param distribution: The Distribution object to populate.
+    :type distribution: Distribution
+    :return: The number of samples stored.
+    :rtype: int
+    """
+    base_dir = f"data/{distribution.name}"
+    stored = 0
+    if not os.path.isdir(base_dir):
+        return stored
+    _, sample_dirs = list_sample_directories(base_dir)
+    for (lab, sample, sample_path), metrics in zip(sample_dirs, parse_sample_directories(sample_dirs, use_cache=False)):
+        if metrics is not None and store_sample_metrics(distribution.name, lab, sample, sample_path, metrics):
+            stored += 1
+    return stored
+
+
+def load_report_data(distribution, sample=None):
+    """
+    Return the parsed metrics of a distribution as a nested {lab: {sample: metrics}} dictionary.
+
+    Reads the SampleMetrics table; if the distribution has no stored metrics yet, the files under
+    data/<distribution>/ are parsed instead (lazily per lab, or only data/<distribution>/*/<sample>/
+    when a sample is given). The lab/sample directories of a populated distribution that have no stored
+    row (e.g. their metrics failed to be stored when their run completed) are read from their files.
+
+    :param distribution: The Distribution object to load.
+    :type distribution: Distribution
+    :param sample: If given, only the metrics of this sample are returned.
+    :type sample: str or None
+    :return: A nested mapping where each key is a lab name mapping to sample dictionaries with their metrics.
+    :rtype: dict or LazyReportData
+    """
+    query = (
+        db.session.query(Organization.name, SampleMetrics)
+        .join(SampleMetrics, SampleMetrics.organization_id == Organization.id)
+        .filter(SampleMetrics.distribution_id == distribution.id)
+    )
+    if sample is not None:
+        query = query.filter(SampleMetrics.sample == sample)
+    rows = query.order_by(Organization.name, SampleMetrics.sample).all()
+
+    base_dir = f"data/{distribution.name}"
+    if not rows and SampleMetrics.query.filter_by(distribution_id=distribution.id).first() is None:
+        if sample is not None:
+            return process_sample_reports(base_dir, sample)
+        return LazyReportData(base_dir)
+
+    report_data = {}
+    for lab, row in rows:
+        report_data.setdefault(lab, {})[row.sample] = row.to_dict()
+
+    unstored = _unstored_sample_directories(base_dir, report_data, sample)
+    for lab, sample_name, sample_path in unstored:
+        metrics = parse_sample_directory_cached(sample_path, lab, sample_name)
+        if metrics is not None:
+            report_data.setdefault(lab, {})[sample_name] = metrics
+    if unstored:
+        report_data = {lab: dict(sorted(samples.items())) for lab, samples in sorted(report_data.items())}
+    return report_data
+
+
+def _unstored_sample_directories(base_dir, report_data, sample=None):
+    # Lab/sample directories of a populated distribution without a stored row, as (lab, sample, path)
+    if not os.path.isdir(base_dir):
+        return []
+    unstored = []
+    for lab in sorted(os.listdir(base_dir)):
+        lab_path = os.path.join(base_dir, lab)
+        if not os.path.isdir(lab_path):
+            continue
+        samples = [sample] if sample is not None else sorted(os.listdir(lab_path))
+        for sample_name in samples:
+            sample_path = os.path.join(lab_path, sample_name)
+            if sample_name in report_data.get(lab, {}) or not os.path.isdir(sample_path):
+                continue
+            unstored.append((lab, sample_name, sample_path))
+            # Directories still waiting for their run have no outputs yet, the others should have been stored
+            if os.path.exists(os.path.join(sample_path, "genome_results.txt")) or os.path.exists(os.path.join(sample_path, "nextclade.output")):
+                print(f"Warning: no stored metrics for {lab}'s sample {sample_name} from {os.path.basename(base_dir)}, "
+                      f"reading its files (run manage.py backfill_metrics to store them)")
+    return unstored
+
+
+def get_platform_map(distribution, sample=None):
+    """
+    Return the sequencing type of every submission of a distribution, in a single query.
+
+    When a lab submitted the same sample several times, the most recent submission wins.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :param sample: If given, only the submissions of this sample are returned.
+    :type sample: str or None
+    :return: The sequencing type (e.g. "Illumina, ONT"), keyed by (lab, sample).
+    :rtype: dict
+    """
+    query = (
+        db.session.query(Organization.name, Submission.sample, Submission.sequencing_type)
+        .join(Submission, Submission.organization_id == Organization.id)
+        .filter(Submission.distribution_id == distribution.id)
+    )
+    if sample is not None:
+        query = query.filter(Submission.sample == sample)
+    rows = query.order_by(Submission.submission_date, Submission.id).all()
+    return {(lab, sample): sequencing_type for lab, sample, sequencing_type in rows}
@@ -0,0 +1,346 @@
+"""
+pdf_converter.py
+================
+
+This utilities module converts DOCX reports to PDF with LibreOffice instances that stay alive for a
+whole batch of reports, instead of paying LibreOffice's multi-second cold start for every document.
+
+A ConversionService owns one or more LibreOffice instances, each served by a thread that takes the
+documents submitted to a shared queue in batches. When the LibreOffice Python bindings (uno, shipped
+with the distribution's libreoffice package) are importable, every instance is a headless soffice
+listening on a UNO pipe and documents are converted one by one over UNO; otherwise each batch is
+converted with a single multi-file "soffice --convert-to pdf" call on the instance's warm profile.
+Each document has its own timeout (a stuck instance is killed and restarted), and instances are
+recycled after a number of documents to bound LibreOffice's memory growth.
+
+Classes:
+    ConversionError
+        A document could not be converted (LibreOffice error or timeout).
+    LibreOfficeInstance(profile_dir)
+        A warm headless LibreOffice instance driven over UNO.
+    LibreOfficeBatchInstance(profile_dir)
+        A LibreOffice profile used for multi-file "soffice --convert-to pdf" calls.
+    ConversionService(instances=None, batch_size=None, timeout=None, recycle_after=None, work_dir=None)
+        Queue of DOCX to PDF conversions served by warm LibreOffice instances.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import os, queue, shutil, subprocess, tempfile, threading, time, uuid
+from concurrent.futures import Future
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:  # The LibreOffice Python bindings are only available in the system Python of the container
+    uno = None
+
+PDF_CONVERTER_INSTANCES = int(os.environ.get("PDF_CONVERTER_INSTANCES", 1))  # Warm LibreOffice instances
+PDF_CONVERTER_BATCH_SIZE = int(os.environ.get("PDF_CONVERTER_BATCH_SIZE", 8))  # Documents taken from the queue at once
+PDF_CONVERSION_TIMEOUT = int(os.environ.get("PDF_CONVERSION_TIMEOUT", 120))  # Seconds allowed per document
+PDF_CONVERTER_RECYCLE_AFTER = int(os.environ.get("PDF_CONVERTER_RECYCLE_AFTER", 50))  # Documents before an instance is restarted
+STARTUP_TIMEOUT = 60  # Seconds allowed for a LibreOffice instance to accept connections
+
+
+class ConversionError(Exception):
+    """
+    A document could not be converted to PDF (LibreOffice error or timeout).
+    """
+
+
+def _pdf_path(docx_path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+
+
+def _kill(process):
+    if process is not None and process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+class LibreOfficeInstance:
+    """
+    A warm headless LibreOffice instance, started once and driven over a UNO pipe.
+
+    :param profile_dir: LibreOffice user profile of the instance (instances cannot share one).
+    :type profile_dir: str
+    """
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.process = None
+        self.desktop = None
+        self.converted = 0
+
+    def start(self):
+        """
+        Start soffice and connect to it, waiting up to STARTUP_TIMEOUT seconds for the pipe to accept connections.
+        """
+        pipe_name = f"rsv_{uuid.uuid4().hex}"
+        self.process = subprocess.Popen([
+            "soffice",
+            f"-env:UserInstallation=file://{os.path.abspath(self.profile_dir)}",
+            "--headless", "--invisible", "--nologo", "--nodefault", "--norestore", "--nofirststartwizard",
+            f"--accept=pipe,name={pipe_name};urp;StarOffice.ComponentContext",
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local_context)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionError("LibreOffice did not start")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        self.converted = 0
+
+    def stop(self):
+        """
+        Terminate the instance.
+        """
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+                self.process.wait(timeout=10)
+            except Exception:
+                pass
+            self.desktop = None
+        _kill(self.process)
+        self.process = None
+
+    def convert_batch(self, items, timeout):
+        """
+        Convert documents one by one. A document that does not finish within the timeout gets the instance
+        killed (and restarted for the next document).
+
+        :param items: (docx_path, output_dir) of each document.
+        :type items: list
+        :param timeout: Seconds allowed per document.
+        :type timeout: int
+        :return: The PDF path, or the ConversionError, of each document.
+        :rtype: list
+        """
+        results = []
+        for docx_path, output_dir in items:
+            if self.process is None or self.process.poll() is not None:
+                self.start()
+            pdf_path = _pdf_path(docx_path, output_dir)
+            watchdog = threading.Timer(timeout, _kill, args=(self.process,))
+            watchdog.start()
+            try:
+                doc = self.desktop.loadComponentFromURL(
+                    uno.systemPathToFileUrl(os.path.abspath(docx_path)), "_blank", 0,
+                    (PropertyValue(Name="Hidden", Value=True),))
+                try:
+                    doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                                   (PropertyValue(Name="FilterName", Value="writer_pdf_Export"),))
+                finally:
+                    doc.close(True)
+                results.append(pdf_path)
+            except Exception as e:
+                timed_out = not watchdog.is_alive()
+                self.stop()
+                message = f"timed out after {timeout}s" if timed_out else str(e)
+                results.append(ConversionError(f"Could not convert {os.path.basename(docx_path)}: {message}"))
+            finally:
+                watchdog.cancel()
+            self.converted += 1
+        return results
+
+
+class LibreOfficeBatchInstance:
+    """
+    A LibreOffice profile used for multi-file "soffice --convert-to pdf" calls, when UNO is not available.
+
+    The profile is created by the first call and reused by the following ones, which skips LibreOffice's
+    first-start initialisation; every batch still starts one soffice process.
+
+    :param profile_dir: LibreOffice user profile of the instance.
+    :type profile_dir: str
+    """
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.converted = 0
+
+    def start(self):
+        self.converted = 0
+
+    def stop(self):
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def _run(self, docx_paths, output_dir, timeout):
+        subprocess.run([
+            "soffice",
+            f"-env:UserInstallation=file://{os.path.abspath(self.profile_dir)}",
+            "--headless", "--norestore",
+            "--convert-to", "pdf",
+            "--outdir", output_dir,
+            *docx_paths,
+        ], check=True, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def convert_batch(self, items, timeout):
+        """
+        Convert the documents of each output directory with one soffice call. If the call fails or times out,
+        its documents are retried one by one, so a single broken document does not fail the whole batch.
+
+        :param items: (docx_path, output_dir) of each document.
+        :type items: list
+        :param timeout: Seconds allowed per document.
+        :type timeout: int
+        :return: The PDF path, or the ConversionError, of each document.
+        :rtype: list
+        """
+        by_output_dir = {}
+        for docx_path, output_dir in items:
+            by_output_dir.setdefault(output_dir, []).append(docx_path)
+
+        converted = {}
+        for output_dir, docx_paths in by_output_dir.items():
+            try:
+                self._run(docx_paths, output_dir, timeout * len(docx_paths))
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                if len(docx_paths) > 1:
+                    for docx_path in docx_paths:
+                        try:
+                            self._run([docx_path], output_dir, timeout)
+                        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                            pass
+            for docx_path in docx_paths:
+                converted[(docx_path, output_dir)] = _pdf_path(docx_path, output_dir)
+
+        results = []
+        for item in items:
+            pdf_path = converted[item]
+            if os.path.isfile(pdf_path):
+                results.append(pdf_path)
+            else:
+                results.append(ConversionError(f"Could not convert {os.path.basename(item[0])}"))
+        self.converted += len(items)
+        return results
+
+
+class ConversionService:
+    """
+    Queue of DOCX to PDF conversions served by warm LibreOffice instances.
+
+    Each instance is served by a thread that takes up to batch_size documents from the queue at once.
+    Use it as a context manager, so the instances are stopped and their profiles deleted at the end:
+
+        with ConversionService() as converter:
+            futures = [converter.submit(path, output_dir) for path in docx_paths]
+
+    Defaults come from the PDF_CONVERTER_INSTANCES, PDF_CONVERTER_BATCH_SIZE, PDF_CONVERSION_TIMEOUT and
+    PDF_CONVERTER_RECYCLE_AFTER environment variables.
+
+    :param instances: Number of LibreOffice instances.
+    :type instances: int or None
+    :param batch_size: Maximum number of documents converted per batch.
+    :type batch_size: int or None
+    :param timeout: Seconds allowed per document.
+    :type timeout: int or None
+    :param recycle_after: Number of documents after which an instance is restarted.
+    :type recycle_after: int or None
+    :param work_dir: Directory of the LibreOffice profiles (a temporary directory by default).
+    :type work_dir: str or None
+    """
+    def __init__(self, instances=None, batch_size=None, timeout=None, recycle_after=None, work_dir=None):
+        self.instances = instances or PDF_CONVERTER_INSTANCES
+        self.batch_size = batch_size or PDF_CONVERTER_BATCH_SIZE
+        self.timeout = timeout or PDF_CONVERSION_TIMEOUT
+        self.recycle_after = recycle_after or PDF_CONVERTER_RECYCLE_AFTER
+        self.work_dir = tempfile.mkdtemp(prefix="lo_", dir=work_dir)
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """
+        Start the instance threads. LibreOffice itself is started lazily, by the first batch of each instance.
+        """
+        instance_class = LibreOfficeInstance if uno is not None else LibreOfficeBatchInstance
+        for i in range(self.instances):
+            instance = instance_class(os.path.join(self.work_dir, f"profile_{i}"))
+            thread = threading.Thread(target=self._serve, args=(instance,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """
+        Wait for the queued conversions, stop the instances and delete their profiles.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def submit(self, docx_path, output_dir):
+        """
+        Queue the conversion of a document.
+
+        :param docx_path: Path of the DOCX file.
+        :type docx_path: str
+        :param output_dir: Directory where the PDF (same name, .pdf extension) is written.
+        :type output_dir: str
+        :return: A future resolving to the PDF path, or raising ConversionError.
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        self._queue.put((docx_path, output_dir, future))
+        return future
+
+    def _next_batch(self):
+        """
+        Block for the next document, then take the documents already waiting, up to batch_size.
+        Returns None when the service is closing.
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Leave the stop signal for after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _serve(self, instance):
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                batch = [(docx_path, output_dir, future) for docx_path, output_dir, future in batch
+                         if future.set_running_or_notify_cancel()]
+                if instance.converted >= self.recycle_after:
+                    instance.stop()
+                    instance.start()
+                try:
+                    results = instance.convert_batch([(docx_path, output_dir) for docx_path, output_dir, _ in batch], self.timeout)
+                except Exception as e:
+                    results = [ConversionError(str(e))] * len(batch)
+                for (_, _, future), result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        finally:
+            instance.stop()
+
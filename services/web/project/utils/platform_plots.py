@@ -0,0 +1,243 @@
+"""
+platform_plots.py
+=================
+
+This utilities module draws the aggregated platform plots of a sample (average genome coverage, Ns and
+similarity, and mean read coverage, per sequencing platform) shown in every lab's report.
+
+The averages and the bars of a sample are the same in every report: only the order of the platforms (the
+platforms of the reader's lab come first) and the "Your Platform" arrows depend on the lab. A SamplePlatformPlots
+object therefore aggregates the metrics once, draws the bars once per platform order, and only adds the arrows
+of a lab before saving. Each variant (platform order and arrows) is saved once, in memory, every other lab with
+the same variant gets the same image. The resolution, canvas size and encoding follow a render profile
+(see render_profiles).
+
+Functions:
+    aggregate_plot_metrics(sample_data)
+        Groups the metrics of a sample per sequencing platform, as plotted.
+
+Classes:
+    SamplePlatformPlots(sample_name, sample_data, profile=DEFAULT_RENDER_PROFILE)
+        Platform plots of one sample, shared by the reports of all labs.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import numpy as np
+from matplotlib.figure import Figure
+from project.utils.render_profiles import DEFAULT_RENDER_PROFILE, get_render_profile, save_figure
+
+
+def _split_platforms(sequencing_platform):
+    return [p.strip() for p in sequencing_platform.split(",")]
+
+
+def aggregate_plot_metrics(sample_data):
+    """
+    Group the metrics of a sample per sequencing platform, as plotted.
+
+    Unlike report_context.aggregate_platform_metrics, missing values (including mean depths) count as 0.
+
+    :param sample_data: Metrics of each lab for the sample, including their 'sequencing_platform'.
+    :type sample_data: dict
+    :return: The "coverage" (%), "similarity", "Ns" and "read_cov" values of each platform, keyed by platform.
+    :rtype: dict
+    """
+    grouped = {}
+    for lab, metrics in sample_data.items():
+        for platform in _split_platforms(metrics.get("sequencing_platform", "Unknown")):
+            if platform not in grouped:
+                grouped[platform] = {
+                    "coverage": [],
+                    "similarity": [],
+                    "Ns": [],
+                    "read_cov": []
+                }
+            grouped[platform]["coverage"].append(metrics["coverage"] * 100 if metrics["coverage"] != "N/A" else 0)
+            grouped[platform]["similarity"].append(metrics["similarity"] if metrics["similarity"] != "N/A" else 0)
+            grouped[platform]["Ns"].append(metrics["Ns"] if metrics["Ns"] != "N/A" else 0)
+            grouped[platform]["read_cov"].append(metrics["Mean coverage depth"] if metrics["Mean coverage depth"] != "N/A" else 0)
+    return grouped
+
+
+class SamplePlatformPlots:
+    """
+    Platform plots of one sample, shared by the reports of all labs.
+
+    :param sample_name: The name of the sample.
+    :type sample_name: str
+    :param sample_data: Metrics of each lab for the sample. Each value is expected to be a dict with keys
+                        "coverage", "similarity", "Ns", "Mean coverage depth", and "sequencing_platform".
+    :type sample_data: dict
+    :param profile: Name of the render profile of the figures (see render_profiles).
+    :type profile: str
+    """
+    def __init__(self, sample_name, sample_data, profile=DEFAULT_RENDER_PROFILE):
+        self.sample_name = sample_name
+        self.sample_data = sample_data
+        self.profile = profile
+        self.grouped = aggregate_plot_metrics(sample_data)
+        self._figures = {}  # Bars of each platform order, {highlighted platforms: (fig1, ax1, fig2, ax2, averages...)}
+        self._layouts = {}  # Subplot parameters of each figure before tight_layout
+        self._images = {}  # Saved images of each variant and format, {(variant, vector): (percentage plot, read coverage plot)}
+
+    def user_platforms(self, user_lab):
+        """
+        Return the sequencing platforms of a lab for this sample.
+
+        :param user_lab: The lab identifier.
+        :type user_lab: str
+        :return: The platforms of the lab, or an empty list if it did not submit the sample.
+        :rtype: list
+        """
+        if user_lab not in self.sample_data:
+            return []
+        return _split_platforms(self.sample_data[user_lab].get("sequencing_platform", "Unknown"))
+
+    def variant(self, user_lab, role):
+        """
+        Return what the plots of a lab depend on: its platforms present in the plot, and the arrow label.
+
+        :param user_lab: The lab identifier.
+        :type user_lab: str
+        :param role: User role determining the label of the arrows.
+        :type role: str
+        :return: The sorted highlighted platforms and the arrow label (None if nothing is highlighted).
+        :rtype: (tuple, str or None)
+        """
+        matching_platforms = tuple(sorted(p for p in self.user_platforms(user_lab) if p in self.grouped))
+        if not matching_platforms:
+            return (), None
+        return matching_platforms, "Your Platform" if role == "user" else "Reference lab platform"
+
+    def _draw(self, matching_platforms):
+        if matching_platforms in self._figures:
+            return self._figures[matching_platforms]
+
+        # Reorder platforms: user's platform first (if found), then alphabetical.
+        remaining_platforms = sorted(p for p in self.grouped if p not in matching_platforms)
+        sorted_platforms = list(matching_platforms) + remaining_platforms
+
+        # Build lists for plotting and include the submission counts in labels.
+        platforms = [f"{platform} ({len(self.grouped[platform]['coverage'])})" for platform in sorted_platforms]
+        avg_coverage = [np.mean(self.grouped[platform]["coverage"]) for platform in sorted_platforms]
+        avg_similarity = [np.mean(self.grouped[platform]["similarity"]) for platform in sorted_platforms]
+        avg_ns = [np.mean(self.grouped[platform]["Ns"]) for platform in sorted_platforms]
+        avg_read_cov = [np.mean(self.grouped[platform]["read_cov"]) for platform in sorted_platforms]
+
+        # --------------------------
+        # Plot 1: Percentage Metrics Plot
+        # --------------------------
+        figsize = get_render_profile(self.profile)["figsize"]
+        fig1 = Figure(figsize=figsize)
+        ax1 = fig1.subplots()
+        bar_width = 0.3
+        x_pos = np.arange(len(platforms))
+
+        # Stacked bars: Genome Coverage and Ns
+        ax1.bar(x_pos, avg_coverage, bar_width, label="Genome Coverage (%)", color="#1E3A5F", zorder=3)
+        ax1.bar(x_pos, avg_ns, bar_width, bottom=avg_coverage, label="Ns in Sequence (%)", color="#FBC02D", zorder=3)
+        # Offset bars for Similarity
+        ax1.bar(x_pos + bar_width, avg_similarity, bar_width, label="Similarity (%)", color="#F57C00", zorder=3)
+
+        ax1.set_xlabel("Sequencing Platform", fontsize=18)
+        ax1.set_ylabel("Percentage (%)", fontsize=18)
+        ax1.set_xticks(x_pos + bar_width / 2)
+        ax1.set_xticklabels(platforms, rotation=45, ha="right", fontsize=16)
+
+        # Optional horizontal thresholds
+        ax1.axhline(90, color="grey", linestyle="--", linewidth=1, zorder=-1)
+        ax1.axhline(95, color="blue", linestyle="--", linewidth=1, zorder=-1)
+
+        # Legend for percentage plot
+        handles1, labels1 = ax1.get_legend_handles_labels()
+        ax1.legend(handles=handles1, labels=labels1, loc="upper center",
+                   bbox_to_anchor=(0.5, 1.2), ncol=2, fontsize=14, bbox_transform=ax1.transAxes)
+
+        # --------------------------
+        # Plot 2: Read Coverage Plot
+        # --------------------------
+        fig2 = Figure(figsize=figsize)
+        ax2 = fig2.subplots()
+        bar_width2 = 0.5
+
+        ax2.bar(x_pos, avg_read_cov, bar_width2, color="grey", label="Read Coverage (Mean)")
+        ax2.set_yscale("log")
+        ax2.axhline(50, color="red", linestyle="--", linewidth=1, zorder=-1)
+        ax2.set_xlabel("Sequencing Platform", fontsize=18)
+        ax2.set_ylabel("Read Coverage (Mean)", fontsize=18)
+        ax2.set_xticks(x_pos)  # Explicitly set ticks before labels
+        ax2.set_xticklabels(platforms, rotation=45, ha="right", fontsize=16)
+        # Dynamically determine meaningful y-ticks
+        y_max = np.nanmax(avg_read_cov)
+        y_ticks = np.geomspace(50, y_max, num=6)  # Create log-spaced ticks
+        y_ticks = np.round(y_ticks, decimals=2)  # Round for better readability
+
+        # Set y-ticks using actual data values
+        ax2.set_yticks(y_ticks)
+        ax2.set_yticklabels([str(int(t)) if t >= 1 else f"{t:.2f}" for t in y_ticks], fontsize=14)
+
+        ax2.legend(loc="upper center", bbox_to_anchor=(0.5, 1.2), fontsize=14)
+
+        for fig in (fig1, fig2):
+            pars = fig.subplotpars
+            self._layouts[fig] = dict(left=pars.left, right=pars.right, bottom=pars.bottom, top=pars.top)
+        self._figures[matching_platforms] = (fig1, ax1, fig2, ax2, avg_coverage, avg_ns, avg_similarity, avg_read_cov)
+        return self._figures[matching_platforms]
+
+    def _save(self, fig, vector):
+        # tight_layout fitted the axes to the arrows of the previous variant, start again from the initial layout
+        fig.subplots_adjust(**self._layouts[fig])
+        fig.tight_layout()
+        return save_figure(fig, self.profile, vector)
+
+    def images(self, user_lab, role, vector=False):
+        """
+        Return the two platform plots of the sample, as seen by a lab.
+
+        :param user_lab: The lab identifier to highlight in the plot.
+        :type user_lab: str
+        :param role: User role determining the label of the arrows.
+        :type role: str
+        :param vector: Whether the output supports SVG figures (see render_profiles.figure_format).
+        :type vector: bool
+        :return: A tuple with the percentage plot, the read coverage plot (encoded as set by the render profile),
+                 and the user platforms.
+        :rtype: (bytes, bytes, list)
+        """
+        variant = self.variant(user_lab, role)
+        if (variant, vector) not in self._images:
+            matching_platforms, annotation_label = variant
+            fig1, ax1, fig2, ax2, avg_coverage, avg_ns, avg_similarity, avg_read_cov = self._draw(matching_platforms)
+
+            # Highlight the user_lab's sequencing platforms (they come first in the plot)
+            annotations1, annotations2 = [], []
+            for index in range(len(matching_platforms)):
+                top = max(avg_coverage[index] + avg_ns[index], avg_similarity[index])
+                annotations1.append(ax1.annotate(
+                    annotation_label,
+                    xy=(index, top + 5),
+                    xytext=(index, top + 15),
+                    arrowprops=dict(facecolor='red', arrowstyle="->"),
+                    ha="center",
+                    fontsize=14,
+                    color="red"
+                ))
+                y_position = avg_read_cov[index] * 1.2 if avg_read_cov[index]>10 else 10 # Move slightly above the bar
+                y_text_position = avg_read_cov[index] * 2.5  if avg_read_cov[index]>10 else 20# Text even higher
+                annotations2.append(ax2.annotate(
+                    annotation_label,
+                    xy=(index, y_position),
+                    xytext=(index, y_text_position),
+                    arrowprops=dict(facecolor='red', arrowstyle="->"),
+                    ha="center",
+                    fontsize=14,
+                    color="red"
+                ))
+
+            self._images[variant, vector] = (self._save(fig1, vector), self._save(fig2, vector))
+            for annotation in annotations1 + annotations2:
+                annotation.remove()
+        percentage_plot, read_coverage_plot = self._images[variant, vector]
+        return percentage_plot, read_coverage_plot, self.user_platforms(user_lab)
@@ -0,0 +1,129 @@
+"""
+redis_cache.py
+==============
+
+This utilities module provides a small JSON cache stored in Redis, shared by every gunicorn
+worker and RQ worker of the application. Entries are evicted in least-recently-used order once
+the namespace holds more than a configured number of entries, and optionally expire after a TTL.
+
+Functions:
+    get_redis()
+        Returns a Redis connection for the application's REDIS_URL (or the docker-compose default outside an app context).
+
+Classes:
+    RedisLRUCache(namespace, max_entries=5000, ttl=None)
+        JSON key/value cache with LRU eviction, backed by a sorted set of access times.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import json, os, time
+import redis
+from flask import current_app
+
+_connections = {}
+
+
+def get_redis():
+    """
+    Return a (pooled) Redis connection.
+
+    Uses the REDIS_URL of the current Flask app, or redis://redis:<REDIS_PORT>/0 when called
+    outside an application context (e.g. from a script).
+
+    :return: A Redis connection.
+    :rtype: redis.Redis
+    """
+    try:
+        redis_url = current_app.config.get("REDIS_URL", "redis://localhost:6379/0")
+    except RuntimeError:
+        redis_url = f"redis://redis:{os.environ.get('REDIS_PORT', '6379')}/0"
+    if redis_url not in _connections:
+        _connections[redis_url] = redis.from_url(redis_url)
+    return _connections[redis_url]
+
+
+class RedisLRUCache:
+    """
+    JSON key/value cache stored in Redis with least-recently-used eviction.
+
+    Values are stored under "<namespace>:<key>", and the last access time of each key is kept in
+    the sorted set "<namespace>:lru". When the namespace grows above max_entries, the least recently
+    used keys are deleted. Redis errors are logged and treated as cache misses, so callers always
+    fall back to computing the value.
+
+    :param namespace: Prefix of the Redis keys of this cache.
+    :type namespace: str
+    :param max_entries: Maximum number of entries kept in the namespace.
+    :type max_entries: int
+    :param ttl: Lifetime of the entries, in seconds (None: kept until evicted).
+    :type ttl: int or None
+    """
+    def __init__(self, namespace, max_entries=5000, ttl=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lru_key = f"{namespace}:lru"
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        """
+        Return the cached value of a key and mark it as recently used.
+
+        :param key: The cache key.
+        :type key: str
+        :return: The decoded value, or None on a miss.
+        """
+        try:
+            r = get_redis()
+            value = r.get(self._key(key))
+            if value is None:
+                return None
+            r.zadd(self.lru_key, {key: time.time()})
+            return json.loads(value)
+        except redis.exceptions.RedisError as e:
+            print(f"Warning: cache '{self.namespace}' unavailable: {e}")
+            return None
+
+    def set(self, key, value):
+        """
+        Store a JSON-serialisable value and evict the least recently used entries if needed.
+
+        :param key: The cache key.
+        :type key: str
+        :param value: The value to store.
+        """
+        try:
+            r = get_redis()
+            pipe = r.pipeline()
+            pipe.set(self._key(key), json.dumps(value), ex=self.ttl)
+            pipe.zadd(self.lru_key, {key: time.time()})
+            pipe.zcard(self.lru_key)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                stale = [k.decode() for k in r.zrange(self.lru_key, 0, size - self.max_entries - 1)]
+                pipe = r.pipeline()
+                pipe.delete(*[self._key(k) for k in stale])
+                pipe.zrem(self.lru_key, *stale)
+                pipe.execute()
+        except redis.exceptions.RedisError as e:
+            print(f"Warning: cache '{self.namespace}' unavailable: {e}")
+
+    def delete(self, key):
+        """
+        Remove a key from the cache.
+
+        :param key: The cache key.
+        :type key: str
+        """
+        try:
+            r = get_redis()
+            pipe = r.pipeline()
+            pipe.delete(self._key(key))
+            pipe.zrem(self.lru_key, key)
+            pipe.execute()
+        except redis.exceptions.RedisError as e:
+            print(f"Warning: cache '{self.namespace}' unavailable: {e}")
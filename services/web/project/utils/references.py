@@ -0,0 +1,182 @@
+"""
+references.py
+=============
+
+This utilities module is the registry of the reference genomes the samples are distributed with. Every
+directory of REFERENCES_DIR named after a reference (e.g. "EPI_ISL_412866") and holding its FASTA file
+(<name>.fasta) is a reference. Its reference.json file gives the RSV subtype and the Nextclade dataset of the
+reference; its FASTA index (<name>.fasta.fai) gives the length and region of the genome, and its annotation
+(<name>.gtf, or <name>.gff3) the gene models drawn in the genome tracks.
+
+The registry is scanned once per process, and the sequence, index and genes of a reference are read the first
+time they are used. Adding a reference means adding its directory: the report renderer, the data endpoints
+and the pipeline launcher all read the references from here.
+
+Functions:
+    load_references()
+        Scans REFERENCES_DIR for reference genomes (cached per process).
+    get_reference(name)
+        Returns a reference genome by name.
+    reference_for_subtype(subtype)
+        Returns the reference genome of an RSV subtype.
+    subtype_of(name)
+        Returns the RSV subtype of a reference genome.
+
+Classes:
+    Reference(name, directory)
+        A reference genome and its files.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import json, os
+from functools import cached_property, lru_cache
+from project.utils.genome_tracks import read_annotation
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCES_DIR = os.environ.get("REFERENCES_DIR", os.path.join(_PROJECT_DIR, "static", "genomes"))
+# Subtype of the samples whose reference is unknown, as before the registry
+DEFAULT_SUBTYPE = "RSV-A"
+# Files of a reference served to JBrowse2, keyed by the name used in the proxy URLs
+PROXY_FILES = {"fasta": "fasta", "fai": "fasta.fai", "gzi": "fasta.gz", "gff3": "gff3"}
+
+
+class Reference:
+    """
+    A reference genome and its files.
+
+    :param name: Name of the reference, also the name of its directory and files (e.g. "EPI_ISL_412866").
+    :type name: str
+    :param directory: Directory of the reference.
+    :type directory: str
+    """
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        metadata_path = os.path.join(directory, "reference.json")
+        metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        self.subtype = metadata.get("subtype", DEFAULT_SUBTYPE)
+        self.nextclade_dataset = metadata.get("nextclade_dataset")
+
+    def path(self, extension):
+        """
+        Return the path of a file of the reference.
+
+        :param extension: Extension of the file, e.g. "fasta.fai".
+        :type extension: str
+        :return: The path of <directory>/<name>.<extension>.
+        :rtype: str
+        """
+        return os.path.join(self.directory, f"{self.name}.{extension}")
+
+    @property
+    def fasta(self):
+        """Path of the FASTA file of the reference."""
+        return self.path("fasta")
+
+    @property
+    def annotation(self):
+        """Path of the annotation of the reference: its GTF file, or its GFF3 file if it has none."""
+        gtf = self.path("gtf")
+        return gtf if os.path.exists(gtf) else self.path("gff3")
+
+    @cached_property
+    def index(self):
+        """
+        Entries of the FASTA index, {sequence: (length, offset, line bases, line width)}.
+        """
+        entries = {}
+        with open(self.path("fasta.fai")) as f:
+            for line in f:
+                fields = line.split("\t")
+                if len(fields) >= 5:
+                    entries[fields[0]] = tuple(int(field) for field in fields[1:5])
+        return entries
+
+    @property
+    def length(self):
+        """Length of the genome (its first sequence), in bases."""
+        return next(iter(self.index.values()))[0]
+
+    @property
+    def region(self):
+        """Region covering the whole genome, e.g. "EPI_ISL_412866:1-15225"."""
+        chrom = next(iter(self.index))
+        return f"{chrom}:1-{self.length}"
+
+    @cached_property
+    def sequence(self):
+        """Sequence of the genome (its first sequence)."""
+        with open(self.fasta) as f:
+            next(f)  # Header
+            sequence = []
+            for line in f:
+                if line.startswith(">"):
+                    break
+                sequence.append(line.strip())
+        return "".join(sequence)
+
+    @property
+    def genes(self):
+        """Gene models of the reference, as (chrom, 0-based start, end, strand, name) tuples (see genome_tracks.read_annotation)."""
+        return read_annotation(self.annotation)
+
+
+@lru_cache(maxsize=None)
+def load_references():
+    """
+    Scan REFERENCES_DIR for reference genomes, once per process.
+
+    :return: The references, keyed by name.
+    :rtype: dict
+    """
+    references = {}
+    if not os.path.isdir(REFERENCES_DIR):
+        print(f"Warning: reference directory {REFERENCES_DIR} not found")
+        return references
+    for name in sorted(os.listdir(REFERENCES_DIR)):
+        directory = os.path.join(REFERENCES_DIR, name)
+        if os.path.isfile(os.path.join(directory, f"{name}.fasta")):
+            references[name] = Reference(name, directory)
+    return references
+
+
+def get_reference(name):
+    """
+    Return a reference genome by name.
+
+    :param name: Name of the reference, e.g. "EPI_ISL_412866".
+    :type name: str
+    :return: The reference, or None if there is no such reference.
+    :rtype: Reference or None
+    """
+    return load_references().get(name)
+
+
+def reference_for_subtype(subtype):
+    """
+    Return the reference genome of an RSV subtype.
+
+    :param subtype: The subtype, e.g. "RSV-B".
+    :type subtype: str
+    :return: The first reference of the subtype, or None if there is none.
+    :rtype: Reference or None
+    """
+    return next((reference for reference in load_references().values() if reference.subtype == subtype), None)
+
+
+def subtype_of(name):
+    """
+    Return the RSV subtype of a reference genome.
+
+    :param name: Name of the reference.
+    :type name: str
+    :return: The subtype of the reference, DEFAULT_SUBTYPE if the reference is unknown.
+    :rtype: str
+    """
+    reference = get_reference(name)
+    return reference.subtype if reference else DEFAULT_SUBTYPE
@@ -0,0 +1,100 @@
+"""
+render_profiles.py
+==================
+
+This utilities module defines the render profiles of the reports, which control the resolution, canvas size
+and encoding of their figures:
+
+- "print" (default): 300 dpi, 16x8 inches, lossless PNG (SVG in the PDF rendered from HTML), for printed reports.
+- "screen": 150 dpi, 16x8 inches, PNG quantized to a 256-colour palette, for reports read on screen or emailed.
+- "draft": 72 dpi, 12x6 inches, PNG quantized to 64 colours, for quick previews.
+
+Figures are shown 6.5 inches wide in the reports, so "screen" still has ~370 dpi in print size while its
+images (and the DOCX and PDF files) are several times smaller. DOCX reports are always raster: python-docx
+only embeds bitmap images.
+
+The default profile is set with the REPORT_RENDER_PROFILE environment variable.
+
+Functions:
+    get_render_profile(name)
+        Returns the settings of a render profile.
+    figure_format(profile, vector=False)
+        Returns the format of the figures of a render profile ("png" or "svg").
+    save_figure(fig, profile, vector=False)
+        Encodes a matplotlib figure as set by a render profile.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import os
+from io import BytesIO
+from PIL import Image
+
+RENDER_PROFILES = {
+    "draft": {"dpi": 72, "figsize": (12, 6), "colors": 64, "vector": False},
+    "screen": {"dpi": 150, "figsize": (16, 8), "colors": 256, "vector": False},
+    "print": {"dpi": 300, "figsize": (16, 8), "colors": None, "vector": True},
+}
+DEFAULT_RENDER_PROFILE = os.environ.get("REPORT_RENDER_PROFILE", "print")
+
+
+def get_render_profile(name):
+    """
+    Return the settings of a render profile.
+
+    :param name: Name of the profile, one of RENDER_PROFILES.
+    :type name: str
+    :return: The "dpi", "figsize" (inches), palette "colors" (None for full colour PNGs) and whether figures
+             may be "vector" (SVG) where the output supports it.
+    :rtype: dict
+    :raises ValueError: If the profile does not exist.
+    """
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}', expected one of {', '.join(RENDER_PROFILES)}")
+    return RENDER_PROFILES[name]
+
+
+def _quantize(png, colors):
+    buffer = BytesIO()
+    Image.open(BytesIO(png)).convert("RGB").quantize(colors=colors, method=Image.Quantize.FASTOCTREE).save(buffer, format="png", optimize=True)
+    return buffer.getvalue()
+
+
+def figure_format(profile, vector=False):
+    """
+    Return the format of the figures of a render profile.
+
+    :param profile: Name of the render profile.
+    :type profile: str
+    :param vector: Whether the output supports SVG (e.g. the HTML report).
+    :type vector: bool
+    :return: "svg" if the output and the profile allow vector figures, "png" otherwise.
+    :rtype: str
+    """
+    return "svg" if vector and get_render_profile(profile)["vector"] else "png"
+
+
+def save_figure(fig, profile, vector=False):
+    """
+    Encode a matplotlib figure as set by a render profile.
+
+    :param fig: The figure to encode (its layout is final, bbox_inches="tight" is applied).
+    :type fig: matplotlib.figure.Figure
+    :param profile: Name of the render profile.
+    :type profile: str
+    :param vector: Whether the output supports SVG (e.g. the HTML report). Only used by profiles allowing vector figures.
+    :type vector: bool
+    :return: The encoded image, in the format given by figure_format.
+    :rtype: bytes
+    """
+    settings = get_render_profile(profile)
+    buffer = BytesIO()
+    if figure_format(profile, vector) == "svg":
+        fig.savefig(buffer, format="svg", bbox_inches="tight")
+        return buffer.getvalue()
+    fig.savefig(buffer, format="png", dpi=settings["dpi"], bbox_inches="tight")
+    if settings["colors"] is None:
+        return buffer.getvalue()
+    return _quantize(buffer.getvalue(), settings["colors"])
+
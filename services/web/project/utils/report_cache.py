@@ -0,0 +1,284 @@
+"""
+report_cache.py
+===============
+
+This utilities module stores rendered reports on disk, keyed by a fingerprint of everything that affects
+their content: the metrics, sequencing platforms and sample references of the distribution, the role and
+lab of the reader, the output format and render profile, and the version of the templates and rendering code. A repeated
+download with unchanged inputs streams the stored file instead of rendering the report again.
+
+Artifacts are written to REPORT_CACHE_DIR/<distribution>/<fingerprint>.<format>. The least recently used
+ones are deleted once the cache grows above REPORT_CACHE_MAX_BYTES, and the artifacts of a distribution
+are dropped when a new analysis of one of its samples completes.
+
+Reports are also assembled from cached per-sample fragments (plots, genome tracks and OOXML tables), stored
+in REPORT_CACHE_DIR/.fragments/<distribution>/<sample>/ and keyed on the inputs of that sample only. When
+one sample is re-analysed, only its fragments are rendered again. Fragments are not dropped with the reports
+of their distribution: those of unchanged samples stay valid, stale ones are evicted as least recently used.
+
+Functions:
+    code_version()
+        Hash of the report templates and of the modules that render reports.
+    report_fingerprint(distribution, report_data, role, user_lab, report_format, profile=DEFAULT_RENDER_PROFILE)
+        Fingerprint of the inputs of a report.
+    cached_report_path(distribution_name, fingerprint, report_format)
+        Returns the stored artifact of a report, or None.
+    store_report(distribution_name, fingerprint, report_format, write)
+        Stores a rendered report and evicts the least recently used artifacts.
+    evict_reports(max_bytes=REPORT_CACHE_MAX_BYTES)
+        Deletes the least recently used artifacts until the cache fits in max_bytes.
+    invalidate_distribution_reports(distribution_name)
+        Deletes the stored reports of a distribution.
+    fragment_key(*inputs)
+        Key of a report fragment, from its inputs and the code version.
+    cached_fragment_path(distribution_name, sample, kind, key, extension)
+        Returns a stored report fragment, or None.
+    store_fragment(distribution_name, sample, kind, key, extension, write)
+        Stores a rendered report fragment.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import hashlib, json, os, shutil
+from project.utils.metrics_store import get_platform_map
+from project.utils.samples import get_sample_reference_map
+from project.utils.render_profiles import DEFAULT_RENDER_PROFILE
+
+REPORT_CACHE_DIR = os.environ.get("REPORT_CACHE_DIR", "project/media/report_cache")
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 2 * 1024 ** 3))  # 2 GB
+FRAGMENTS_DIR = os.path.join(REPORT_CACHE_DIR, ".fragments")
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Files whose content changes the rendered reports
+RENDER_FILES = [
+    "static/templateV4.docx",
+    "static/uk-neqas-logo.jpg",
+    "static/qr.png",
+    "templates/report.html",
+    "utils/docx.py",
+    "utils/docx_tables.py",
+    "utils/report_pdf.py",
+    "utils/report_context.py",
+    "utils/platform_plots.py",
+    "utils/render_profiles.py",
+    "utils/genome_tracks.py",
+    "utils/references.py",
+    "utils/evaluation.py",
+    "utils/metrics_store.py",
+]
+
+_code_version = None
+
+
+def code_version():
+    """
+    Return a hash of the report templates and of the modules that render reports (RENDER_FILES),
+    computed once per process.
+
+    :return: The hexadecimal SHA-256 of the files.
+    :rtype: str
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for name in RENDER_FILES:
+            digest.update(name.encode())
+            with open(os.path.join(_PROJECT_DIR, name), "rb") as f:
+                digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def report_fingerprint(distribution, report_data, role, user_lab, report_format, profile=DEFAULT_RENDER_PROFILE):
+    """
+    Compute the fingerprint of the inputs of a report.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :param report_data: Parsed metrics of the distribution (see metrics_store.load_report_data).
+    :type report_data: dict
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :param report_format: Output format ("docx" or "pdf").
+    :type report_format: str
+    :param profile: Render profile of the figures (see render_profiles).
+    :type profile: str
+    :return: The hexadecimal SHA-256 of the inputs.
+    :rtype: str
+    """
+    inputs = {
+        "distribution": distribution.name,
+        "metrics": report_data,
+        "platforms": sorted([lab, sample, platform] for (lab, sample), platform in get_platform_map(distribution).items()),
+        "references": get_sample_reference_map(distribution),
+        "role": role,
+        "user_lab": user_lab,
+        "format": report_format,
+        "profile": profile,
+        "code": code_version(),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _artifact_path(distribution_name, fingerprint, report_format):
+    return os.path.join(REPORT_CACHE_DIR, distribution_name, f"{fingerprint}.{report_format}")
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def _write_atomically(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def cached_report_path(distribution_name, fingerprint, report_format):
+    """
+    Return the stored artifact of a report, marking it as recently used.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :param fingerprint: Fingerprint of the report (see report_fingerprint).
+    :type fingerprint: str
+    :param report_format: Output format ("docx" or "pdf").
+    :type report_format: str
+    :return: The path of the artifact, or None if it is not cached.
+    :rtype: str or None
+    """
+    return _touch(_artifact_path(distribution_name, fingerprint, report_format))
+
+
+def store_report(distribution_name, fingerprint, report_format, write):
+    """
+    Store a rendered report, then evict the least recently used artifacts if the cache is too large.
+
+    The report is written next to its final path and renamed, so concurrent readers never see a partial file.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :param fingerprint: Fingerprint of the report (see report_fingerprint).
+    :type fingerprint: str
+    :param report_format: Output format ("docx" or "pdf").
+    :type report_format: str
+    :param write: Function writing the report to the path it is given (e.g. a python-docx Document's save).
+    :type write: callable
+    :return: The path of the stored artifact.
+    :rtype: str
+    """
+    path = _artifact_path(distribution_name, fingerprint, report_format)
+    _write_atomically(path, write)
+    evict_reports()
+    return path
+
+
+def evict_reports(max_bytes=REPORT_CACHE_MAX_BYTES):
+    """
+    Delete the least recently used artifacts until the cache fits in max_bytes.
+
+    :param max_bytes: Maximum total size of the cache, in bytes.
+    :type max_bytes: int
+    :return: The number of deleted artifacts.
+    :rtype: int
+    """
+    artifacts = []
+    for root, _, files in os.walk(REPORT_CACHE_DIR):
+        for name in files:
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            artifacts.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+
+    total = sum(size for _, size, _ in artifacts)
+    deleted = 0
+    for _, size, path in sorted(artifacts):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return deleted
+
+
+def invalidate_distribution_reports(distribution_name):
+    """
+    Delete the stored reports of a distribution.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    """
+    shutil.rmtree(os.path.join(REPORT_CACHE_DIR, distribution_name), ignore_errors=True)
+
+
+def fragment_key(*inputs):
+    """
+    Compute the key of a report fragment from everything it is rendered from, and the code version.
+
+    :param inputs: JSON-serialisable inputs of the fragment (e.g. the metrics of a sample, the user lab).
+    :return: The hexadecimal SHA-256 of the inputs.
+    :rtype: str
+    """
+    return hashlib.sha256(json.dumps([inputs, code_version()], sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _fragment_path(distribution_name, sample, kind, key, extension):
+    return os.path.join(FRAGMENTS_DIR, distribution_name, sample, f"{kind}-{key}.{extension}")
+
+
+def cached_fragment_path(distribution_name, sample, kind, key, extension):
+    """
+    Return a stored report fragment, marking it as recently used.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :param sample: Name of the sample the fragment belongs to.
+    :type sample: str
+    :param kind: Kind of fragment (e.g. "platform_plot", "lineage_table").
+    :type kind: str
+    :param key: Key of the fragment (see fragment_key).
+    :type key: str
+    :param extension: File extension of the fragment (e.g. "png", "xml").
+    :type extension: str
+    :return: The path of the fragment, or None if it is not cached.
+    :rtype: str or None
+    """
+    return _touch(_fragment_path(distribution_name, sample, kind, key, extension))
+
+
+def store_fragment(distribution_name, sample, kind, key, extension, write):
+    """
+    Store a rendered report fragment (evicted with the reports, see evict_reports).
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :param sample: Name of the sample the fragment belongs to.
+    :type sample: str
+    :param kind: Kind of fragment (e.g. "platform_plot", "lineage_table").
+    :type kind: str
+    :param key: Key of the fragment (see fragment_key).
+    :type key: str
+    :param extension: File extension of the fragment (e.g. "png", "xml").
+    :type extension: str
+    :param write: Function writing the fragment to the path it is given.
+    :type write: callable
+    :return: The path of the stored fragment.
+    :rtype: str
+    """
+    path = _fragment_path(distribution_name, sample, kind, key, extension)
+    _write_atomically(path, write)
+    return path
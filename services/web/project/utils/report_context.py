@@ -0,0 +1,134 @@
+"""
+report_context.py
+=================
+
+This utilities module gathers everything the DOCX reports of a distribution share, so that it is
+loaded and computed once per distribution instead of once per organization report.
+
+A ReportContext holds the parsed metrics, the sample-to-reference map, the sequencing platform of every
+submission, the metrics regrouped per sample, the evaluation indicators of every lab and the per-platform
+averages and platform plots of every sample. Rendering the report of a lab (docx.render_lab_report) then only does the
+lab-specific work, so generating the reports of N labs costs one context build plus N renders.
+
+Functions:
+    aggregate_platform_metrics(sample_data)
+        Averages the quality metrics of a sample per sequencing platform.
+
+Classes:
+    ReportContext(distribution, report_data=None, profile=DEFAULT_RENDER_PROFILE)
+        Data shared by all the reports of a distribution.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import numpy as np
+from project.utils.evaluation import DistributionEvaluation
+from project.utils.metrics_store import load_report_data, get_platform_map
+from project.utils.samples import get_sample_reference_map
+from project.utils.platform_plots import SamplePlatformPlots
+from project.utils.render_profiles import DEFAULT_RENDER_PROFILE, get_render_profile
+
+
+def aggregate_platform_metrics(sample_data):
+    """
+    Average the quality metrics of a sample per sequencing platform.
+
+    Labs that declared several comma-separated platforms count towards each of them. Missing coverage,
+    similarity and Ns count as 0, missing mean depths are left out.
+
+    :param sample_data: Metrics of each lab for the sample, including their 'sequencing_platform'.
+    :type sample_data: dict
+    :return: The averaged "coverage" (%), "similarity", "Ns" and "Mean coverage depth" ('N/A' if no lab had one),
+             keyed by "<platform> (<number of labs>)".
+    :rtype: dict
+    """
+    platform_data = {}
+    for lab, metrics in sample_data.items():
+        # Get sequencing platforms; default to "Unknown" if not provided.
+        platforms = metrics.get("sequencing_platform", "Unknown").split(",")
+        for platform in platforms:
+            platform = platform.strip()
+            if platform not in platform_data:
+                platform_data[platform] = {"coverage": [], "similarity": [], "Ns": [], "Mean coverage depth": []}
+            # Multiply coverage by 100 to get percentage, if available.
+            if metrics.get("coverage") != "N/A":
+                platform_data[platform]["coverage"].append(metrics["coverage"] * 100)
+            else:
+                platform_data[platform]["coverage"].append(0)
+            # Similarity, Ns and Mean coverage depth
+            if metrics.get("similarity") != "N/A":
+                platform_data[platform]["similarity"].append(metrics["similarity"])
+            else:
+                platform_data[platform]["similarity"].append(0)
+            if metrics.get("Ns") != "N/A":
+                platform_data[platform]["Ns"].append(metrics["Ns"])
+            else:
+                platform_data[platform]["Ns"].append(0)
+            if metrics.get("Mean coverage depth") != "N/A":
+                platform_data[platform]["Mean coverage depth"].append(metrics["Mean coverage depth"])
+
+    # Compute averages for each platform
+    aggregated = {}
+    for platform, lists in platform_data.items():
+        count = len(lists["coverage"])
+        platformName = f"{platform} ({count})"
+        aggregated[platformName] = {
+            "coverage": np.mean(lists["coverage"]) if lists["coverage"] else 0,
+            "similarity": np.mean(lists["similarity"]) if lists["similarity"] else 0,
+            "Ns": np.mean(lists["Ns"]) if lists["Ns"] else 0,
+            "Mean coverage depth": np.mean(lists["Mean coverage depth"]) if lists["Mean coverage depth"] else "N/A"
+        }
+    return aggregated
+
+
+class ReportContext:
+    """
+    Data shared by all the reports of a distribution, built once and read-only afterwards.
+
+    Attributes:
+        distribution (str): Name of the distribution.
+        base_dir (str): Directory of the distribution's pipeline outputs (data/<distribution>).
+        profile (str): Render profile of the figures of the reports (see render_profiles).
+        report_data (dict): Parsed metrics, {lab: {sample: metrics}}.
+        sample_reference_map (dict): Reference genome of each sample.
+        platform_map (dict): Sequencing type of each submission, keyed by (lab, sample).
+        sample_reports (dict): Metrics regrouped per sample, {sample: {lab: metrics}}, sorted by sample, each
+            metrics dictionary carrying its 'sequencing_platform'.
+        evaluation (DistributionEvaluation): Evaluation indicators of every lab.
+        platform_metrics (dict): Per-platform averages of each sample (see aggregate_platform_metrics).
+        platform_plots (dict): Platform plots of each sample (see platform_plots.SamplePlatformPlots), which keep
+            the figures and images they already rendered for the next labs.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :param report_data: Parsed metrics of the distribution. If None, they are loaded with metrics_store.load_report_data().
+    :type report_data: dict or None
+    :param profile: Render profile of the figures of the reports, one of render_profiles.RENDER_PROFILES.
+    :type profile: str
+    """
+    def __init__(self, distribution, report_data=None, profile=DEFAULT_RENDER_PROFILE):
+        get_render_profile(profile)  # Fail early on unknown profiles
+        self.distribution = distribution.name
+        self.base_dir = f"data/{distribution.name}"
+        self.profile = profile
+        self.report_data = load_report_data(distribution) if report_data is None else report_data
+        self.sample_reference_map = get_sample_reference_map(distribution)
+        self.platform_map = get_platform_map(distribution)
+
+        sample_reports = {}
+        for lab, samples in self.report_data.items():
+            for sample_name, metrics in samples.items():
+                sequencing_platform = self.platform_map.get((lab, sample_name), "N/A")
+                sample_reports.setdefault(sample_name, {})[lab] = dict(metrics, sequencing_platform=sequencing_platform)
+        self.sample_reports = dict(sorted(sample_reports.items()))
+
+        self.evaluation = DistributionEvaluation(self.report_data, self.sample_reference_map)
+        self.platform_metrics = {
+            sample_name: aggregate_platform_metrics(sample_data)
+            for sample_name, sample_data in self.sample_reports.items()
+        }
+        self.platform_plots = {
+            sample_name: SamplePlatformPlots(sample_name, sample_data, profile)
+            for sample_name, sample_data in self.sample_reports.items()
+        }
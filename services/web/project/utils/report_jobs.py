@@ -0,0 +1,318 @@
+"""
+report_jobs.py
+==============
+
+This utilities module runs the bulk generation of the reports of a distribution (one PDF per organization,
+either converted from DOCX by LibreOffice or printed from HTML by WeasyPrint, then zipped) as an RQ job on
+the worker container, instead of inside a web request.
+
+Progress is stored in the job's meta (polled through /api/report_jobs/<job_id>) and emitted as
+"report_progress" Socket.IO events to the room of the user that requested the job. The finished ZIP is
+written to REPORT_JOBS_DIR/<job_id>/ and served by /api/report_jobs/<job_id>/download until it expires.
+
+Functions:
+    enqueue_distribution_reports(distribution_name, requested_by, renderer="libreoffice", profile=DEFAULT_RENDER_PROFILE)
+        Enqueues the generation of all the reports of a distribution.
+    fetch_report_job(job_id)
+        Returns the RQ job of a report generation, or None.
+    report_artifact_path(job)
+        Returns the path of the finished ZIP of a report job, or None.
+    report_job_status(job)
+        Summarises the status and progress of a report job.
+    render_organization_report(context, organization, output_dir, renderer="libreoffice")
+        Renders the DOCX (or, with WeasyPrint, PDF) report of one organization.
+    render_distribution_reports(distribution_name, requested_by, workers=None, renderer="libreoffice", profile=DEFAULT_RENDER_PROFILE)
+        RQ job: renders and zips the PDF reports of every organization of a distribution, on a process pool.
+    cleanup_report_artifacts(max_age=REPORT_ARTIFACT_TTL)
+        Deletes the artifact directories of expired report jobs.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import os, shutil, time, zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import redis
+from flask import current_app
+from flask_socketio import SocketIO
+from rq import Queue, get_current_job
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+from project.utils.sql_models import Distribution
+from project.utils.report_context import ReportContext
+from project.utils.docx import render_lab_report
+from project.utils.pdf_converter import ConversionService
+from project.utils.report_pdf import render_lab_report_pdf
+from project.utils.render_profiles import DEFAULT_RENDER_PROFILE
+
+REPORT_JOBS_DIR = os.environ.get("REPORT_JOBS_DIR", "project/media/report_jobs")
+REPORT_JOB_TIMEOUT = int(os.environ.get("REPORT_JOB_TIMEOUT", 4 * 3600))  # Seconds a bulk render may run
+REPORT_ARTIFACT_TTL = int(os.environ.get("REPORT_ARTIFACT_TTL", 24 * 3600))  # Seconds a finished ZIP is kept
+# PDF backends: DOCX converted by LibreOffice, or HTML printed by WeasyPrint
+REPORT_RENDERERS = ("libreoffice", "weasyprint")
+
+_emitters = {}
+_render_context = None  # ReportContext of a render pool worker
+
+
+def _redis_connection():
+    return redis.from_url(current_app.config.get("REDIS_URL", "redis://localhost:6379/0"))
+
+
+def _emit_progress(job, status=None):
+    """
+    Emit the progress of a report job to the Socket.IO room of the user that requested it.
+
+    The worker has no Socket.IO server of its own, so events go through the Redis message queue
+    that the web service's SocketIO is attached to. RQ only updates the status once the job function
+    returns, so the final event overrides it.
+    """
+    redis_url = current_app.config.get("REDIS_URL", "redis://localhost:6379/0")
+    if redis_url not in _emitters:
+        _emitters[redis_url] = SocketIO(message_queue=redis_url)
+    payload = report_job_status(job)
+    if status:
+        payload["status"] = status
+    try:
+        _emitters[redis_url].emit("report_progress", payload, room=job.meta.get("requested_by"))
+    except redis.exceptions.RedisError as e:
+        print(f"Warning: could not emit report progress of job {job.id}: {e}")
+
+
+def enqueue_distribution_reports(distribution_name, requested_by, renderer="libreoffice", profile=DEFAULT_RENDER_PROFILE):
+    """
+    Enqueue the generation of all the reports of a distribution.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :param requested_by: Email of the user that requested the reports (Socket.IO room and owner of the artifact).
+    :type requested_by: str
+    :param renderer: PDF backend, one of REPORT_RENDERERS.
+    :type renderer: str
+    :param profile: Render profile of the figures, one of render_profiles.RENDER_PROFILES.
+    :type profile: str
+    :return: The enqueued job.
+    :rtype: rq.job.Job
+    """
+    q = Queue(connection=_redis_connection())
+    return q.enqueue(
+        render_distribution_reports, distribution_name, requested_by, renderer=renderer, profile=profile,
+        job_timeout=REPORT_JOB_TIMEOUT,
+        result_ttl=REPORT_ARTIFACT_TTL,
+        failure_ttl=REPORT_ARTIFACT_TTL,
+        meta={"distribution": distribution_name, "requested_by": requested_by, "renderer": renderer, "profile": profile, "done": 0, "total": 0, "current": None},
+    )
+
+
+def fetch_report_job(job_id):
+    """
+    Return the RQ job of a report generation.
+
+    :param job_id: The job ID returned by enqueue_distribution_reports().
+    :type job_id: str
+    :return: The job, or None if it does not exist (anymore) or is not a report job.
+    :rtype: rq.job.Job or None
+    """
+    try:
+        job = Job.fetch(job_id, connection=_redis_connection())
+    except NoSuchJobError:
+        return None
+    return job if "distribution" in job.meta else None
+
+
+def report_job_status(job):
+    """
+    Summarise the status and progress of a report job.
+
+    :param job: A report job.
+    :type job: rq.job.Job
+    :return: "job_id", "distribution", "status" (queued, started, finished, failed...), "done" and "total"
+             organizations, the last rendered organization ("current"), the ZIP "artifact" name once it is
+             complete and the "error" of a failed job.
+    :rtype: dict
+    """
+    error = job.meta.get("error")
+    return {
+        "job_id": job.id,
+        "distribution": job.meta.get("distribution"),
+        "status": "failed" if error else job.get_status(),
+        "done": job.meta.get("done", 0),
+        "total": job.meta.get("total", 0),
+        "current": job.meta.get("current"),
+        "artifact": job.meta.get("artifact"),
+        "error": error,
+    }
+
+
+def report_artifact_path(job):
+    """
+    Return the path of the finished ZIP of a report job.
+
+    :param job: A report job.
+    :type job: rq.job.Job
+    :return: The path of the ZIP file, or None if the job has not finished or its artifact expired.
+    :rtype: str or None
+    """
+    artifact = job.meta.get("artifact")
+    if not artifact:
+        return None
+    path = os.path.join(REPORT_JOBS_DIR, job.id, artifact)
+    return path if os.path.isfile(path) else None
+
+
+def cleanup_report_artifacts(max_age=REPORT_ARTIFACT_TTL):
+    """
+    Delete the artifact directories of report jobs older than max_age seconds.
+
+    :param max_age: Age in seconds after which an artifact is deleted.
+    :type max_age: int
+    :return: The number of deleted directories.
+    :rtype: int
+    """
+    if not os.path.isdir(REPORT_JOBS_DIR):
+        return 0
+    deleted = 0
+    now = time.time()
+    for entry in os.scandir(REPORT_JOBS_DIR):
+        if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            deleted += 1
+    return deleted
+
+
+def _init_render_worker(context):
+    """
+    Pool initializer: keep the shared ReportContext in the worker process, so it is not sent with every task.
+    """
+    global _render_context
+    _render_context = context
+
+
+def _render_organization_task(task):
+    """
+    Pool entry point (module-level so it can be pickled): render one organization with the worker's context.
+    """
+    organization, output_dir, renderer = task
+    return organization, render_organization_report(_render_context, organization, output_dir, renderer)
+
+
+def render_organization_report(context, organization, output_dir, renderer="libreoffice"):
+    """
+    Render the report of one organization: a DOCX to be converted by LibreOffice, or directly a PDF with WeasyPrint.
+
+    Figures are rendered in memory, so several reports can be rendered at the same time; only the report is
+    written to the shared output directory.
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param organization: Name of the organization.
+    :type organization: str
+    :param output_dir: Directory where the report is written.
+    :type output_dir: str
+    :param renderer: PDF backend, one of REPORT_RENDERERS.
+    :type renderer: str
+    :return: The path of the DOCX report ("libreoffice") or of the PDF report ("weasyprint").
+    :rtype: str
+    """
+    report_path = os.path.join(output_dir, f"MIC_{organization}_WG_{context.distribution}_Report")
+    if renderer == "weasyprint":
+        with open(f"{report_path}.pdf", "wb") as pdf:
+            pdf.write(render_lab_report_pdf(context, "user", organization))
+        return f"{report_path}.pdf"
+    doc = render_lab_report(context, "user", organization)
+    doc.save(f"{report_path}.docx")
+    return f"{report_path}.docx"
+
+
+def _render_organizations(context, organizations, output_dir, workers, renderer):
+    """
+    Yield (organization, report path) as the reports are rendered, on a process pool when workers > 1.
+    """
+    if workers > 1 and len(organizations) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(organizations)), initializer=_init_render_worker, initargs=(context,)) as executor:
+            futures = [executor.submit(_render_organization_task, (organization, output_dir, renderer)) for organization in organizations]
+            for future in as_completed(futures):
+                yield future.result()
+    else:
+        for organization in organizations:
+            yield organization, render_organization_report(context, organization, output_dir, renderer)
+
+
+def _add_report(zipf, job, organization, pdf_path):
+    """
+    Move a finished PDF report into the ZIP and publish the progress of the job.
+    """
+    zipf.write(pdf_path, arcname=os.path.basename(pdf_path))
+    os.remove(pdf_path)
+
+    job.meta["done"] += 1
+    job.meta["current"] = organization
+    job.save_meta()
+    _emit_progress(job)
+
+
+def render_distribution_reports(distribution_name, requested_by, workers=None, renderer="libreoffice", profile=DEFAULT_RENDER_PROFILE):
+    """
+    RQ job: render the PDF report of every organization of a distribution and zip them.
+
+    Organizations are rendered in parallel on a process pool of REPORT_RENDER_WORKERS processes. With the
+    "libreoffice" renderer, their DOCX files are queued to a pdf_converter.ConversionService as soon as they
+    are rendered; with "weasyprint", the PDFs are printed directly from HTML by the render processes. Progress
+    is saved in the job's meta and emitted after each finished report.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    :param requested_by: Email of the user that requested the reports.
+    :type requested_by: str
+    :param workers: Number of render processes (default: REPORT_RENDER_WORKERS environment variable, 1 if unset).
+    :type workers: int or None
+    :param renderer: PDF backend, one of REPORT_RENDERERS.
+    :type renderer: str
+    :param profile: Render profile of the figures, one of render_profiles.RENDER_PROFILES.
+    :type profile: str
+    :return: "path" and "filename" of the ZIP file.
+    :rtype: dict
+    """
+    if workers is None:
+        workers = int(os.environ.get("REPORT_RENDER_WORKERS", "1"))
+    job = get_current_job()
+    cleanup_report_artifacts()
+
+    dist = Distribution.query.filter_by(name=distribution_name).first()
+    job_dir = os.path.join(REPORT_JOBS_DIR, job.id)
+    os.makedirs(job_dir, exist_ok=True)
+    zip_filename = f"reports_{distribution_name}_{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
+    zip_path = os.path.join(job_dir, zip_filename)
+
+    organizations = [org.name for org in dist.organizations]
+    job.meta.update({"total": len(organizations), "done": 0})
+    job.save_meta()
+    _emit_progress(job)
+
+    try:
+        # Metrics, references, platforms and evaluation indicators are loaded once and shared by every organization's report
+        context = ReportContext(dist, profile=profile)
+        # DOCX reports are converted by warm LibreOffice instances while the next ones are still being rendered
+        with ConversionService(work_dir=job_dir) as converter, zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+            conversions = {}
+            for organization, report_path in _render_organizations(context, organizations, job_dir, workers, renderer):
+                if renderer == "weasyprint":
+                    _add_report(zipf, job, organization, report_path)
+                else:
+                    conversions[converter.submit(report_path, job_dir)] = (organization, report_path)
+
+            for future in as_completed(conversions):
+                organization, docx_path = conversions[future]
+                _add_report(zipf, job, organization, future.result())
+                os.remove(docx_path)
+    except Exception as e:
+        job.meta.update({"current": None, "error": str(e)})
+        job.save_meta()
+        _emit_progress(job)
+        raise
+
+    job.meta.update({"current": None, "artifact": zip_filename})
+    job.save_meta()
+    _emit_progress(job, "finished")
+    return {"path": zip_path, "filename": zip_filename}
@@ -7,18 +7,40 @@ as well as to read genome length from a file and process reports for multiple la
 and samples. The parsed metrics include coverage, missing bases, substitutions,
 deletions, insertions, frame shifts, similarity, clade information, and subtype determination.
 
-Ideally, in the future these functions will populate the database with the parsed info in order to avoid redundant parsing, which would improve backend efficiency.
-This is a TO DO, especially if the 'number of participants per sample' or 'samples per distribution' increases.
+The parsed metrics are persisted to the SampleMetrics table once a Nextflow run completes
+(see project.utils.metrics_store), so request handlers should not need to call these functions directly. When they do, the parsed
+sample directories are cached in Redis and only re-parsed when the mtime or size of one of their
+report files changes.
 
 Functions:
     parse_nextclade_file(nextclade_file_path, nextclade_alternative_file_path, genomeLength)
         Parses Nextclade output files to extract quality metrics and determine the sample subtype.
+    parse_genome_results(genome_results_path)
+        Parses the coverage summary of a Qualimap genome_results.txt file in a single pass.
+    read_coverage_histogram(coverage_histogram_path)
+        Reads a Qualimap coverage histogram into NumPy arrays of depths and counts.
     parse_qualimap(genome_results_path, coverage_histogram_path)
         Parses Qualimap output files to extract coverage metrics and uniformity.
     read_genome_length(sample_path)
         Reads and returns the genome length from a 'genomeLength.txt' file in the given sample directory.
-    process_all_reports(base_dir)
-        Processes report files from all labs and samples in a base directory and aggregates metrics.
+    read_sample_reference_map(base_dir)
+        Reads the sample-to-reference mapping of a distribution from its 'samples.txt' file.
+    parse_sample_directory(sample_path, lab, sample)
+        Parses the Qualimap and Nextclade outputs of a single lab/sample directory.
+    sample_fingerprint(sample_path)
+        Returns the mtimes and sizes of the report files of a sample directory.
+    parse_sample_directory_cached(sample_path, lab, sample)
+        Same as parse_sample_directory, but only re-parses directories whose fingerprint changed.
+    list_sample_directories(base_dir)
+        Lists the lab and sample directories of a distribution in sorted order.
+    parse_sample_directories(sample_dirs, use_cache=True, workers=None, pool=None)
+        Parses several lab/sample directories, on a thread or process pool when more than one worker is configured.
+    process_sample_reports(base_dir, sample, use_cache=True)
+        Processes the reports of a single sample across all labs of a distribution.
+
+Classes:
+    LazyReportData(base_dir, use_cache=True)
+        Mapping of lab to parsed sample metrics that only parses a lab when it is accessed.
 
 :author: Kevin
 :version: 0.0.1
@@ -27,6 +49,21 @@ Functions:
 import numpy as np
 import os
 import csv
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from project.utils.redis_cache import RedisLRUCache
+
+# Files whose mtime/size identify the state of a parsed sample directory
+REPORT_FILES = (
+    "genome_results.txt",
+    "raw_data_qualimapReport/coverage_histogram.txt",
+    "nextclade.output",
+    "nextclade_alternative.output",
+    "genomeLength.txt",
+)
+
+# Parsed sample directories, shared by all workers through Redis
+report_cache = RedisLRUCache("report_parser", max_entries=int(os.environ.get("REPORT_CACHE_MAX_ENTRIES", "5000")))
 
 def parse_nextclade_file(nextclade_file_path, nextclade_alternative_file_path, genomeLength):
     """
@@ -129,6 +166,50 @@ def parse_nextclade_file(nextclade_file_path, nextclade_alternative_file_path, g
             'frameShifts': 'N/A', 'similarity': 'N/A', 'clade': 'N/A', 'G_clade': 'N/A', 'subtype': 'N/A'
         }
 
+def parse_genome_results(genome_results_path):
+    """
+    Parse the coverage summary of a Qualimap 'genome_results.txt' file in a single pass.
+
+    Reading stops as soon as the 20X coverage, mean coverage depth and standard deviation lines have been found.
+
+    :param genome_results_path: Path to the Qualimap genome_results.txt file.
+    :type genome_results_path: str
+    :return: A dictionary with the keys "Coverage at 20X (%)", "Mean coverage depth" and
+             "Standard deviation of coverage depth" (only those found in the file).
+    :rtype: dict
+    """
+    metrics = {}
+    with open(genome_results_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("There is a") and line.endswith("of reference with a coverageData >= 20X"):
+                metrics["Coverage at 20X (%)"] = float(line.split()[3].strip('%'))
+            elif line.startswith("mean coverageData"):
+                metrics["Mean coverage depth"] = float(line.split("=")[1].strip().replace(",", "").replace("X", ""))
+            elif line.startswith("std coverageData"):
+                metrics["Standard deviation of coverage depth"] = float(line.split("=")[1].strip().replace(",", "").replace("X", ""))
+            else:
+                continue
+            if len(metrics) == 3:
+                break
+    return metrics
+
+def read_coverage_histogram(coverage_histogram_path):
+    """
+    Read a Qualimap coverage histogram into two NumPy arrays.
+
+    The two tab-separated columns (depth, number of genomic locations) are tokenised in bulk by NumPy's C
+    reader with an explicit delimiter and column selection, and returned unpacked. Unlike the previous
+    np.loadtxt call, a histogram with a single row still yields two arrays.
+
+    :param coverage_histogram_path: Path to the Qualimap coverage_histogram.txt file.
+    :type coverage_histogram_path: str
+    :return: The depths and the number of genomic locations at each depth.
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    depths, counts = np.loadtxt(coverage_histogram_path, skiprows=1, delimiter="\t", usecols=(0, 1), ndmin=2, unpack=True)
+    return depths, counts
+
 def parse_qualimap(genome_results_path, coverage_histogram_path):
     """
     Parse Qualimap output files to extract coverage and uniformity metrics.
@@ -156,23 +237,10 @@ def parse_qualimap(genome_results_path, coverage_histogram_path):
             "Uniformity (%)": 'N/A'
         }
 
-    metrics = {}
-
-    with open(genome_results_path, 'r') as f:
-        for line in f:
-            if "There is a" in line and "of reference with a coverageData >= 20X" in line:
-                metrics["Coverage at 20X (%)"] = float(line.split()[3].strip('%'))
-
-            if "mean coverageData" in line:
-                metrics["Mean coverage depth"] = float(line.split("=")[1].strip().replace(",", "").replace("X", ""))
-
-            if "std coverageData" in line:
-                metrics["Standard deviation of coverage depth"] = float(line.split("=")[1].strip().replace(",", "").replace("X", ""))
+    metrics = parse_genome_results(genome_results_path)
 
     try:
-        histogram_data = np.loadtxt(coverage_histogram_path, skiprows=1)
-        depths = histogram_data[:, 0]
-        counts = histogram_data[:, 1]
+        depths, counts = read_coverage_histogram(coverage_histogram_path)
         total_locations = np.sum(counts)
 
         cumulative_counts = np.cumsum(counts)
@@ -210,52 +278,231 @@ def read_genome_length(sample_path):
         print(f"Warning: genomeLength.txt not found in {sample_path}")
         return None
 
-def process_all_reports(base_dir):
+def read_sample_reference_map(base_dir):
     """
-    Process all lab and sample reports in the specified base directory and extract metrics.
-
-    Iterates through each lab folder in the base directory, then through each sample folder,
-    parsing Qualimap and Nextclade output files. Aggregates paths to FASTA, BAM, and BAI files,
-    and updates the metrics dictionary with the parsed data.
+    Read the sample-to-reference mapping of a distribution from its 'samples.txt' file.
 
-    :param base_dir: The root directory containing lab-specific subdirectories with sample reports.
+    :param base_dir: The distribution directory (data/<distribution>).
     :type base_dir: str
-    :return: A nested dictionary where each key is a lab name mapping to sample dictionaries with
-             their corresponding metrics.
+    :return: The reference genome of each sample, keyed by sample name.
     :rtype: dict
+    :raises FileNotFoundError: If the distribution has no samples.txt.
     """
+    sample_reference_map = {}
+    with open(os.path.join(base_dir, "samples.txt"), "r") as f:
+        for line in f:
+            sample_id, reference = line.strip().split()
+            sample_reference_map[sample_id] = reference
+    return sample_reference_map
 
-    report_data = {}
+def parse_sample_directory(sample_path, lab, sample):
+    """
+    Parse the Qualimap and Nextclade outputs of a single lab/sample directory.
+
+    Builds the paths to the FASTA, BAM and BAI files of the sample and merges them with the
+    metrics returned by parse_qualimap() and parse_nextclade_file().
+
+    :param sample_path: Directory holding the pipeline outputs of the sample (data/<distribution>/<lab>/<sample>).
+    :type sample_path: str
+    :param lab: Name of the lab (organization) that submitted the sample.
+    :type lab: str
+    :param sample: Name of the sample.
+    :type sample: str
+    :return: A dictionary with the file paths and the parsed metrics, or None if 'genomeLength.txt' is missing.
+    :rtype: dict or None
+    """
+    genome_results_path = os.path.join(sample_path, "genome_results.txt")
+    coverage_histogram_path = os.path.join(sample_path, "raw_data_qualimapReport/coverage_histogram.txt")
+    nextclade_file_path = os.path.join(sample_path, "nextclade.output")
+    nextclade_alternative_file_path = os.path.join(sample_path, "nextclade_alternative.output")
+
+    # Read genome length
+    genome_length = read_genome_length(sample_path)
+    if genome_length is None:
+        return None  # Skip if genome length is missing
+
+    sample_metrics = {
+        'fasta': os.path.join(sample_path, f"{lab}_{sample}.fasta"),
+        'bam': os.path.join(sample_path, f"{lab}_{sample}.bam"),
+        'bai': os.path.join(sample_path, f"{lab}_{sample}.bam.bai"),
+    }
 
-    for lab in os.listdir(base_dir):
+    # Process Qualimap data
+    qualimap_metrics = parse_qualimap(genome_results_path, coverage_histogram_path)
+    sample_metrics.update(qualimap_metrics)
+
+    # Process Nextclade data
+    nextclade_metrics = parse_nextclade_file(nextclade_file_path, nextclade_alternative_file_path, genome_length)
+    sample_metrics.update(nextclade_metrics)
+
+    return sample_metrics
+
+def sample_fingerprint(sample_path):
+    """
+    Return the mtimes and sizes of the report files of a sample directory.
+
+    :param sample_path: Directory holding the pipeline outputs of the sample.
+    :type sample_path: str
+    :return: One [file, mtime_ns, size] entry per file in REPORT_FILES ([file, None, None] if missing).
+    :rtype: list
+    """
+    fingerprint = []
+    for name in REPORT_FILES:
+        try:
+            stat = os.stat(os.path.join(sample_path, name))
+            fingerprint.append([name, stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            fingerprint.append([name, None, None])
+    return fingerprint
+
+def parse_sample_directory_cached(sample_path, lab, sample):
+    """
+    Parse a sample directory, reusing the cached result if its report files did not change.
+
+    The cache is keyed on the absolute path of the directory and validated against
+    sample_fingerprint(), so a re-run of the pipeline (new mtimes/sizes) triggers a re-parse.
+
+    :param sample_path: Directory holding the pipeline outputs of the sample.
+    :type sample_path: str
+    :param lab: Name of the lab (organization) that submitted the sample.
+    :type lab: str
+    :param sample: Name of the sample.
+    :type sample: str
+    :return: Same as parse_sample_directory().
+    :rtype: dict or None
+    """
+    key = os.path.abspath(sample_path)
+    fingerprint = sample_fingerprint(sample_path)
+    cached = report_cache.get(key)
+    if cached is not None and cached["fingerprint"] == fingerprint:
+        return cached["metrics"]
+
+    metrics = parse_sample_directory(sample_path, lab, sample)
+    report_cache.set(key, {"fingerprint": fingerprint, "metrics": metrics})
+    return metrics
+
+def list_sample_directories(base_dir):
+    """
+    List the lab and sample directories of a distribution in a deterministic (sorted) order.
+
+    :param base_dir: The root directory containing lab-specific subdirectories with sample reports.
+    :type base_dir: str
+    :return: The sorted lab names, and a list of (lab, sample, sample_path) tuples sorted by lab then sample.
+    :rtype: (list[str], list[tuple])
+    """
+    labs = []
+    sample_dirs = []
+    for lab in sorted(os.listdir(base_dir)):
         lab_path = os.path.join(base_dir, lab)
         if os.path.isdir(lab_path):
-            report_data[lab] = {}
-            for sample in os.listdir(lab_path):
+            labs.append(lab)
+            for sample in sorted(os.listdir(lab_path)):
                 sample_path = os.path.join(lab_path, sample)
                 if os.path.isdir(sample_path):
-                    genome_results_path = os.path.join(sample_path, "genome_results.txt")
-                    coverage_histogram_path = os.path.join(sample_path, "raw_data_qualimapReport/coverage_histogram.txt")
-                    nextclade_file_path = os.path.join(sample_path, "nextclade.output")
-                    nextclade_alternative_file_path = os.path.join(sample_path, "nextclade_alternative.output")
-
-                    # Read genome length
-                    genome_length = read_genome_length(sample_path)
-                    if genome_length is None:
-                        continue  # Skip if genome length is missing
-
-                    report_data[lab][sample] = {
-                        'fasta': os.path.join(sample_path, f"{lab}_{sample}.fasta"),
-                        'bam': os.path.join(sample_path, f"{lab}_{sample}.bam"),
-                        'bai': os.path.join(sample_path, f"{lab}_{sample}.bam.bai"),
-                    }
-
-                    # Process Qualimap data
-                    qualimap_metrics = parse_qualimap(genome_results_path, coverage_histogram_path)
-                    report_data[lab][sample].update(qualimap_metrics)
-
-                    # Process Nextclade data
-                    nextclade_metrics = parse_nextclade_file(nextclade_file_path, nextclade_alternative_file_path, genome_length)
-                    report_data[lab][sample].update(nextclade_metrics)
+                    sample_dirs.append((lab, sample, sample_path))
+    return labs, sample_dirs
 
+def _parse_sample_task(task):
+    """
+    Pool task parsing one (lab, sample, sample_path, use_cache) tuple. Module-level so it can be pickled.
+    """
+    lab, sample, sample_path, use_cache = task
+    if use_cache:
+        return parse_sample_directory_cached(sample_path, lab, sample)
+    return parse_sample_directory(sample_path, lab, sample)
+
+def parse_sample_directories(sample_dirs, use_cache=True, workers=None, pool=None):
+    """
+    Parse several lab/sample directories, e.g. every directory of a distribution that has no stored metrics yet.
+
+    With more than one worker, the directories are parsed on a bounded thread or process pool. The results are
+    always returned in the order of sample_dirs, whatever the number of workers.
+
+    :param sample_dirs: (lab, sample, sample_path) tuples, as returned by list_sample_directories().
+    :type sample_dirs: list
+    :param use_cache: Whether to use the mtime-validated cache (default True).
+    :type use_cache: bool
+    :param workers: Number of parallel workers (default: REPORT_PARSER_WORKERS environment variable, 1 if unset).
+    :type workers: int or None
+    :param pool: "thread" or "process" (default: REPORT_PARSER_POOL environment variable, "thread" if unset).
+    :type pool: str or None
+    :return: The metrics of each directory (see parse_sample_directory(), None if it could not be parsed).
+    :rtype: list
+    """
+    if workers is None:
+        workers = int(os.environ.get("REPORT_PARSER_WORKERS", "1"))
+    if pool is None:
+        pool = os.environ.get("REPORT_PARSER_POOL", "thread")
+
+    tasks = [(lab, sample, sample_path, use_cache) for lab, sample, sample_path in sample_dirs]
+    if workers > 1 and len(tasks) > 1:
+        executor_class = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+        with executor_class(max_workers=min(workers, len(tasks))) as executor:
+            return list(executor.map(_parse_sample_task, tasks))
+    return [_parse_sample_task(task) for task in tasks]
+
+def process_sample_reports(base_dir, sample, use_cache=True):
+    """
+    Process the reports of a single sample across all labs of a distribution.
+
+    Only reads data/<distribution>/*/<sample>/, instead of every sample directory of the distribution.
+
+    :param base_dir: The root directory containing lab-specific subdirectories with sample reports.
+    :type base_dir: str
+    :param sample: Name of the sample to parse.
+    :type sample: str
+    :param use_cache: Whether to use the mtime-validated cache (default True).
+    :type use_cache: bool
+    :return: A nested dictionary {lab: {sample: metrics}}, only containing the labs that submitted the sample.
+    :rtype: dict
+    """
+    sample_dirs = [
+        (lab, sample, os.path.join(base_dir, lab, sample))
+        for lab in sorted(os.listdir(base_dir)) if os.path.isdir(os.path.join(base_dir, lab, sample))
+    ]
+    report_data = {}
+    for (lab, _, _), sample_metrics in zip(sample_dirs, parse_sample_directories(sample_dirs, use_cache)):
+        if sample_metrics is not None:
+            report_data[lab] = {sample: sample_metrics}
     return report_data
+
+class LazyReportData(Mapping):
+    """
+    Read-only {lab: {sample: metrics}} mapping that parses a lab's samples on first access.
+
+    Listing the labs only costs an os.listdir() of the distribution folder; the Qualimap and
+    Nextclade files of a lab are parsed (through the cache) the first time that lab is accessed,
+    and kept for the lifetime of the object.
+
+    :param base_dir: The root directory containing lab-specific subdirectories with sample reports.
+    :type base_dir: str
+    :param use_cache: Whether to use the mtime-validated cache (default True).
+    :type use_cache: bool
+    """
+    def __init__(self, base_dir, use_cache=True):
+        self.base_dir = base_dir
+        self.use_cache = use_cache
+        self._labs = sorted(lab for lab in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, lab)))
+        self._parsed = {}
+
+    def __getitem__(self, lab):
+        if lab not in self._labs:
+            raise KeyError(lab)
+        if lab not in self._parsed:
+            lab_path = os.path.join(self.base_dir, lab)
+            sample_dirs = [
+                (lab, sample, os.path.join(lab_path, sample))
+                for sample in sorted(os.listdir(lab_path)) if os.path.isdir(os.path.join(lab_path, sample))
+            ]
+            self._parsed[lab] = {
+                sample: sample_metrics
+                for (_, sample, _), sample_metrics in zip(sample_dirs, parse_sample_directories(sample_dirs, self.use_cache))
+                if sample_metrics is not None
+            }
+        return self._parsed[lab]
+
+    def __iter__(self):
+        return iter(self._labs)
+
+    def __len__(self):
+        return len(self._labs)
@@ -0,0 +1,209 @@
+"""
+report_pdf.py
+=============
+
+This utilities module renders the report of a lab straight to PDF, from an HTML/CSS template
+(project/templates/report.html) printed by WeasyPrint in-process. It is the alternative to the DOCX report
+of docx.py and its LibreOffice conversion: the same tables, figures and appendix, without the python-docx
+object model and without starting LibreOffice.
+
+The lab-specific data (participants, "Others" aggregates, summary sentences, platform ordering and genome
+tracks) comes from the same helpers as the DOCX report, so both backends show the same results.
+
+Functions:
+    build_report_html(context, role, user_lab)
+        Renders the HTML of the report of a lab, its figures embedded as data URIs.
+    render_lab_report_pdf(context, role, user_lab)
+        Renders the PDF report of one lab from the shared ReportContext of its distribution.
+    generate_pdf_report(report_data, base_dir, role, user_lab, distribution, context=None, profile=DEFAULT_RENDER_PROFILE)
+        Generates the PDF report of a lab, like docx.generate_docx_report.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import base64, os
+from datetime import datetime
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from project.utils.sql_models import Distribution
+from project.utils.evaluation import subtype_assignment
+from project.utils.report_context import ReportContext
+from project.utils.render_profiles import DEFAULT_RENDER_PROFILE, figure_format
+from project.utils.references import subtype_of
+from project.utils.docx import (
+    platform_plot_images, lab_sample_reports, lineage_statement, quality_statements,
+    sorted_platform_metrics, has_genome_tracks, render_genome_tracks,
+)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+_environment = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(["html"]))
+
+LINEAGE_INDICATORS = [("RSV_Subtyping", "RSV Subtyping"), ("Clade", "Lineage"), ("Legacy_clade", "Legacy lineage")]
+QUALITY_INDICATORS = [
+    ("Genome Coverage (%)", "genome-coverage"),
+    ("Ns in Sequence (%)", "ns"),
+    ("Similarity (%)", "similarity"),
+    ("Read Coverage (mean)", "read-coverage"),
+]
+
+
+def _participant_name(lab):
+    return lab if lab != 'Reference' else 'Reference Lab (NEQAS)'
+
+
+def _data_uri(image, image_format="png"):
+    mime_type = "image/svg+xml" if image_format == "svg" else "image/png"
+    return f"data:{mime_type};base64," + base64.b64encode(image).decode()
+
+
+def _lineage_rows(data, user_lab, intended_subtype):
+    return [
+        {
+            "participant": _participant_name(lab),
+            "subtype": subtype_assignment(metrics['subtype'], intended_subtype),
+            "clade": metrics['clade'],
+            "g_clade": metrics['G_clade'],
+            "highlight": _participant_name(lab) == user_lab,
+        }
+        for lab, metrics in data.items()
+    ]
+
+
+def _quality_rows(data, user_lab):
+    rows = []
+    for lab, metrics in data.items():
+        row = {"participant": _participant_name(lab), "highlight": _participant_name(lab) == user_lab, "coverage": None}
+        if metrics['coverage'] != "N/A":
+            row["coverage"] = f"{metrics['coverage'] * 100:.1f}"
+            row["ns"] = f"{metrics['Ns']:.1f}"
+            row["similarity"] = f"{metrics['similarity']:.1f}"
+        row["read_coverage"] = f"{metrics['Mean coverage depth']:.1f}" if metrics['Mean coverage depth'] != "N/A" else "N/A"
+        rows.append(row)
+    return rows
+
+
+def _platform_rows(aggregated_data, user_platforms):
+    return [
+        {
+            "platform": platform,
+            "coverage": f"{metrics['coverage']:.1f}" if metrics['coverage'] is not None and metrics['similarity'] != 0 else "N/A",
+            "ns": f"{metrics['Ns']:.1f}" if metrics['Ns'] is not None and metrics['similarity'] != 0 else "N/A",
+            "similarity": f"{metrics['similarity']:.1f}" if metrics['similarity'] is not None and metrics['similarity'] != 0 else "N/A",
+            "read_coverage": f"{metrics['Mean coverage depth']:.1f}" if metrics['Mean coverage depth'] != "N/A" and metrics['Mean coverage depth'] != 0 else "N/A",
+            "highlight": " ".join(platform.split(" ")[:-1]) in user_platforms,
+        }
+        for platform, metrics in aggregated_data.items()
+    ]
+
+
+def build_report_html(context, role, user_lab):
+    """
+    Render the HTML of the report of a lab.
+
+    Tables and figures are numbered as in the DOCX report. Figures are rendered in memory and embedded as data URIs,
+    as SVG when the render profile of the context allows vector figures.
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :return: The HTML document.
+    :rtype: str
+    """
+    table_count = 1
+    figure_count = 1
+    samples = []
+    plot_format = figure_format(context.profile, vector=True)
+    for sample, data in lab_sample_reports(context, role, user_lab).items():
+        platform_plot, read_platform_plot, user_platform = platform_plot_images(context, sample, user_lab, role, vector=True)
+        intended_subtype = subtype_of(context.sample_reference_map[sample])
+
+        section = {
+            "name": sample,
+            "lineage_statement": lineage_statement(data, role, user_lab),
+            "lineage_table": table_count,
+            "lineage_rows": _lineage_rows(data, user_lab, intended_subtype),
+            "quality_statements": quality_statements(data, role, user_lab),
+            "quality_table": table_count + 1,
+            "quality_rows": _quality_rows(data, user_lab),
+            "genome_tracks": None,
+        }
+        table_count += 2
+
+        if has_genome_tracks(context, role, user_lab, sample):
+            genome_tracks_plot = render_genome_tracks(context, sample, user_lab, vector=True)
+            section["genome_tracks"] = _data_uri(genome_tracks_plot, plot_format)
+            section["genome_tracks_figure"] = figure_count
+            figure_count += 1
+
+        section.update({
+            "platform_plot": _data_uri(platform_plot, plot_format),
+            "readcov_plot": _data_uri(read_platform_plot, plot_format),
+            "platform_figure": figure_count,
+            "platform_table": table_count,
+            "platform_rows": _platform_rows(sorted_platform_metrics(context, sample, user_platform), user_platform),
+        })
+        figure_count += 2
+        samples.append(section)
+
+    return _environment.get_template("report.html").render(
+        role=role,
+        user_lab=user_lab,
+        distribution=context.distribution,
+        printed_on=datetime.now().strftime("%d/%m/%Y %H:%M"),
+        evaluation_data=context.evaluation.evaluation_data(user_lab),
+        lineage_indicators=LINEAGE_INDICATORS,
+        quality_indicators=QUALITY_INDICATORS,
+        samples=samples,
+    )
+
+
+def render_lab_report_pdf(context, role, user_lab):
+    """
+    Render the PDF report of one lab from the shared data of its distribution.
+
+    :param context: Data shared by the reports of the distribution.
+    :type context: ReportContext
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :return: The PDF document.
+    :rtype: bytes
+    """
+    # WeasyPrint loads Pango when imported, so it is only imported when a PDF is actually rendered
+    from weasyprint import HTML
+
+    html = build_report_html(context, role, user_lab)
+    # Relative URLs of the template (logo, QR code) are resolved from the application directory
+    return HTML(string=html, base_url=os.getcwd() + os.sep).write_pdf()
+
+
+def generate_pdf_report(report_data, base_dir, role, user_lab, distribution, context=None, profile=DEFAULT_RENDER_PROFILE):
+    """
+    Generate the PDF report of a lab for a given distribution, rendered from HTML (see docx.generate_docx_report).
+
+    :param report_data: Processed data containing genomic viral analysis results (see metrics_store.load_report_data).
+        If None, the stored metrics of the distribution are loaded.
+    :type report_data: dict or None
+    :param base_dir: Base directory containing report-related files.
+    :type base_dir: str
+    :param role: User role determining report formatting.
+    :type role: str
+    :param user_lab: User lab identifier.
+    :type user_lab: str
+    :param distribution: The name of the distribution.
+    :type distribution: str
+    :param context: Data shared by the reports of the distribution. If None, it is built from report_data.
+    :type context: ReportContext or None
+    :param profile: Render profile of the figures (see render_profiles), used when the context is built here.
+    :type profile: str
+    :return: The PDF document.
+    :rtype: bytes
+    """
+    if context is None:
+        dist = Distribution.query.filter_by(name=str(base_dir.split("/")[1])).first()
+        context = ReportContext(dist, report_data, profile)
+    return render_lab_report_pdf(context, role, user_lab)
@@ -0,0 +1,121 @@
+"""
+response_cache.py
+=================
+
+This utilities module caches the JSON responses of the distribution data endpoints in Redis, shared by every
+gunicorn worker. The data behind them only changes when the Nextflow run of a submission completes, so a
+dashboard opened by every participant at once is served from Redis instead of recomputing each response.
+
+Entries are keyed by endpoint, distribution, sample and, for the endpoints whose response depends on the
+reader, by role and organization. Each key also carries the generation of its distribution, which
+upload.launch_nextflow increments once the results of a run are stored (and admin.samples_per_distro_manager
+when a sample is added), so the entries computed before are never read again and expire after
+RESPONSE_CACHE_TTL seconds. The "[ANALYSIS COMPLETE]" message published on the "chat" channel increments it
+again in the web workers whose Redis listener runs (see notifications.redis_listener); pub/sub messages are not
+kept, so this is only a secondary path. When Redis is unavailable, the responses are computed as usual.
+
+Functions:
+    invalidate_distribution_responses(distribution_name)
+        Drops the cached responses of a distribution.
+    invalidate_from_message(message)
+        Drops the cached responses of the distribution of an "[ANALYSIS COMPLETE]" message.
+    cached_json_response(endpoint, per_user=True)
+        Decorator caching the successful JSON responses of a distribution data endpoint.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import inspect, os
+import redis
+from functools import wraps
+from flask import current_app, make_response
+from flask_login import current_user
+from project.utils.redis_cache import RedisLRUCache, get_redis
+
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 3600))  # 1 hour
+# Serialized JSON responses, shared by all workers through Redis
+response_cache = RedisLRUCache("response_cache", max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "5000")), ttl=RESPONSE_CACHE_TTL)
+
+
+def _generation_key(distribution_name):
+    return f"response_cache:generation:{distribution_name}"
+
+
+def _generation(distribution_name):
+    # Generation of the cached responses of a distribution, None if Redis is unavailable
+    try:
+        return int(get_redis().get(_generation_key(distribution_name)) or 0)
+    except redis.exceptions.RedisError as e:
+        print(f"Warning: cache 'response_cache' unavailable: {e}")
+        return None
+
+
+def invalidate_distribution_responses(distribution_name):
+    """
+    Drop the cached responses of a distribution, by moving it to a new generation.
+
+    :param distribution_name: Name of the distribution.
+    :type distribution_name: str
+    """
+    try:
+        get_redis().incr(_generation_key(distribution_name))
+    except redis.exceptions.RedisError as e:
+        print(f"Warning: cache 'response_cache' unavailable: {e}")
+
+
+def invalidate_from_message(message):
+    """
+    Drop the cached responses of the distribution of an "[ANALYSIS COMPLETE]" message, as published by
+    upload.launch_nextflow. Other messages are ignored.
+
+    :param message: A message of the "chat" channel.
+    :type message: str
+    :return: The name of the invalidated distribution, or None.
+    :rtype: str or None
+    """
+    if not message.startswith("[ANALYSIS COMPLETE]") or " from distribution " not in message:
+        return None
+    distribution_name = message.rsplit(" from distribution ", 1)[1].removesuffix(" has been completed.")
+    invalidate_distribution_responses(distribution_name)
+    return distribution_name
+
+
+def cached_json_response(endpoint, per_user=True):
+    """
+    Cache the successful (200) JSON responses of a distribution data endpoint.
+
+    The view must take a 'distribution' argument, and optionally a 'selected_sample' one. Apply the decorator
+    below @login_required, so that only authenticated requests reach the cache.
+
+    :param endpoint: Name of the endpoint in the cache keys.
+    :type endpoint: str
+    :param per_user: Whether the response depends on the role and organization of the reader.
+    :type per_user: bool
+    :return: The decorator.
+    :rtype: callable
+    """
+    def decorator(view):
+        signature = inspect.signature(view)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            distribution = arguments["distribution"]
+            generation = _generation(distribution)
+            if generation is None:
+                return view(*args, **kwargs)
+
+            key = f"{endpoint}:{distribution}:{generation}:{arguments.get('selected_sample', '')}"
+            if per_user:
+                key += f":{current_user.role}:{current_user.organization}"
+            payload = response_cache.get(key)
+            if payload is not None:
+                return current_app.response_class(payload, mimetype="application/json")
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.is_json:
+                response_cache.set(key, response.get_data(as_text=True))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,86 @@
+"""
+samples.py
+==========
+
+This utilities module reads and writes the samples of a distribution, stored in the Sample table.
+
+The table is the only record of which samples belong to a distribution and of their reference genomes. The
+endpoints and report generators read it with an indexed query; the samples.txt file the Nextflow pipeline
+reads (one "<sample>\\t<reference>" line per sample) is generated from it when a run is launched.
+
+Functions:
+    get_sample_reference_map(distribution)
+        Returns the reference genome of each sample of a distribution.
+    add_sample(distribution, name, reference)
+        Adds a sample to a distribution.
+    write_samples_file(distribution, path=None)
+        Writes the samples.txt file of a distribution for the pipeline.
+
+:author: Kevin
+:version: 0.0.1
+:date: 2026-10-17
+"""
+import os
+from project.utils.sql_models import db, Sample
+
+
+def get_sample_reference_map(distribution):
+    """
+    Return the reference genome of each sample of a distribution, in a single query.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :return: The reference accession (e.g. "EPI_ISL_412866"), keyed by sample name.
+    :rtype: dict
+    """
+    rows = (
+        db.session.query(Sample.name, Sample.reference)
+        .filter(Sample.distribution_id == distribution.id, Sample.reference.isnot(None))
+        .order_by(Sample.id)
+        .all()
+    )
+    return {name: reference for name, reference in rows}
+
+
+def add_sample(distribution, name, reference):
+    """
+    Add a sample to a distribution (the caller commits the session).
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :param name: Name of the sample.
+    :type name: str
+    :param reference: Accession of the reference genome of the sample.
+    :type reference: str
+    :return: The new Sample, or None if the distribution already has a sample with this name.
+    :rtype: Sample or None
+    """
+    if Sample.query.filter_by(distribution_id=distribution.id, name=name).first() is not None:
+        return None
+    sample = Sample(distribution_id=distribution.id, name=name, reference=reference)
+    db.session.add(sample)
+    return sample
+
+
+def write_samples_file(distribution, path=None):
+    """
+    Write the samples.txt file of a distribution, as read by the Nextflow pipeline (main.nf).
+
+    The file is written next to its final path and renamed, so a run launched meanwhile never reads a
+    partial file. Samples without a reference genome are left out, the pipeline could not analyse them.
+
+    :param distribution: The Distribution object.
+    :type distribution: Distribution
+    :param path: Path of the file (default: data/<distribution>/samples.txt).
+    :type path: str or None
+    :return: The path of the written file.
+    :rtype: str
+    """
+    path = path or os.path.join("data", distribution.name, "samples.txt")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        for name, reference in get_sample_reference_map(distribution).items():
+            f.write(f"{name}\t{reference}\n")
+    os.replace(tmp_path, path)
+    return path
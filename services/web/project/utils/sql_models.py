@@ -3,15 +3,17 @@ sql_models.py
 =============
 
 This module defines the database models for the application using SQLAlchemy.
-It includes models for Users, Organizations, Distributions, Notifications, and Submissions.
-The models are designed to work with the PostgreSQL database service (including JSON support).
+It includes models for Users, Organizations, Distributions, Samples, Notifications, and Submissions.
+The models are designed to work with the PostgreSQL database service.
 
 Models:
     User: Represents a user in the system.
     Organization: Represents an organization that users belong to.
     Distribution: Represents a distribution containing samples and associated organizations.
+    Sample: Represents a sample of a distribution and its reference genome.
     Notification: Represents a notification sent to users.
     Submission: Represents a sample submission with associated sequencing data.
+    SampleMetrics: Represents the parsed Qualimap/Nextclade metrics of a processed submission.
 
 :author: Kevin
 :version: 1.0
@@ -20,7 +22,6 @@ Models:
 
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.postgresql import JSON
 
 db = SQLAlchemy()
 
@@ -101,7 +102,9 @@ class User(db.Model):
 distribution_organization = db.Table(
     'distribution_organization',
     db.Column('distribution_id', db.Integer, db.ForeignKey('distributions.id'), primary_key=True),
-    db.Column('organization_id', db.Integer, db.ForeignKey('organizations.id'), primary_key=True)
+    db.Column('organization_id', db.Integer, db.ForeignKey('organizations.id'), primary_key=True),
+    # The primary key serves lookups by distribution, the distributions of an organization need their own index
+    db.Index('ix_distribution_organization_organization_id', 'organization_id')
 )
 
 class Organization(db.Model):
@@ -146,7 +149,7 @@ class Distribution(db.Model):
         id (int): Primary key.
         name (str): Unique name of the distribution.
         created_at (datetime): Timestamp when the distribution was created.
-        samples (JSON): A JSON field storing a list of sample names.
+        samples (list[Sample]): Samples of the distribution, in the order they were added.
         organizations (list[Organization]): Organizations associated with this distribution.
     """
     __tablename__ = "distributions"
@@ -154,7 +157,9 @@ class Distribution(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
-    samples = db.Column(JSON, nullable=True)  # Store list of sample names as JSON
+
+    # Samples of the distribution (see Sample)
+    samples = db.relationship("Sample", back_populates="distribution", order_by="Sample.id", cascade="all, delete-orphan")
 
     # Add relationship to Organization via the association table
     organizations = db.relationship(
@@ -163,6 +168,16 @@ class Distribution(db.Model):
         back_populates="distributions"
     )
 
+    @property
+    def sample_names(self):
+        """
+        Names of the samples of the distribution, in the order they were added.
+
+        :return: The sample names.
+        :rtype: list
+        """
+        return [sample.name for sample in self.samples]
+
     def __repr__(self):
         """
         Return a string representation of the Distribution.
@@ -174,8 +189,43 @@ class Distribution(db.Model):
         """
         # For clarity, list organization names in the representation
         org_names = [org.name for org in self.organizations] if self.organizations else []
-        return f"<Distribution(id={self.id}, name={self.name}, samples={self.samples}, organizations={org_names})>"
+        return f"<Distribution(id={self.id}, name={self.name}, samples={self.sample_names}, organizations={org_names})>"
+
+
+class Sample(db.Model):
+    """
+    Sample model representing a sample of a distribution.
+
+    The samples of a distribution and their reference genomes are read from this table; the samples.txt file
+    the pipeline reads is generated from it (see samples.write_samples_file).
 
+    Attributes:
+        id (int): Primary key.
+        distribution_id (int): Foreign key referencing the Distribution.
+        name (str): Name of the sample, unique within its distribution.
+        reference (str): Accession of the reference genome of the sample (e.g. "EPI_ISL_412866", see references).
+        distribution (Distribution): Relationship to the Distribution.
+    """
+    __tablename__ = "samples"
+    __table_args__ = (
+        db.UniqueConstraint("distribution_id", "name", name="uq_samples_distribution_name"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    distribution_id = db.Column(db.Integer, db.ForeignKey('distributions.id'), nullable=False)
+    name = db.Column(db.String(128), nullable=False)
+    reference = db.Column(db.String(64), nullable=True)
+
+    distribution = db.relationship("Distribution", back_populates="samples")
+
+    def __repr__(self):
+        """
+        Return a string representation of the Sample.
+
+        :return: A string in the format "<Sample(id, distribution_id, name, reference)>".
+        :rtype: str
+        """
+        return f"<Sample(id={self.id}, distribution_id={self.distribution_id}, name={self.name}, reference={self.reference})>"
     
 
 class Notification(db.Model):
@@ -190,6 +240,10 @@ class Notification(db.Model):
         created_at (datetime): Timestamp when the notification was created.
     """
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # Undismissed notifications of a user, read on every Socket.IO connection and /api/notifications call
+        db.Index("ix_notifications_user_email_is_dismissed", "user_email", "is_dismissed"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_email = db.Column(db.String(255), nullable=False)
@@ -216,6 +270,8 @@ class Submission(db.Model):
     """
     Submission model representing a sample submission.
 
+    A lab has at most one submission per sample of a distribution: uploading a sample again updates it.
+
     Attributes:
         id (int): Primary key.
         user_id (int): Foreign key referencing the User.
@@ -229,6 +285,10 @@ class Submission(db.Model):
         distribution (Distribution): Relationship to the Distribution.
     """
     __tablename__ = "submissions"
+    __table_args__ = (
+        # Unique, and ordered for the hot lookups: by distribution, by (distribution, sample) and by (distribution, sample, organization)
+        db.Index("uq_submissions_distribution_sample_organization", "distribution_id", "sample", "organization_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     
@@ -260,3 +320,133 @@ class Submission(db.Model):
                 f"organization_id={self.organization_id}, distribution_id={self.distribution_id}, "
                 f"sample={self.sample}, sequencing_type={self.sequencing_type}, "
                 f"submission_date={self.submission_date})>")
+
+
+class SampleMetrics(db.Model):
+    """
+    SampleMetrics model storing the parsed pipeline outputs of one lab's sample.
+
+    Rows are written once, when the Nextflow run of a submission completes, so that read endpoints
+    and reports do not need to re-parse the Qualimap and Nextclade files on every request.
+    Missing values ('N/A' in the parsed dictionaries) are stored as NULL.
+
+    Attributes:
+        id (int): Primary key.
+        distribution_id (int): Foreign key referencing the Distribution.
+        organization_id (int): Foreign key referencing the Organization.
+        sample (str): The identifier of the sample.
+        fasta, bam, bai (str): Paths to the consensus FASTA, BAM and BAI files.
+        coverage_20x, mean_depth, std_depth, median_depth, uniformity (float): Qualimap metrics.
+        seq_name, clade, g_clade, subtype (str): Nextclade assignments.
+        coverage, ns, similarity (float): Nextclade quality metrics.
+        total_missing, substitutions, deletions, insertions, frame_shifts (int): Nextclade counts.
+        updated_at (datetime): Date and time the metrics were last parsed.
+        organization (Organization): Relationship to the Organization.
+        distribution (Distribution): Relationship to the Distribution.
+    """
+    __tablename__ = "sample_metrics"
+    __table_args__ = (
+        db.UniqueConstraint("distribution_id", "organization_id", "sample", name="uq_sample_metrics_distribution_organization_sample"),
+    )
+
+    # Keys of the dictionaries produced by report_parser, mapped to their column
+    FIELDS = {
+        "fasta": "fasta",
+        "bam": "bam",
+        "bai": "bai",
+        "Coverage at 20X (%)": "coverage_20x",
+        "Mean coverage depth": "mean_depth",
+        "Standard deviation of coverage depth": "std_depth",
+        "Read depth (Median)": "median_depth",
+        "Uniformity (%)": "uniformity",
+        "seqName": "seq_name",
+        "coverage": "coverage",
+        "totalMissing": "total_missing",
+        "Ns": "ns",
+        "substitutions": "substitutions",
+        "deletions": "deletions",
+        "insertions": "insertions",
+        "frameShifts": "frame_shifts",
+        "similarity": "similarity",
+        "clade": "clade",
+        "G_clade": "g_clade",
+        "subtype": "subtype",
+    }
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Foreign keys
+    distribution_id = db.Column(db.Integer, db.ForeignKey('distributions.id'), nullable=False)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
+    sample = db.Column(db.String(128), nullable=False)
+
+    # File paths
+    fasta = db.Column(db.String(512))
+    bam = db.Column(db.String(512))
+    bai = db.Column(db.String(512))
+
+    # Qualimap metrics
+    coverage_20x = db.Column(db.Float)
+    mean_depth = db.Column(db.Float)
+    std_depth = db.Column(db.Float)
+    median_depth = db.Column(db.Float)
+    uniformity = db.Column(db.Float)
+
+    # Nextclade metrics
+    seq_name = db.Column(db.String(256))
+    coverage = db.Column(db.Float)
+    total_missing = db.Column(db.Integer)
+    ns = db.Column(db.Float)
+    substitutions = db.Column(db.Integer)
+    deletions = db.Column(db.Integer)
+    insertions = db.Column(db.Integer)
+    frame_shifts = db.Column(db.Integer)
+    similarity = db.Column(db.Float)
+    clade = db.Column(db.String(64))
+    g_clade = db.Column(db.String(64))
+    subtype = db.Column(db.String(32))
+
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+    # Relationships for convenient access to associated objects
+    organization = db.relationship("Organization", backref=db.backref("sample_metrics", lazy=True))
+    distribution = db.relationship("Distribution", backref=db.backref("sample_metrics", lazy=True))
+
+    def update_from_dict(self, metrics):
+        """
+        Copy a parsed metrics dictionary (as returned by report_parser) into the columns.
+
+        :param metrics: Dictionary keyed by the report_parser metric names, 'N/A' for missing values.
+        :type metrics: dict
+        """
+        for key, column in self.FIELDS.items():
+            value = metrics.get(key, 'N/A')
+            if value == 'N/A':
+                value = None
+            elif isinstance(getattr(SampleMetrics, column).type, db.Float):
+                value = float(value)  # numpy scalars are not understood by every DB driver
+            elif isinstance(getattr(SampleMetrics, column).type, db.Integer):
+                value = int(value)
+            setattr(self, column, value)
+
+    def to_dict(self):
+        """
+        Convert the row back to the dictionary layout produced by report_parser.
+
+        :return: A dictionary keyed by the report_parser metric names, with 'N/A' for missing values.
+        :rtype: dict
+        """
+        return {
+            key: getattr(self, column) if getattr(self, column) is not None else 'N/A'
+            for key, column in self.FIELDS.items()
+        }
+
+    def __repr__(self):
+        """
+        Return a string representation of the SampleMetrics.
+
+        :return: A string summarizing the key of the row.
+        :rtype: str
+        """
+        return (f"<SampleMetrics(id={self.id}, distribution_id={self.distribution_id}, "
+                f"organization_id={self.organization_id}, sample={self.sample})>")